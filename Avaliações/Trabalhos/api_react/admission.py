@@ -0,0 +1,286 @@
+"""Controle de admissão: limites de taxa e de escritas simultâneas.
+
+O SQLite tem um único escritor. Num pico (todos os professores registrando
+presença no início da aula), as requisições de escrita se acumulam na espera
+pelo lock do banco até estourar o busy_timeout, e a latência sobe para todos.
+Este módulo recusa cedo, com respostas baratas, o que não vai ser atendido a
+tempo:
+
+* baldes de fichas (token buckets) por usuário (``user_id`` do JWT) e por IP:
+  acima da taxa a resposta é 429 com ``Retry-After``;
+* um limite de requisições de escrita em andamento, com uma fila curta e
+  espera máxima: com a fila cheia, ou depois da espera, a resposta é 503 com
+  ``Retry-After``.
+
+Os limites são por rota (a regra do Flask, como ``/api/presenca/<nome>/<matricula>``):
+``ROUTE_LIMITS`` traz os padrões, e ``app.config['ADMISSION_LIMITS']`` os
+sobrescreve no mesmo formato. Rotas sem configuração própria compartilham os
+baldes padrão. Cada limite é ``(taxa por segundo, rajada)``; None desliga o
+limite, e uma rota configurada como None fica fora do controle.
+
+O estado é do processo: com vários workers (gunicorn.conf.py), cada um tem
+os seus baldes e o seu limite de escritas.
+
+Configuração pelo ambiente:
+    RATE_LIMIT_USER         taxa/rajada padrão por usuário (padrão 10/30; 0 desliga)
+    RATE_LIMIT_IP           taxa/rajada padrão por IP (padrão 50/200; 0 desliga)
+    WRITE_CONCURRENCY       escritas em andamento por processo (padrão 4; 0 desliga)
+    WRITE_QUEUE             escritas esperando por uma vaga (padrão 64)
+    WRITE_QUEUE_TIMEOUT_MS  espera máxima por uma vaga (padrão 2000)
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RATE_LIMITED_MESSAGE = "Muitas requisições, tente novamente em instantes."
+BUSY_MESSAGE = "Servidor ocupado, tente novamente em instantes."
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# Rota -> limites que diferem do padrão. 'usuario' e 'ip' são (taxa, rajada);
+# 'escrita' diz se a rota passa pelo limite de escritas (padrão: pelo método)
+ROUTE_LIMITS = {
+    # O hash da senha já tem a sua própria fila (passwords.py); por IP porque
+    # não há token. A rajada cobre uma turma inteira atrás do mesmo NAT.
+    '/api/login': {'ip': (5, 60), 'escrita': False},
+    '/api/signin': {'ip': (1, 10)},
+    # Um professor registrando a turma inteira, aluno por aluno
+    '/api/presenca/<nome>/<matricula>': {'usuario': (20, 60)},
+    '/api/chamada/alunos/<int:aluno_id>/presenca': {'usuario': (20, 60)},
+    '/api/chamada/importar': {'usuario': (0.5, 5)},
+    '/api/chamada/exportar': {'usuario': (0.5, 5)},
+    '/api/analytics': {'usuario': (1, 5)},
+    # Conexões SSE são longas; o limite só contém tempestades de reconexão
+    '/api/eventos': {'usuario': (0.5, 10)},
+    '/metrics': None,
+}
+
+def parse_rate(value: str):
+    """'10/30' -> (10.0, 30); '10' -> (10.0, 10); '0' ou vazio -> None."""
+    if not value or value.strip() == '0':
+        return None
+    rate, _, burst = value.partition('/')
+    return float(rate), int(burst or math.ceil(float(rate)))
+
+def retry_after(seconds: float):
+    """Valor do cabeçalho Retry-After (segundos inteiros, no mínimo 1)."""
+    return str(max(1, math.ceil(seconds)))
+
+class TokenBuckets:
+    """Baldes de fichas por chave: ``rate`` fichas por segundo, até ``burst``.
+
+    Guarda no máximo ``maxsize`` chaves; a usada há mais tempo é descartada
+    (LRU), o que equivale a devolver a ela um balde cheio.
+    """
+
+    def __init__(self, rate: float, burst: int, maxsize: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Consome uma ficha de ``key``; retorna 0 se havia ficha, ou os segundos até a próxima."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+class WriteGate:
+    """Limite de ``concurrency`` escritas em andamento, com até ``queue`` esperando ``timeout`` segundos."""
+
+    def __init__(self, concurrency: int, queue: int, timeout: float):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def try_acquire(self):
+        with self._cond:
+            if self.in_flight < self.concurrency:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Ocupa uma vaga, esperando na fila se preciso; False se a fila está cheia ou a espera acabou."""
+        with self._cond:
+            if self.in_flight < self.concurrency:
+                self.in_flight += 1
+                return True
+            if self.waiting >= self.queue:
+                return False
+            self.waiting += 1
+            try:
+                if not self._cond.wait_for(lambda: self.in_flight < self.concurrency, self.timeout):
+                    return False
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    async def acquire_async(self, poll: float = 0.005):
+        """Como ``acquire``, sem bloquear o event loop (asgi.py).
+
+        Espera consultando a vaga a cada ``poll`` segundos: uma thread
+        esperando no Condition continuaria na fila se a corrotina fosse
+        cancelada (cliente desconectado) e ocuparia a vaga sem devolvê-la.
+        """
+        if self.try_acquire():
+            return True
+        with self._cond:
+            if self.waiting >= self.queue:
+                return False
+            self.waiting += 1
+        try:
+            deadline = time.monotonic() + self.timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(poll)
+                if self.try_acquire():
+                    return True
+            return False
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+class AdmissionControl:
+    """Limites de taxa por rota e o limite de escritas do processo."""
+
+    def __init__(self, user: tuple = None, ip: tuple = None, concurrency: int = 0, queue: int = 0,
+                 timeout: float = 0, routes: dict = None):
+        self.default = {'usuario': user, 'ip': ip}
+        self.routes = dict(ROUTE_LIMITS if routes is None else routes)
+        self.gate = WriteGate(concurrency, queue, timeout) if concurrency > 0 else None
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.rejected_user = 0
+        self.rejected_ip = 0
+        self.rejected_busy = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            user=parse_rate(os.getenv("RATE_LIMIT_USER", "10/30")),
+            ip=parse_rate(os.getenv("RATE_LIMIT_IP", "50/200")),
+            concurrency=int(os.getenv("WRITE_CONCURRENCY", "4")),
+            queue=int(os.getenv("WRITE_QUEUE", "64")),
+            timeout=int(os.getenv("WRITE_QUEUE_TIMEOUT_MS", "2000")) / 1000,
+        )
+
+    def configure(self, routes: dict):
+        """Sobrescreve os limites das rotas informadas (mesmo formato de ROUTE_LIMITS)."""
+        with self._lock:
+            self.routes.update(routes)
+            self._buckets.clear()
+
+    def _bucket(self, route: str, scope: str, limit: tuple):
+        key = (route, scope)
+        with self._lock:
+            buckets = self._buckets.get(key)
+            if buckets is None:
+                buckets = self._buckets[key] = TokenBuckets(*limit)
+            return buckets
+
+    def check(self, route: str, method: str, user_id=None, ip: str = None):
+        """Confere os limites de taxa de uma requisição.
+
+        Retorna ``(espera, escrita)``: ``espera`` > 0 são os segundos até o
+        cliente poder tentar de novo (responder 429); ``escrita`` diz se a
+        requisição deve ocupar uma vaga de ``gate`` antes de seguir.
+        """
+        # Preflight do CORS e rotas inexistentes (404) não passam pelo controle
+        if method == 'OPTIONS' or route is None:
+            return 0.0, False
+        config = self.routes.get(route, {})
+        if config is None:
+            return 0.0, False
+
+        for scope, key in (('ip', ip), ('usuario', user_id)):
+            limit = config.get(scope, self.default[scope])
+            if limit is None or key is None:
+                continue
+            # Balde próprio quando a rota define o limite; senão o padrão, compartilhado
+            group = route if scope in config else '*'
+            wait = self._bucket(group, scope, limit).take(key)
+            if wait:
+                with self._lock:
+                    if scope == 'ip':
+                        self.rejected_ip += 1
+                    else:
+                        self.rejected_user += 1
+                return wait, False
+
+        write = config.get('escrita', method in WRITE_METHODS)
+        return 0.0, bool(write and self.gate is not None)
+
+    def busy(self):
+        """Registra uma recusa por falta de vaga de escrita."""
+        with self._lock:
+            self.rejected_busy += 1
+
+    def stats(self):
+        gate = self.gate
+        return {
+            'rejected_user': self.rejected_user,
+            'rejected_ip': self.rejected_ip,
+            'rejected_busy': self.rejected_busy,
+            'writes_in_flight': gate.in_flight if gate else 0,
+            'writes_waiting': gate.waiting if gate else 0,
+            'write_concurrency': gate.concurrency if gate else 0,
+        }
+
+controller = AdmissionControl.from_env()
+
+def init_app(app, identify):
+    """Aplica ``controller`` a todas as rotas do app Flask.
+
+    ``identify()`` retorna o ``user_id`` do token da requisição atual, ou
+    None (sem token ou token inválido: a própria rota responde 401).
+    """
+    from flask import g, jsonify, request
+
+    if app.config.get('ADMISSION_LIMITS'):
+        controller.configure(app.config['ADMISSION_LIMITS'])
+
+    @app.before_request
+    def _admit():
+        route = request.url_rule.rule if request.url_rule else None
+        wait, write = controller.check(route, request.method, identify(), request.remote_addr)
+        if wait:
+            return jsonify({"error": RATE_LIMITED_MESSAGE}), 429, {"Retry-After": retry_after(wait)}
+        if write:
+            if not controller.gate.acquire():
+                controller.busy()
+                return jsonify({"error": BUSY_MESSAGE}), 503, {"Retry-After": "1"}
+            g.admission_write = True
+        return None
+
+    @app.teardown_request
+    def _release_write(exception=None):
+        if g.pop('admission_write', False):
+            controller.gate.release()
+
+    return app
@@ -0,0 +1,105 @@
+"""Indicadores de frequência calculados no próprio SQLite.
+
+Todas as agregações são feitas com SQL orientado a conjuntos (GROUP BY e
+funções de janela sobre o dia das presenças) em vez de laços em Python
+sobre objetos do ORM. As presenças arquivadas (archive.py) entram pela
+subconsulta ``archive.presences``. Uma "aula" é um dia em que o professor
+registrou ao menos uma presença.
+
+Os resultados ficam no cache de listas (``cache.roster_cache``) associados
+à versão da lista do professor, então só são recalculados depois de uma
+escrita na turma.
+"""
+from sqlalchemy import distinct, func, select
+
+from archive import presences
+from cache import roster_cache
+from database import read_session
+from models import User, ProfessorAluno
+import operations
+
+def _class_days(professor_id: int):
+    """Subconsulta com os dias de aula do professor, numerados do mais recente (1) ao mais antigo."""
+    presencas = presences(ProfessorAluno.professor_id == professor_id)
+    days = select(presencas.c.dia).distinct().subquery()
+    return select(days.c.dia, func.row_number().over(order_by=days.c.dia.desc()).label('ordem')).subquery()
+
+def attendance_rates(professor_id: int):
+    """Número de aulas e presenças/taxa de cada aluno sobre todas as aulas."""
+    days = _class_days(professor_id)
+    total = read_session.execute(select(func.count()).select_from(days)).scalar()
+    # Agrega por relação antes da junção, para não materializar a união inteira
+    presencas = presences(ProfessorAluno.professor_id == professor_id)
+    totals = select(presencas.c.professor_aluno_id, func.count(distinct(presencas.c.dia)).label('presencas')) \
+        .group_by(presencas.c.professor_aluno_id).subquery()
+    rows = read_session.execute(
+        select(User.nome, User.matricula, func.coalesce(totals.c.presencas, 0))
+        .select_from(ProfessorAluno)
+        .join(User, User.id == ProfessorAluno.aluno_id)
+        .outerjoin(totals, totals.c.professor_aluno_id == ProfessorAluno.id)
+        .where(ProfessorAluno.professor_id == professor_id, User.isTeacher == False)
+        .order_by(User.nome)
+    ).all()
+    return total, [{'nome': nome, 'matricula': matricula, 'presencas': presencas,
+                    'taxa': presencas / total if total else 0.0}
+                   for nome, matricula, presencas in rows]
+
+def daily_histogram(professor_id: int):
+    """Quantidade de alunos presentes em cada dia de aula."""
+    presencas = presences(ProfessorAluno.professor_id == professor_id)
+    rows = read_session.execute(
+        select(presencas.c.dia, func.count(distinct(presencas.c.professor_aluno_id)))
+        .group_by(presencas.c.dia)
+        .order_by(presencas.c.dia)
+    ).all()
+    return [{'dia': dia.isoformat(), 'presentes': presentes} for dia, presentes in rows]
+
+def at_risk(professor_id: int, last_classes: int, threshold: float):
+    """Alunos com taxa de presença abaixo de ``threshold`` nas últimas ``last_classes`` aulas."""
+    days = _class_days(professor_id)
+    recent = select(days.c.dia).where(days.c.ordem <= last_classes).subquery()
+    n_days, first_day = read_session.execute(select(func.count(), func.min(recent.c.dia))).one()
+    if not n_days:
+        return []
+
+    # As aulas a partir da mais antiga entre as recentes são exatamente as
+    # últimas aulas, então basta limitar o intervalo de dias (pelos índices)
+    presencas = presences(ProfessorAluno.professor_id == professor_id, start=first_day)
+    recent_presencas = select(presencas.c.professor_aluno_id,
+                              func.count(distinct(presencas.c.dia)).label('presencas')) \
+        .group_by(presencas.c.professor_aluno_id).subquery()
+    presencas = func.coalesce(recent_presencas.c.presencas, 0)
+    rows = read_session.execute(
+        select(User.nome, User.matricula, presencas)
+        .select_from(ProfessorAluno)
+        .join(User, User.id == ProfessorAluno.aluno_id)
+        .outerjoin(recent_presencas, recent_presencas.c.professor_aluno_id == ProfessorAluno.id)
+        .where(ProfessorAluno.professor_id == professor_id, User.isTeacher == False,
+               presencas < threshold * n_days)
+        .order_by(presencas, User.nome)
+    ).all()
+    return [{'nome': nome, 'matricula': matricula, 'presencas': count, 'taxa': count / n_days}
+            for nome, matricula, count in rows]
+
+def professor_report(professor_id: int, last_classes: int = 10, threshold: float = 0.75):
+    """Relatório completo de frequência de um professor, com cache por versão da lista."""
+    version = operations.roster_version(professor_id)
+    key = ('analytics', professor_id, last_classes, threshold)
+    cached = roster_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    total, rates = attendance_rates(professor_id)
+    report = {
+        'versao': version,
+        'total_aulas': total,
+        'alunos': rates,
+        'histograma': daily_histogram(professor_id),
+        'em_risco': {
+            'ultimas_aulas': last_classes,
+            'limite': threshold,
+            'alunos': at_risk(professor_id, last_classes, threshold),
+        },
+    }
+    roster_cache.set(key, (version, report))
+    return report
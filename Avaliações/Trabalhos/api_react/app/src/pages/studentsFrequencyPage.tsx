@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from "react";
-import axios from "../utils/axiosConfig.tsx";
+import axios, { openEvents } from "../utils/axiosConfig.tsx";
 import { Table, Alert, Card, Spin } from "antd";
 import "tailwindcss/tailwind.css";
 
@@ -13,31 +13,40 @@ const StudentsFrequencyControl = () => {
   const [error, setError] = useState("");
   const [success, setSuccess] = useState("");
 
-  useEffect(() => {
-    const fetchTeachers = async () => {
-      try {
-        const response = await axios.get("/api/chamada");
-        console.log(response.data);
-        const dict_to_array = Object.keys(response.data.teachers).map(
-          (key) => {
-            return {
-              name: key,
-              frequency: response.data.teachers[key],
-            };
-          }
-        );
+  const fetchTeachers = async () => {
+    try {
+      const response = await axios.get("/api/chamada");
+      console.log(response.data);
+      const dict_to_array = Object.keys(response.data.teachers).map(
+        (key) => {
+          return {
+            name: key,
+            frequency: response.data.teachers[key],
+          };
+        }
+      );
 
-        setTeachers(dict_to_array);
-        setLoading(false);
-      } catch (err) {
-        setError("Failed to fetch teachers");
-        setLoading(false);
-      }
-    };
+      setTeachers(dict_to_array);
+      setLoading(false);
+    } catch (err) {
+      setError("Failed to fetch teachers");
+      setLoading(false);
+    }
+  };
 
+  useEffect(() => {
     fetchTeachers();
   }, []);
 
+  // Recarrega quando um professor registra presença ou altera a turma
+  useEffect(() => {
+    const source = openEvents();
+    ["adicionado", "atualizado", "removido", "resync"].forEach((tipo) => {
+      source.addEventListener(tipo, fetchTeachers);
+    });
+    return () => source.close();
+  }, []);
+
   useEffect(() => {
     if (error || success) {
       const timer = setTimeout(() => {
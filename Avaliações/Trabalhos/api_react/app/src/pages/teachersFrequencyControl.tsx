@@ -1,11 +1,12 @@
-import React, { useState, useEffect } from "react";
-import axios from "../utils/axiosConfig.tsx";
+import React, { useState, useEffect, useRef } from "react";
+import axios, { openEvents } from "../utils/axiosConfig.tsx";
 import { Table, Alert, Card, Spin, Button, Form, Input, Modal } from "antd";
 import { QRCodeCanvas } from "qrcode.react";
 import "tailwindcss/tailwind.css";
 
 const TeachersFrequencyControl = () => {
   interface Student {
+    id: number;
     nome: string;
     matricula: string;
     presencas: number;
@@ -17,30 +18,94 @@ const TeachersFrequencyControl = () => {
   const [success, setSuccess] = useState("");
   const [qrCodeVisible, setQrCodeVisible] = useState(false);
   const [qrCodeValue, setQrCodeValue] = useState("");
+  // Versão da lista já aplicada, para buscar só o que mudou depois dela
+  const versao = useRef<number | null>(null);
 
-  useEffect(() => {
-    const fetchStudents = async () => {
-      try {
-        const response = await axios.get("/api/chamada");
-        let alunos = response.data.alunos;
-        const dict_to_array = Object.keys(alunos).map((key) => {
-          return {
-            nome: key,
-            matricula: alunos[key].matricula,
-            presencas: alunos[key].presencas,
+  // Busca o que mudou depois da versão local
+  const fetchChanges = async () => {
+    const desde = versao.current;
+    // Sem versão (lista ainda vazia), ?desde= devolveria a lista inteira
+    if (!desde) return fetchStudents();
+    try {
+      const response = await axios.get(`/api/chamada?desde=${desde}`);
+      applyChanges(response.data, desde);
+    } catch (err) {
+      fetchStudents();
+    }
+  };
+
+  // URL de uma mutação pedindo as alterações desde a versão local
+  const withSince = (url: string, desde: number | null) =>
+    desde === null ? url : `${url}?desde=${desde}`;
+
+  // Aplica uma resposta com as alterações desde a versão ``desde``, sem
+  // buscar a lista inteira. Se a versão local mudou enquanto a requisição
+  // estava em andamento (evento de outra aba, outra mutação), a resposta não
+  // continua a lista local e as alterações são buscadas de novo
+  const applyChanges = (data, desde: number | null) => {
+    if (!data.alteracoes) return;
+    if (desde === null || versao.current !== desde) return fetchChanges();
+    versao.current = data.versao;
+    const alteracoes = data.alteracoes;
+    // Pelo id: nomes podem se repetir e mudar
+    setStudents((current) => {
+      const byId = {};
+      current.forEach((student) => {
+        byId[student.id] = student;
+      });
+      alteracoes.removidos.forEach((id) => {
+        delete byId[id];
+      });
+      [alteracoes.adicionados, alteracoes.atualizados].forEach((alunos) => {
+        Object.keys(alunos).forEach((nome) => {
+          byId[alunos[nome].id] = {
+            id: alunos[nome].id,
+            nome: nome,
+            matricula: alunos[nome].matricula,
+            presencas: alunos[nome].presencas,
           };
         });
-        setStudents(dict_to_array);
-        setLoading(false);
-      } catch (err) {
-        setError("Failed to fetch students");
-        setLoading(false);
-      }
-    };
+      });
+      return Object.values(byId);
+    });
+  };
 
+  const fetchStudents = async () => {
+    try {
+      const response = await axios.get("/api/chamada");
+      versao.current = response.data.versao;
+      let alunos = response.data.alunos;
+      const dict_to_array = Object.keys(alunos).map((key) => {
+        return {
+          id: alunos[key].id,
+          nome: key,
+          matricula: alunos[key].matricula,
+          presencas: alunos[key].presencas,
+        };
+      });
+      setStudents(dict_to_array);
+      setLoading(false);
+    } catch (err) {
+      setError("Failed to fetch students");
+      setLoading(false);
+    }
+  };
+
+  useEffect(() => {
     fetchStudents();
   }, []);
 
+  // Alterações feitas em outra aba ou pelo QR code chegam pelo stream de eventos
+  useEffect(() => {
+    const source = openEvents();
+    ["adicionado", "atualizado", "removido"].forEach((tipo) => {
+      source.addEventListener(tipo, fetchChanges);
+    });
+    // O servidor descartou eventos (cliente lento): recarrega a lista inteira
+    source.addEventListener("resync", fetchStudents);
+    return () => source.close();
+  }, []);
+
   useEffect(() => {
     if (error || success) {
       const timer = setTimeout(() => {
@@ -51,46 +116,26 @@ const TeachersFrequencyControl = () => {
     }
   }, [error, success]);
 
-  const handleAddPresence = async (matricula, name) => {
+  const handleAddPresence = async (id, name) => {
+    const desde = versao.current;
     try {
-      await axios.post(`/api/presenca/${name}/${matricula}`);
+      const response = await axios.post(withSince(`/api/chamada/alunos/${id}/presenca`, desde));
       setSuccess(`Presence of ${name} recorded successfully`);
       setError("");
-      // Refresh the students list
-      const response = await axios.get("/api/chamada");
-      let alunos = response.data.alunos;
-      const dict_to_array = Object.keys(alunos).map((key) => {
-        return {
-          nome: key,
-          matricula: alunos[key].matricula,
-          presencas: alunos[key].presencas,
-        };
-      });
-      setStudents(dict_to_array);
+      applyChanges(response.data, desde);
     } catch (err) {
       setError(`Failed to record presence for ${name}`);
       setSuccess("");
     }
   };
 
-  const handleRemoveStudent = async (name) => {
+  const handleRemoveStudent = async (id, name) => {
+    const desde = versao.current;
     try {
-      const r = await axios.delete(`/api/chamada/${name}`);
-      console.log(r.data);
+      const response = await axios.delete(withSince(`/api/chamada/alunos/${id}`, desde));
       setSuccess(`Student ${name} removed successfully`);
       setError("");
-      // Refresh the students list
-      const response = await axios.get("/api/chamada");
-      let alunos = response.data.alunos;
-      const dict_to_array = Object.keys(alunos).map((key) => {
-        return {
-          nome: key,
-          matricula: alunos[key].matricula,
-          presencas: alunos[key].presencas,
-        };
-      });
-
-      setStudents(dict_to_array);
+      applyChanges(response.data, desde);
     } catch (err) {
       setError(`Failed to remove student ${name}`);
       setSuccess("");
@@ -98,24 +143,16 @@ const TeachersFrequencyControl = () => {
   };
 
   const handleAddStudent = async (values) => {
+    const desde = versao.current;
     try {
-      await axios.post("/api/chamada", {
+      const response = await axios.post(withSince("/api/chamada", desde), {
         nome: values.nome,
         matricula: values.matricula,
         type: "Adicionar",
       });
       setSuccess("Student added successfully");
       setError("");
-      // Refresh the students list
-      const response = await axios.get("/api/chamada");
-      const dict_to_array = Object.keys(response.data.alunos).map((key) => {
-        return {
-          nome: key,
-          matricula: response.data.alunos[key].matricula,
-          presencas: response.data.alunos[key].presencas,
-        };
-      });
-      setStudents(dict_to_array);
+      applyChanges(response.data, desde);
     } catch (err) {
       setError("Failed to add student");
       setSuccess("");
@@ -161,13 +198,13 @@ const TeachersFrequencyControl = () => {
         <div className="flex gap-2">
           <Button
             type="primary"
-            onClick={() => handleAddPresence(record.matricula, record.nome)}
+            onClick={() => handleAddPresence(record.id, record.nome)}
           >
             Add
           </Button>
           <Button
             type="primary" danger
-            onClick={() => handleRemoveStudent(record.nome)}
+            onClick={() => handleRemoveStudent(record.id, record.nome)}
           >
             Remove
           </Button>
@@ -195,7 +232,7 @@ const TeachersFrequencyControl = () => {
               <Table
                 dataSource={students}
                 columns={columns}
-                rowKey="nome"
+                rowKey="id"
                 pagination={false}
                 className="bg-lightgray"
               />
@@ -17,4 +17,28 @@ axiosInstance.interceptors.request.use(
   }
 );
 
+// Falhas seguidas de conexão antes de desistir do stream de eventos
+const MAX_EVENT_ERRORS = 3;
+
+// Alterações da chamada em tempo real (Server-Sent Events). O EventSource
+// não envia cabeçalhos, então o token vai na query string.
+// Sem stream (204 do servidor Flask, 401, 503 ou erros de rede seguidos) a
+// conexão é fechada em vez de reconectar para sempre; as páginas continuam
+// com as respostas das próprias mutações.
+export const openEvents = () => {
+  const token = localStorage.getItem('token') || '';
+  const source = new EventSource(`${axiosInstance.defaults.baseURL}api/eventos?token=${encodeURIComponent(token)}`);
+  let errors = 0;
+  source.addEventListener('open', () => {
+    errors = 0;
+  });
+  source.addEventListener('error', () => {
+    errors += 1;
+    if (source.readyState === EventSource.CLOSED || errors >= MAX_EVENT_ERRORS) {
+      source.close();
+    }
+  });
+  return source;
+};
+
 export default axiosInstance;
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""Arquivamento das presenças por período letivo.
+
+A tabela ``presenca`` recebe todas as escritas do dia a dia e cresce para
+sempre. Depois que um período letivo (semestre) termina, as suas presenças
+não mudam mais: ``archive_terms`` as move em bloco, um período por
+transação, para ``presenca_arquivo`` (WITHOUT ROWID, chave (relação, dia))
+e registra o período em ``periodo_arquivado``.
+
+Os contadores de ProfessorAluno já incluem as presenças arquivadas, então as
+listas de chamada não mudam. As consultas que precisam dos dias de presença
+(indicadores, counters.py) usam ``presences``, que une as duas tabelas; a
+exportação (``operations.iter_attendance_history``) intercala as duas.
+
+Apenas períodos encerrados são arquivados, e as presenças são sempre
+registradas no dia atual, então uma presença nova nunca cai num período
+arquivado.
+
+Uso:
+    python archive.py                # arquiva todos os períodos encerrados
+    python archive.py --ate 2024-1   # arquiva até o período informado (inclusive)
+    python archive.py --listar       # períodos já arquivados
+"""
+import argparse
+import logging
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import engine, ensure_schema
+from models import ProfessorAluno, Presenca, PresencaArquivo, PeriodoArquivado
+
+logger = logging.getLogger(__name__)
+
+def term_of(dia: date):
+    """Período letivo de um dia: 'AAAA-1' (janeiro a junho) ou 'AAAA-2' (julho a dezembro)."""
+    return f'{dia.year}-{1 if dia.month <= 6 else 2}'
+
+def term_bounds(periodo: str):
+    """Primeiro e último dia de um período no formato de ``term_of``."""
+    try:
+        year, half = (int(part) for part in periodo.split('-'))
+    except ValueError:
+        raise ValueError(f"Período inválido: {periodo!r} (use AAAA-1 ou AAAA-2)")
+    if half == 1:
+        return date(year, 1, 1), date(year, 6, 30)
+    if half == 2:
+        return date(year, 7, 1), date(year, 12, 31)
+    raise ValueError(f"Período inválido: {periodo!r} (use AAAA-1 ou AAAA-2)")
+
+def next_term(periodo: str):
+    return term_of(term_bounds(periodo)[1] + timedelta(days=1))
+
+def presences(*criteria, start=None, end=None):
+    """Subconsulta (professor_aluno_id, dia) com as presenças ativas e arquivadas.
+
+    ``criteria`` são condições sobre ProfessorAluno (por exemplo
+    ``ProfessorAluno.professor_id == 1``); são aplicadas dentro de cada lado
+    do UNION ALL, para que as duas tabelas sejam lidas pelos seus índices.
+    ``start`` e ``end`` limitam o intervalo de dias (inclusive).
+    """
+    branches = []
+    for table in (Presenca, PresencaArquivo):
+        query = select(table.professor_aluno_id, table.dia)
+        if criteria:
+            query = query.join(ProfessorAluno, table.professor_aluno_id == ProfessorAluno.id).where(*criteria)
+        if start is not None:
+            query = query.where(table.dia >= start)
+        if end is not None:
+            query = query.where(table.dia <= end)
+        branches.append(query)
+    return union_all(*branches).subquery('presencas')
+
+def archive_term(periodo: str):
+    """Move as presenças de um período encerrado para presenca_arquivo numa única transação.
+
+    Retorna o número de presenças movidas. Repetir o arquivamento de um
+    período é seguro: só move o que ainda estiver em presenca.
+    """
+    inicio, fim = term_bounds(periodo)
+    if fim >= term_bounds(term_of(datetime.utcnow().date()))[0]:
+        raise ValueError(f"O período {periodo} ainda não terminou")
+
+    in_term = Presenca.dia.between(inicio, fim)
+    with engine.begin() as conn:
+        moved = conn.execute(
+            insert(PresencaArquivo).prefix_with('OR IGNORE')
+            .from_select(['professor_aluno_id', 'dia'], select(Presenca.professor_aluno_id, Presenca.dia).where(in_term))
+        ).rowcount
+        conn.execute(delete(Presenca).where(in_term))
+        conn.execute(
+            sqlite_insert(PeriodoArquivado)
+            .values(periodo=periodo, inicio=inicio, fim=fim, presencas=moved, arquivado_em=datetime.utcnow())
+            .on_conflict_do_update(index_elements=['periodo'], set_={
+                'presencas': PeriodoArquivado.presencas + moved,
+                'arquivado_em': datetime.utcnow(),
+            })
+        )
+    return moved
+
+def archive_terms(until: str = None, log=logger.info):
+    """Arquiva, do mais antigo ao mais recente, os períodos encerrados até ``until`` (inclusive).
+
+    Sem ``until`` arquiva todos os períodos anteriores ao atual. Retorna
+    {período: presenças movidas}.
+    """
+    current = term_of(datetime.utcnow().date())
+    if until is not None and term_bounds(until)[1] >= term_bounds(current)[0]:
+        raise ValueError(f"O período {until} ainda não terminou")
+    limit = next_term(until) if until is not None else current
+
+    with engine.connect() as conn:
+        oldest = conn.execute(select(func.min(Presenca.dia))).scalar()
+    if oldest is None:
+        return {}
+
+    moved = {}
+    periodo = term_of(oldest)
+    while term_bounds(periodo)[0] < term_bounds(limit)[0]:
+        moved[periodo] = archive_term(periodo)
+        log(f"{periodo}: {moved[periodo]} presença(s) arquivada(s)")
+        periodo = next_term(periodo)
+    return moved
+
+def archived_terms():
+    """Períodos já arquivados, do mais antigo ao mais recente."""
+    with engine.connect() as conn:
+        return conn.execute(select(PeriodoArquivado).order_by(PeriodoArquivado.periodo)).all()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Arquiva as presenças de períodos letivos encerrados.')
+    parser.add_argument('--ate', help='último período a arquivar (AAAA-1 ou AAAA-2); padrão: o anterior ao atual')
+    parser.add_argument('--listar', action='store_true', help='lista os períodos já arquivados')
+    args = parser.parse_args(argv)
+
+    ensure_schema()
+    if args.listar:
+        for row in archived_terms():
+            print(f"{row.periodo}  {row.inicio} a {row.fim}  {row.presencas} presença(s)  "
+                  f"arquivado em {row.arquivado_em:%Y-%m-%d %H:%M}")
+        return 0
+
+    try:
+        moved = archive_terms(args.ate, log=print)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"{sum(moved.values())} presença(s) arquivada(s) em {len(moved)} período(s).")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""Ponto de entrada ASGI da API, alternativo ao servidor Flask de main.py.
+
+As rotas mais usadas pelo app React (login, cadastro, lista de chamada e
+registro de presença) e o stream de eventos (SSE) têm handlers assíncronos
+sobre ``async_operations``, então um único processo mantém milhares de
+conexões ociosas ou lentas sem ocupar uma thread por conexão. As demais rotas (importação, exportação,
+indicadores, presença em lote e a lista paginada) continuam atendidas pelo
+app Flask de main.py, montado como fallback WSGI. O contrato JSON é o mesmo
+nos dois servidores.
+
+    uvicorn asgi:app --port 5000
+"""
+import contextlib
+import datetime
+
+import jwt
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import admission
+import async_operations as operations
+import compression
+import events
+import main
+import metrics
+import serialization
+from passwords import HashingBusy
+
+flask_app = main.create_app()
+SECRET_KEY = flask_app.config['SECRET_KEY']
+wsgi_fallback = WSGIMiddleware(flask_app)
+
+class FlaskJSONResponse(JSONResponse):
+    """JSON serializado como o ``jsonify`` do app Flask (ver serialization.py)."""
+
+    def render(self, content):
+        return serialization.dumps(content)
+
+def error(message: str, status_code: int):
+    return FlaskJSONResponse({"error": message}, status_code)
+
+def get_decoded_token(request: Request, allow_query: bool = False):
+    """Mesmo tratamento de ``main.get_decoded_token``, compartilhando o cache de tokens."""
+    token = request.headers.get('Authorization')
+    if not token and allow_query and request.query_params.get('token'):
+        token = f"Bearer {request.query_params['token']}"
+    if not token:
+        return None, error("Unauthorized, please provide a token.", 401)
+
+    try:
+        if token.startswith("Bearer "):
+            token = token.split(" ")[1]
+        else:
+            return None, error("Invalid token format, please provide a Bearer token.", 401)
+
+        decoded_token = main.token_cache.get(SECRET_KEY, token)
+        if decoded_token is None:
+            decoded_token = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+            main.token_cache.put(SECRET_KEY, token, decoded_token)
+        return decoded_token, None
+    except jwt.ExpiredSignatureError:
+        return None, error("Token expired, please log in again.", 401)
+    except jwt.InvalidTokenError:
+        return None, error("Invalid token, please log in again.", 401)
+
+def not_modified(request: Request, etag: str):
+    """Resposta 304 se o cliente já tem a versão ``etag``; senão None."""
+    if_none_match = request.headers.get('if-none-match', '')
+    tags = {tag.strip().removeprefix('W/').strip('"') for tag in if_none_match.split(',')}
+    if '*' in tags or etag in tags:
+        return Response(status_code=304, headers={'ETag': f'"{etag}"'})
+    return None
+
+def query_int(request: Request, name: str):
+    """Como ``request.args.get(name, type=int)`` do Flask: None se ausente ou inválido."""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return None
+
+async def changes_baseline(request: Request, professor_id: int):
+    """Versão a partir da qual as mutações devolvem as alterações (ver ``main.changes_baseline``)."""
+    since = query_int(request, 'desde')
+    return since if since is not None else await operations.roster_version(professor_id)
+
+async def with_changes(payload: dict, professor_id: int, since: int):
+    """Acrescenta a nova versão e as alterações desde ``since`` à resposta de uma mutação."""
+    payload['versao'] = await operations.roster_version(professor_id)
+    payload['alteracoes'] = await operations.roster_delta(professor_id, since)
+    return FlaskJSONResponse(payload)
+
+def token_response(message: str, user):
+    # Cria o token JWT com payload contendo informações do usuário
+    token = jwt.encode({
+        'user_id': user.id,
+        'username': user.nome,
+        'matricula': user.matricula,
+        'isTeacher': user.isTeacher,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, SECRET_KEY, algorithm="HS256").decode('UTF-8')
+
+    return FlaskJSONResponse({
+        "message": message,
+        "token": token,
+        "user": {
+            "nome": user.nome,
+            "matricula": user.matricula,
+            "isTeacher": user.isTeacher
+        }
+    })
+
+async def admit(request: Request, route: str):
+    """Controle de admissão (ver admission.py) de um handler assíncrono.
+
+    Retorna ``(resposta, escrita)``: a resposta de recusa (429/503) ou None,
+    e se a requisição ocupou uma vaga de escrita, a devolver ao final.
+    """
+    decoded_token, _ = get_decoded_token(request, allow_query=route == '/api/eventos')
+    user_id = decoded_token['user_id'] if decoded_token else None
+    ip = request.client.host if request.client else None
+    wait, write = admission.controller.check(route, request.method, user_id, ip)
+    if wait:
+        return FlaskJSONResponse({"error": admission.RATE_LIMITED_MESSAGE}, 429,
+                                 headers={"Retry-After": admission.retry_after(wait)}), False
+    if write and not await admission.controller.gate.acquire_async():
+        admission.controller.busy()
+        return FlaskJSONResponse({"error": admission.BUSY_MESSAGE}, 503, headers={"Retry-After": "1"}), False
+    return None, write
+
+def compressed(request: Request, response: Response):
+    """Comprime uma resposta completa de um handler assíncrono (ver compression.py)."""
+    if isinstance(response, StreamingResponse):
+        return response
+    if not compression.should_compress(response.status_code, response.headers.get('content-type'),
+                                       len(response.body), 'content-encoding' in response.headers):
+        return response
+    response.headers.add_vary_header('Accept-Encoding')
+    encoding = compression.choose_encoding(request.headers.get('accept-encoding'))
+    if encoding is None:
+        return response
+    response.body = compression.compress(response.body, encoding)
+    response.headers['content-encoding'] = encoding
+    response.headers['content-length'] = str(len(response.body))
+    if 'etag' in response.headers:
+        response.headers['etag'] = compression.weak_etag(response.headers['etag'])
+    return response
+
+def instrumented(endpoint, route: str):
+    """Aplica o controle de admissão, a compressão e as métricas de ``metrics`` a um handler assíncrono.
+
+    As rotas atendidas pelo fallback passam por eles no próprio app Flask.
+    """
+    async def handler(request: Request):
+        state = metrics.begin_request()
+        status = 500
+        write = False
+        try:
+            response, write = await admit(request, route)
+            if response is None:
+                response = compressed(request, await endpoint(request))
+            status = response.status_code
+            return response
+        except HashingBusy:
+            status = 503
+            raise
+        finally:
+            if write:
+                admission.controller.gate.release()
+            metrics.end_request(state, request.method, route, status)
+    return handler
+
+async def user(request: Request):
+    return FlaskJSONResponse({"message": f"Hello, {request.path_params['username']}!"})
+
+async def about(request: Request):
+    return FlaskJSONResponse({"message": 'This is the about page.'})
+
+async def chamada(request: Request):
+    decoded_token, error_response = get_decoded_token(request)
+    if error_response:
+        return error_response
+
+    user_id = decoded_token['user_id']
+    is_teacher = decoded_token['isTeacher']
+
+    if not is_teacher:
+        version = await operations.student_version(user_id)
+        etag = f'aluno-{user_id}-{version}'
+        response = not_modified(request, etag)
+        if response is None:
+            teachers = await operations.retrieve_professors_for_students(user_id, version)
+            response = FlaskJSONResponse({"teachers": teachers, "versao": version}, headers={'ETag': f'"{etag}"'})
+        return response
+
+    if request.method == 'POST':
+        since = await changes_baseline(request, user_id)
+        data = await request.json()
+        if data['type'] == 'Adicionar':
+            novo_nome = data['nome']
+            nova_matricula = data['matricula']
+
+            existing_user = await operations.get_user_by_nome_matricula(nova_matricula, nome=novo_nome)
+
+            if existing_user:
+                if existing_user.isTeacher:
+                    return error("Matrícula já existente para um professor", 400)
+
+                if await operations.add_professor_student_relationship_if_exists(user_id, nova_matricula, novo_nome):
+                    return await with_changes({"message": "Relação com aluno existente adicionada com sucesso"}, user_id, since)
+                return error("Erro ao adicionar relação com aluno existente", 500)
+
+            aluno = await operations.create_user(nome=novo_nome, senha='default_password', email=f'{novo_nome}@example.com',
+                                                 matricula=nova_matricula, isTeacher=False)
+            if aluno:
+                if await operations.add_professor_student_relationship_if_exists(user_id, aluno.matricula, aluno.nome):
+                    return await with_changes({"message": "Novo aluno criado e relação adicionada com sucesso"}, user_id, since)
+                return error("Erro ao adicionar relação com novo aluno", 500)
+            return error("Erro ao criar novo aluno", 500)
+
+    version = await operations.roster_version(user_id)
+    etag = f'professor-{user_id}-{version}'
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    since = query_int(request, 'desde')
+    if since:
+        # Sincronização incremental: apenas o que mudou desde a versão informada
+        payload = {"versao": version, "alteracoes": await operations.roster_delta(user_id, since)}
+    else:
+        payload = {"alunos": await operations.retrieve_students_for_professor(user_id, version), "versao": version}
+    return FlaskJSONResponse(payload, headers={'ETag': f'"{etag}"'})
+
+class ChamadaApp:
+    """/api/chamada como app ASGI: a lista paginada (``?limite=``) fica com o app Flask."""
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        if request.method == 'GET' and 'limite' in request.query_params:
+            await wsgi_fallback(scope, receive, send)
+            return
+        response = await instrumented(chamada, '/api/chamada')(request)
+        await response(scope, receive, send)
+
+async def remove_user(request: Request):
+    decoded_token, error_response = get_decoded_token(request)
+    if error_response:
+        return error_response
+
+    nome = request.path_params['nome']
+    professor_id = decoded_token['user_id']
+    since = await changes_baseline(request, professor_id)
+
+    if await operations.remove_professor_aluno_relationship(professor_id, nome):
+        return await with_changes({"message": f"Relação com {nome} removida com sucesso"}, professor_id, since)
+    return error(f"Falha ao remover relação com {nome}", 500)
+
+async def record_presence(request: Request):
+    decoded_token, error_response = get_decoded_token(request)
+    if error_response:
+        return error_response
+
+    nome = request.path_params['nome']
+    professor_id = decoded_token['user_id']
+    since = await changes_baseline(request, professor_id)
+    aluno = await operations.get_user_by_nome_matricula(request.path_params['matricula'], nome)
+    if aluno is not None:
+        professor_aluno_id = await operations.get_professor_aluno_id(professor_id, aluno.id)
+        if professor_aluno_id is not None:
+            created = await operations.record_presence(professor_aluno_id)
+            if created:
+                return await with_changes({"message": f"Presença de {nome} registrada com sucesso", "nova": True},
+                                          professor_id, since)
+            if created is False:
+                return await with_changes({"message": f"Presença de {nome} já registrada hoje", "nova": False},
+                                          professor_id, since)
+            return error(f"Falha ao registrar presença de {nome}", 500)
+    return error(f"Aluno {nome} não encontrado", 404)
+
+async def events_stream(request: Request):
+    decoded_token, error_response = get_decoded_token(request, allow_query=True)
+    if error_response:
+        return error_response
+
+    try:
+        subscription = events.broker.subscribe(*events.topics_for(decoded_token['user_id'],
+                                                                  decoded_token['isTeacher']))
+    except events.TooManySubscribers:
+        return FlaskJSONResponse({"error": "Servidor ocupado, tente novamente em instantes."}, 503,
+                                 headers={"Retry-After": "5"})
+    return StreamingResponse(events.stream_async(subscription, events.deadline_for(decoded_token)),
+                             media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+async def login(request: Request):
+    data = await request.json()
+    user = await operations.login(matricula=data['matricula'], senha=data['password'])
+    if user:
+        return token_response("Login bem-sucedido", user)
+    return error("Matrícula ou senha inválidos", 401)
+
+async def signin(request: Request):
+    data = await request.json()
+    user = await operations.create_user(nome=data['name'], senha=data['password'], email=data['email'],
+                                        matricula=data['studentNumber'], isTeacher=data['isTeacher'])
+    if user:
+        return token_response("Usuário criado com sucesso", user)
+    return error("Não foi possível criar o usuário.", 500)
+
+async def hashing_busy(request: Request, exc: HashingBusy):
+    # Fila de hash de senhas cheia: o cliente deve tentar de novo em instantes
+    return FlaskJSONResponse({"error": "Servidor ocupado, tente novamente em instantes."}, 503,
+                             headers={"Retry-After": "1"})
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await operations.dispose()
+
+app = Starlette(
+    routes=[
+        Route('/api/user/{username}', instrumented(user, '/api/user/<username>'), methods=['GET']),
+        Route('/api/about', instrumented(about, '/api/about'), methods=['GET']),
+        Route('/api/chamada', ChamadaApp(), methods=['GET', 'POST', 'DELETE']),
+        Route('/api/chamada/{nome}', instrumented(remove_user, '/api/chamada/<nome>'), methods=['DELETE']),
+        Route('/api/presenca/{nome}/{matricula}', instrumented(record_presence, '/api/presenca/<nome>/<matricula>'),
+              methods=['POST']),
+        Route('/api/eventos', instrumented(events_stream, '/api/eventos'), methods=['GET']),
+        Route('/api/login', instrumented(login, '/api/login'), methods=['POST']),
+        Route('/api/signin', instrumented(signin, '/api/signin'), methods=['POST']),
+        # Demais rotas (importar, exportar, analytics, presença em lote, ...)
+        Mount('/', wsgi_fallback),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    exception_handlers={HashingBusy: hashing_busy},
+    lifespan=lifespan,
+)
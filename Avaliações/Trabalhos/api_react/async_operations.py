@@ -0,0 +1,219 @@
+"""Operações assíncronas usadas pelas rotas de asgi.py.
+
+Mesmas regras de ``operations`` (contadores, log de alterações, cache da
+lista de chamada), mas executadas com o driver aiosqlite pela extensão
+asyncio do SQLAlchemy: enquanto uma consulta espera o SQLite, o event loop
+continua atendendo as outras conexões.
+
+Depois do commit, as escritas publicam as alterações em ``events`` para as
+conexões SSE, como as de ``operations``.
+
+As consultas mais longas são compartilhadas com ``operations`` via
+``AsyncSession.run_sync``. As escritas passam por um lock para manter um
+único escritor por processo, como o pool de escrita de ``database``.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import db_path, production, read_pool_size, _set_pragmas
+from models import User, ProfessorAluno, AlteracaoChamada
+from passwords import HashingBusy, hash_password_async, needs_upgrade, verify_password_async
+from cache import roster_cache, professor_key, aluno_key, invalidate_relationship
+import events
+from operations import (_add_presence, _log_change, _professors_for_student,
+                        _roster_delta, _students_for_professor)
+
+logger = logging.getLogger(__name__)
+
+async_engine = create_async_engine('sqlite+aiosqlite:///' + db_path)
+event.listen(async_engine.sync_engine, 'connect', lambda conn, record: _set_pragmas(conn, read_only=False))
+
+if production:
+    async_read_engine = create_async_engine(f'sqlite+aiosqlite:///file:{db_path}?mode=ro&uri=true',
+                                            pool_size=read_pool_size, max_overflow=read_pool_size)
+    event.listen(async_read_engine.sync_engine, 'connect', lambda conn, record: _set_pragmas(conn, read_only=True))
+else:
+    async_read_engine = async_engine
+
+Session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+ReadSession = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+# Um escritor por vez; as demais corrotinas esperam aqui em vez de no lock do SQLite
+_write_lock = asyncio.Lock()
+
+async def get_user_by_nome_matricula(matricula: str, nome: str):
+    """Recupera um usuário pelo número de matrícula e nome."""
+    try:
+        async with ReadSession() as session:
+            return await session.scalar(select(User).filter_by(matricula=matricula, nome=nome).limit(1))
+    except Exception as e:
+        logger.error("Erro ao recuperar usuário por matrícula: %s", e)
+        return None
+
+async def create_user(nome: str, senha: str, email: str, matricula: str, isTeacher: bool):
+    """Cria um novo usuário no banco de dados, guardando apenas o hash da senha."""
+    senha = await hash_password_async(senha)
+    try:
+        async with _write_lock, Session() as session:
+            user = User(nome=nome, senha=senha, email=email, matricula=matricula, isTeacher=isTeacher)
+            session.add(user)
+            await session.commit()
+        roster_cache.invalidate(professor_key(user.id), aluno_key(user.id))
+        return user
+    except Exception as e:
+        logger.error("Erro ao criar usuário: %s", e)
+        return None
+
+async def login(matricula: str, senha: str):
+    """Realiza o login verificando a matrícula e a senha (ver ``operations.login``)."""
+    try:
+        async with ReadSession() as session:
+            user = await session.scalar(select(User).filter_by(matricula=matricula).limit(1))
+        # Matrícula inexistente também paga um hash (ver passwords.py)
+        if not await verify_password_async(senha, user.senha if user is not None else None):
+            return None
+        if needs_upgrade(user.senha):
+            user.senha = await hash_password_async(senha)
+            async with _write_lock, Session() as session:
+                await session.execute(update(User).where(User.id == user.id).values(senha=user.senha))
+                await session.commit()
+        return user
+    except HashingBusy:
+        raise
+    except Exception as e:
+        logger.error("Erro ao realizar login: %s", e)
+        return None
+
+async def add_professor_student_relationship_if_exists(professor_id: int, matricula: str, nome: str):
+    """Adiciona uma relação entre um professor e um aluno se o aluno existir."""
+    try:
+        async with _write_lock, Session() as session:
+            user = await session.scalar(select(User).filter_by(matricula=matricula, nome=nome).limit(1))
+            if user is None or user.isTeacher:
+                return False
+            exists = await session.scalar(select(ProfessorAluno.id)
+                                          .filter_by(professor_id=professor_id, aluno_id=user.id).limit(1))
+            if exists:
+                return True
+            session.add(ProfessorAluno(professor_id=professor_id, aluno_id=user.id))
+            _log_change(session, professor_id, user.id, 'adicionado')
+            await session.commit()
+        invalidate_relationship(professor_id, user.id)
+        events.publish_change('adicionado', professor_id, [user.id])
+        return True
+    except Exception as e:
+        logger.error("Erro ao adicionar relação professor-aluno: %s", e)
+        return False
+
+async def get_professor_aluno_id(professor_id: int, aluno_id: int):
+    """Obtém o ID da relação entre professor e aluno."""
+    try:
+        async with ReadSession() as session:
+            return await session.scalar(select(ProfessorAluno.id)
+                                        .filter_by(professor_id=professor_id, aluno_id=aluno_id).limit(1))
+    except Exception as e:
+        logger.error("Erro ao recuperar relação professor-aluno: %s", e)
+        return None
+
+async def record_presence(professor_aluno_id: int, dia: datetime = None):
+    """Registra a presença de um aluno em um dia específico (True se nova, ver ``operations.record_presence``)."""
+    try:
+        dia = dia or datetime.utcnow().date()
+        async with _write_lock, Session() as session:
+            created, professor_id, aluno_id = await session.run_sync(_add_presence, professor_aluno_id, dia)
+            await session.commit()
+        if created:
+            invalidate_relationship(professor_id, aluno_id)
+            events.publish_change('atualizado', professor_id, [aluno_id])
+        return created
+    except Exception as e:
+        logger.error("Erro ao registrar presença: %s", e)
+        return None
+
+async def remove_professor_aluno_relationship(professor_id: int, nome_aluno: str):
+    """Remove a relação entre um professor e um aluno, incluindo todas as presenças associadas."""
+    try:
+        async with _write_lock, Session() as session:
+            aluno_id = await session.scalar(select(User.id).filter_by(nome=nome_aluno).limit(1))
+            if aluno_id is None:
+                raise LookupError(f"Aluno {nome_aluno} não encontrado")
+            relationship_id = await session.scalar(select(ProfessorAluno.id)
+                                                   .filter_by(professor_id=professor_id, aluno_id=aluno_id).limit(1))
+            # Sem relação não há o que remover: sucesso, como em operations
+            if relationship_id is not None:
+                # As presenças da relação saem junto, pelo ON DELETE CASCADE do SQLite
+                await session.execute(delete(ProfessorAluno).where(ProfessorAluno.id == relationship_id))
+                _log_change(session, professor_id, aluno_id, 'removido')
+                await session.commit()
+        invalidate_relationship(professor_id, aluno_id)
+        if relationship_id is not None:
+            events.publish_change('removido', professor_id, [aluno_id])
+        return True
+    except Exception as e:
+        logger.error("Erro ao remover relação professor-aluno: %s", e)
+        return False
+
+async def roster_version(professor_id: int):
+    """Versão atual da lista de chamada de um professor (0 se nunca alterada)."""
+    async with ReadSession() as session:
+        return await session.scalar(select(func.max(AlteracaoChamada.id))
+                                    .where(AlteracaoChamada.professor_id == professor_id)) or 0
+
+async def student_version(aluno_id: int):
+    """Versão atual da lista de professores de um aluno (0 se nunca alterada)."""
+    async with ReadSession() as session:
+        return await session.scalar(select(func.max(AlteracaoChamada.id))
+                                    .where(AlteracaoChamada.aluno_id == aluno_id)) or 0
+
+async def retrieve_students_for_professor(professor_id: int, version: int = None):
+    """Lista de alunos de um professor com o número de presenças, usando o mesmo cache versionado."""
+    try:
+        if version is None:
+            version = await roster_version(professor_id)
+        cached = roster_cache.get(professor_key(professor_id))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        async with ReadSession() as session:
+            formatted_students = await session.run_sync(_students_for_professor, professor_id)
+        roster_cache.set(professor_key(professor_id), (version, formatted_students))
+        return formatted_students
+    except Exception as e:
+        logger.error("Erro ao recuperar alunos para o professor: %s", e)
+        return {}
+
+async def retrieve_professors_for_students(student_id: int, version: int = None):
+    """Lista de professores de um aluno com o número de presenças, usando o mesmo cache versionado."""
+    try:
+        if version is None:
+            version = await student_version(student_id)
+        cached = roster_cache.get(aluno_key(student_id))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        async with ReadSession() as session:
+            formatted_professors = await session.run_sync(_professors_for_student, student_id)
+        roster_cache.set(aluno_key(student_id), (version, formatted_professors))
+        return formatted_professors
+    except Exception as e:
+        logger.error("Erro ao recuperar professores para o aluno: %s", e)
+        return {}
+
+async def roster_delta(professor_id: int, since: int):
+    """Alterações na lista de um professor depois da versão ``since`` (ver ``operations.roster_delta``)."""
+    try:
+        async with ReadSession() as session:
+            return await session.run_sync(_roster_delta, professor_id, since)
+    except Exception as e:
+        logger.error("Erro ao recuperar alterações da lista de chamada: %s", e)
+        return None
+
+async def dispose():
+    """Fecha as conexões dos engines assíncronos (no encerramento do servidor)."""
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
@@ -0,0 +1,118 @@
+"""Benchmark do limite de escritas simultâneas (admission.py) num pico de presenças.
+
+Sobe o servidor Flask (uma thread por conexão) e dispara ondas de CLIENTS
+registros de presença ao mesmo tempo, cada um de um professor diferente,
+como no início das aulas. Compara o servidor sem o limite de escritas
+(WRITE_CONCURRENCY=0) com a configuração padrão, mostrando para cada um as
+latências das presenças registradas, as recusas (503 com Retry-After) e os
+erros.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_admission
+"""
+import asyncio
+import datetime
+import os
+import statistics
+import sys
+import time
+
+from benchmarks._common import fresh_db
+from benchmarks.bench_asgi import free_port, start_server
+
+import httpx
+import jwt
+
+from database import db_session
+from models import User, ProfessorAluno
+
+CLIENTS = 500
+WAVES = 2
+SECRET_KEY = 'bench-admission'
+
+SERVER = [sys.executable, '-c', 'import main; main.create_app().run(port={port}, threaded=True)']
+CONFIGS = {
+    'sem limite de escritas': {'WRITE_CONCURRENCY': '0'},
+    'limite padrão': {},
+}
+
+
+def seed():
+    """CLIENTS professores, cada um com um aluno por onda; retorna [(token, [ids dos alunos])]."""
+    fresh_db()
+    per_professor = WAVES * len(CONFIGS)
+    professors = [User(nome=f'prof{i}', senha='x', email=f'prof{i}@example.com', matricula=f'P{i}', isTeacher=True)
+                  for i in range(CLIENTS)]
+    alunos = [User(nome=f'aluno{i}', senha='x', email=f'aluno{i}@example.com', matricula=str(i), isTeacher=False)
+              for i in range(CLIENTS * per_professor)]
+    db_session.add_all(professors + alunos)
+    db_session.flush()
+    clients = []
+    for i, professor in enumerate(professors):
+        turma = alunos[i * per_professor:(i + 1) * per_professor]
+        db_session.add_all(ProfessorAluno(professor_id=professor.id, aluno_id=aluno.id) for aluno in turma)
+        clients.append((make_token(professor), [aluno.id for aluno in turma]))
+    db_session.commit()
+    db_session.remove()
+    return clients
+
+
+def make_token(professor):
+    return jwt.encode({
+        'user_id': professor.id,
+        'username': professor.nome,
+        'matricula': professor.matricula,
+        'isTeacher': True,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, SECRET_KEY, algorithm="HS256").decode('UTF-8')
+
+
+async def burst(port, requests):
+    """Todas as presenças ``[(token, aluno_id)]`` ao mesmo tempo; retorna [(status, ms)]."""
+    limits = httpx.Limits(max_connections=len(requests))
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=60) as client:
+        async def one(token, aluno_id):
+            start = time.perf_counter()
+            try:
+                response = await client.post(f'/api/chamada/alunos/{aluno_id}/presenca',
+                                             headers={'Authorization': f'Bearer {token}'})
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            return status, (time.perf_counter() - start) * 1000
+
+        return await asyncio.gather(*(one(token, aluno_id) for token, aluno_id in requests))
+
+
+def report(name, results, elapsed):
+    ok = [ms for status, ms in results if status == 200]
+    rejected = [ms for status, ms in results if status == 503]
+    errors = len(results) - len(ok) - len(rejected)
+    pct = statistics.quantiles(ok, n=100) if len(ok) > 1 else ok * 99
+    print(f"{name:<24} registradas={len(ok):<5} {len(ok) / elapsed:6.0f}/s  p50={pct[49]:7.1f} ms  "
+          f"p99={pct[98]:7.1f} ms  max={max(ok):7.1f} ms  recusadas={len(rejected):<4} "
+          f"(p50 {statistics.median(rejected) if rejected else 0:5.1f} ms)  erros={errors}")
+
+
+def main():
+    clients = seed()
+    print(f"{WAVES} ondas de {CLIENTS} presenças simultâneas")
+    for index, (name, env) in enumerate(CONFIGS.items()):
+        os.environ.update(env, SECRET_KEY=SECRET_KEY)
+        port = free_port()
+        process = start_server(SERVER, port)
+        try:
+            results = []
+            start = time.perf_counter()
+            for wave in range(WAVES):
+                requests = [(token, turma[index * WAVES + wave]) for token, turma in clients]
+                results.extend(asyncio.run(burst(port, requests)))
+            report(name, results, time.perf_counter() - start)
+        finally:
+            process.terminate()
+            process.wait()
+            for key in env:
+                del os.environ[key]
+
+
+if __name__ == '__main__':
+    main()
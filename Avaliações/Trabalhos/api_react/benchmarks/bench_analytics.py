@@ -0,0 +1,101 @@
+"""Benchmark dos indicadores de frequência sobre vários anos de histórico.
+
+Gera quatro anos de aulas (três por semana) para vários professores e
+compara ``analytics.professor_report`` (SQL, sem e com cache) com o cálculo
+ingênuo em Python sobre objetos Presenca do ORM.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_analytics
+"""
+import random
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from benchmarks._common import fresh_db
+
+from database import engine, read_session
+from models import User, ProfessorAluno, Presenca
+from cache import roster_cache
+import analytics
+
+PROFESSORS = 10
+STUDENTS_PER_PROFESSOR = 200
+YEARS = 4
+ATTENDANCE = 0.8
+
+
+def class_days():
+    day = date(2020, 2, 1)
+    end = day + timedelta(days=365 * YEARS)
+    while day < end:
+        if day.weekday() in (0, 2, 4):
+            yield day
+        day += timedelta(days=1)
+
+
+def seed():
+    fresh_db()
+    random.seed(42)
+    days = list(class_days())
+    users, relationships, presencas = [], [], []
+    for p in range(PROFESSORS):
+        professor_id = len(users) + 1
+        users.append({'id': professor_id, 'nome': f'prof{p}', 'senha': 'x', 'email': f'prof{p}@example.com',
+                      'matricula': f'P{p}', 'isTeacher': True})
+        for s in range(STUDENTS_PER_PROFESSOR):
+            aluno_id = len(users) + 1
+            users.append({'id': aluno_id, 'nome': f'aluno{p}_{s}', 'senha': 'x',
+                          'email': f'aluno{p}_{s}@example.com', 'matricula': f'{p}-{s}', 'isTeacher': False})
+            relationship_id = len(relationships) + 1
+            attended = [day for day in days if random.random() < ATTENDANCE]
+            relationships.append({'id': relationship_id, 'professor_id': professor_id, 'aluno_id': aluno_id,
+                                  'presencas_count': len(attended), 'ultima_presenca': attended[-1]})
+            presencas.extend({'professor_aluno_id': relationship_id, 'dia': day} for day in attended)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), users)
+        conn.execute(ProfessorAluno.__table__.insert(), relationships)
+        conn.execute(Presenca.__table__.insert(), presencas)
+    return len(presencas)
+
+
+def naive_report(professor_id, last_classes=10, threshold=0.75):
+    """Mesmo relatório com laços em Python sobre objetos do ORM (para comparação)."""
+    relationships = read_session.query(ProfessorAluno).filter_by(professor_id=professor_id).all()
+    per_student, per_day = {}, Counter()
+    for relationship in relationships:
+        days = {p.dia for p in read_session.query(Presenca).filter_by(professor_aluno_id=relationship.id)}
+        per_student[relationship.aluno_id] = days
+        per_day.update(days)
+    recent = sorted(per_day, reverse=True)[:last_classes]
+    return {
+        'total_aulas': len(per_day),
+        'em_risco': [aluno_id for aluno_id, days in per_student.items()
+                     if len(days.intersection(recent)) < threshold * len(recent)],
+    }
+
+
+def measure(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), result
+
+
+def main():
+    rows = seed()
+    print(f"{rows} presenças, {PROFESSORS} professores, {YEARS} anos")
+    roster_cache.clear()
+    sql_ms, report = measure(lambda: (roster_cache.clear(), analytics.professor_report(1))[1])
+    cached_ms, _ = measure(lambda: analytics.professor_report(1))
+    naive_ms, naive = measure(lambda: naive_report(1), repeat=1)
+    assert naive['total_aulas'] == report['total_aulas']
+    assert len(naive['em_risco']) == len(report['em_risco']['alunos'])
+    print(f"SQL (sem cache): {sql_ms:8.1f} ms")
+    print(f"SQL (com cache): {cached_ms:8.3f} ms")
+    print(f"Python/ORM:      {naive_ms:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark do arquivamento por período letivo (archive.py).
+
+Gera alguns anos de histórico com seed.py e mede, antes e depois de
+arquivar os períodos encerrados:
+
+* o espaço em disco de cada tabela e índice de presença (dbstat);
+* o relatório de frequência sem cache (``analytics.professor_report``);
+* a exportação completa do histórico de um professor;
+* o registro de presenças no dia atual;
+* a remoção de relações, cujas presenças saem por ON DELETE CASCADE.
+
+O relatório e a exportação precisam dar o mesmo resultado nos dois casos.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_archive
+"""
+import statistics
+import time
+
+from benchmarks._common import fresh_db
+
+from database import db_session, engine
+from models import User, ProfessorAluno
+from cache import roster_cache
+import analytics
+import archive
+import operations
+import seed
+
+PROFESSORS = 100
+STUDENTS = 2000
+TERMS_PER_STUDENT = 3
+YEARS = 3
+CLASSES_PER_WEEK = 2
+REMOVALS = 20
+
+
+def table_sizes():
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT name, sum(pgsize) FROM dbstat "
+            "WHERE name LIKE '%presenca%' AND name NOT LIKE '%professor_aluno_presencas' GROUP BY name"
+        ).all()
+    return {name: size / 1024 / 1024 for name, size in rows}
+
+
+def measure(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), result
+
+
+def report():
+    roster_cache.clear()
+    return analytics.professor_report(1)
+
+
+def export():
+    return list(operations.iter_attendance_history(1))
+
+
+def record_presences(relationship_ids):
+    times = []
+    for relationship_id in relationship_ids:
+        start = time.perf_counter()
+        operations.record_presence(relationship_id)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def remove_relationships(professor_id):
+    nomes = [nome for (nome,) in db_session.query(User.nome)
+             .join(ProfessorAluno, ProfessorAluno.aluno_id == User.id)
+             .filter(ProfessorAluno.professor_id == professor_id).limit(REMOVALS)]
+    times = []
+    for nome in nomes:
+        start = time.perf_counter()
+        operations.remove_professor_aluno_relationship(professor_id, nome)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def run(label, professor_for_removals):
+    sizes = table_sizes()
+    report_ms, result = measure(report)
+    export_ms, rows = measure(export)
+    relationship_ids = [pa_id for (pa_id,) in db_session.query(ProfessorAluno.id).filter_by(professor_id=2).limit(50)]
+    record_ms = record_presences(relationship_ids)
+    remove_ms = remove_relationships(professor_for_removals)
+    print(f"{label}:")
+    for name, size in sorted(sizes.items()):
+        print(f"  {name:<34} {size:8.1f} MB")
+    print(f"  relatório sem cache   {report_ms:8.1f} ms")
+    print(f"  exportação            {export_ms:8.1f} ms ({len(rows)} linhas)")
+    print(f"  registrar presença    {record_ms:8.2f} ms (mediana)")
+    print(f"  remover relação       {remove_ms:8.2f} ms (mediana, com as presenças)")
+    return result, rows
+
+
+def main():
+    fresh_db()
+    counts = seed.seed(PROFESSORS, STUDENTS, TERMS_PER_STUDENT, YEARS, CLASSES_PER_WEEK, log=lambda *_: None)
+    print(f"{counts['presenca']} presenças, {counts['professor_aluno']} relações, {YEARS} anos")
+
+    before = run("antes do arquivamento", professor_for_removals=3)
+
+    start = time.perf_counter()
+    moved = archive.archive_terms(log=lambda *_: None)
+    elapsed = time.perf_counter() - start
+    print(f"arquivamento: {sum(moved.values())} presenças de {len(moved)} períodos em {elapsed:.1f} s")
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+
+    after = run("depois do arquivamento", professor_for_removals=4)
+    assert before[0]['alunos'] == after[0]['alunos'] and before[0]['histograma'] == after[0]['histograma']
+    assert before[1] == after[1]
+
+
+if __name__ == '__main__':
+    main()
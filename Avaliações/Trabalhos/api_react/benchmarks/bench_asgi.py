@@ -0,0 +1,162 @@
+"""Benchmark lado a lado: servidor Flask (WSGI, uma thread por conexão) x asgi.py.
+
+Sobe os dois servidores contra o mesmo banco temporário e mede GET
+/api/chamada de um professor (cache da lista desligado, então toda
+requisição consulta o SQLite) em duas situações:
+
+* apenas os clientes ativos;
+* com IDLE conexões extras abertas e paradas no meio dos cabeçalhos,
+  simulando clientes lentos ou ociosos.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_asgi
+"""
+import asyncio
+import datetime
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks._common import fresh_db
+
+import httpx
+import jwt
+
+import main as api
+from database import db_session
+from models import User, ProfessorAluno
+
+N_STUDENTS = 100
+CONCURRENCY = 50
+REQUESTS = 2000
+IDLE = 1000
+
+SERVERS = {
+    'wsgi (Flask, threaded)': [sys.executable, '-c',
+                               'import main; main.create_app().run(port={port}, threaded=True)'],
+    'asgi (uvicorn)': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', '{port}',
+                       '--log-level', 'warning', '--limit-concurrency', str(CONCURRENCY + IDLE + 100)],
+}
+
+
+def seed():
+    fresh_db()
+    professor = User(nome='prof', senha='x', email='prof@example.com', matricula='P0', isTeacher=True)
+    db_session.add(professor)
+    db_session.flush()
+    alunos = [User(nome=f'aluno{i}', senha='x', email=f'aluno{i}@example.com', matricula=str(i), isTeacher=False)
+              for i in range(N_STUDENTS)]
+    db_session.add_all(alunos)
+    db_session.flush()
+    db_session.add_all(ProfessorAluno(professor_id=professor.id, aluno_id=aluno.id) for aluno in alunos)
+    db_session.commit()
+    return professor
+
+
+def make_token(professor):
+    # Mesma configuração (SECRET_KEY do ambiente) que os servidores vão usar
+    secret_key = api.create_app().config['SECRET_KEY']
+    return jwt.encode({
+        'user_id': professor.id,
+        'username': professor.nome,
+        'matricula': professor.matricula,
+        'isTeacher': True,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, secret_key, algorithm="HS256").decode('UTF-8')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(command, port):
+    env = dict(os.environ, ROSTER_CACHE_TTL='0')
+    process = subprocess.Popen([part.format(port=port) for part in command], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"servidor não respondeu na porta {port}")
+
+
+async def open_idle(port, count):
+    """Abre conexões que enviam só o início da requisição e ficam paradas."""
+    writers = []
+    for _ in range(count):
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            break
+        writer.write(b'GET /api/about HTTP/1.1\r\nHost: localhost\r\n')
+        writers.append(writer)
+    await asyncio.sleep(0.5)
+    return writers
+
+
+async def load(port, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies = []
+    errors = 0
+    remaining = REQUESTS
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get('/api/chamada', headers=headers)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, statistics.quantiles(latencies, n=100), errors
+
+
+async def run(port, token, idle):
+    writers = await open_idle(port, idle) if idle else []
+    try:
+        return len(writers), await load(port, token)
+    finally:
+        for writer in writers:
+            writer.close()
+
+
+def report(name, idle, result):
+    opened, (rps, pct, errors) = result
+    print(f"{name:<24} ociosas={opened:<5} {rps:8.0f} req/s  p50={pct[49]:7.1f} ms  "
+          f"p95={pct[94]:7.1f} ms  p99={pct[98]:7.1f} ms  erros={errors}")
+
+
+def main():
+    token = make_token(seed())
+    db_session.remove()
+    print(f"{N_STUDENTS} alunos, {CONCURRENCY} clientes, {REQUESTS} requisições por rodada")
+    for name, command in SERVERS.items():
+        port = free_port()
+        process = start_server(command, port)
+        try:
+            for idle in (0, IDLE):
+                report(name, idle, asyncio.run(run(port, token, idle)))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
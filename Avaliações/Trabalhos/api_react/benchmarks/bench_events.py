@@ -0,0 +1,93 @@
+"""Benchmark da distribuição de eventos SSE (events.py).
+
+Para 10, 100 e 1000 conexões inscritas no mesmo professor (abas abertas,
+projetor da sala, ...), mostra:
+
+* o custo de ``publish_change`` na thread da escrita;
+* a latência até o evento chegar às corrotinas de ``get_async``, como no
+  handler de asgi.py;
+* a memória de uma conexão que não lê nada: por mais publicações que
+  receba, o buffer não passa de ``buffer_size`` eventos e a leitura
+  seguinte devolve um único ``resync``.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_events
+"""
+import asyncio
+import statistics
+import threading
+import time
+
+import benchmarks._common  # noqa: F401  (define o DB_PATH temporário)
+
+import events
+from cache import professor_key
+
+SUBSCRIBERS = (10, 100, 1000)
+PUBLISHES = 200
+PROFESSOR_ID = 1
+
+
+async def fan_out(n_subscribers: int):
+    """Publica PUBLISHES eventos de outra thread; retorna (µs por publicação, latências em ms)."""
+    subscriptions = [events.broker.subscribe(professor_key(PROFESSOR_ID)) for _ in range(n_subscribers)]
+    latencies = []
+    done = asyncio.Event()
+    received = 0
+
+    async def consume(subscription):
+        nonlocal received
+        while True:
+            for _, data in await subscription.get_async(5):
+                latencies.append((time.perf_counter() - data['t']) * 1000)
+                received += 1
+                if received == n_subscribers * PUBLISHES:
+                    done.set()
+
+    # Inscreve o event loop em cada conexão antes das publicações
+    consumers = [asyncio.create_task(consume(subscription)) for subscription in subscriptions]
+    await asyncio.sleep(0.1)
+    costs = []
+
+    def publisher():
+        for _ in range(PUBLISHES):
+            start = time.perf_counter()
+            events.broker.publish(professor_key(PROFESSOR_ID), 'atualizado', {'t': start})
+            costs.append(time.perf_counter() - start)
+            # Intervalo entre escritas, como presenças registradas uma a uma
+            time.sleep(0.002)
+
+    thread = threading.Thread(target=publisher)
+    thread.start()
+    await asyncio.wait_for(done.wait(), 60)
+    thread.join()
+    for task in consumers:
+        task.cancel()
+    for subscription in subscriptions:
+        subscription.close()
+    return statistics.mean(costs) * 1e6, latencies
+
+
+def slow_subscriber():
+    subscription = events.broker.subscribe(professor_key(PROFESSOR_ID))
+    for i in range(100 * events.buffer_size):
+        events.publish_change('atualizado', PROFESSOR_ID, [i])
+    pending = len(subscription._events)
+    first = subscription.get(0)
+    subscription.close()
+    return pending, first, subscription.dropped
+
+
+def main():
+    print(f"{'conexões':>8} {'publish µs':>11} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for n in SUBSCRIBERS:
+        cost, latencies = asyncio.run(fan_out(n))
+        pct = statistics.quantiles(latencies, n=100)
+        print(f"{n:>8} {cost:>11.1f} {pct[49]:>8.2f} {pct[98]:>8.2f} {max(latencies):>8.2f}")
+
+    pending, first, dropped = slow_subscriber()
+    print(f"\nconexão sem leitura após {100 * events.buffer_size} publicações: "
+          f"{pending} eventos no buffer, {dropped} descartados, leitura seguinte = {first}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark da exportação do histórico de presenças.
+
+Mede o tempo até o primeiro bloco, o tempo total e o pico de memória
+(tracemalloc) de ``main.export_rows`` sobre ``iter_attendance_history``
+para históricos de tamanhos crescentes. O pico deve ficar constante.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_export
+"""
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks._common import fresh_db
+
+from database import engine
+from models import User, ProfessorAluno, Presenca
+import main as api
+import operations
+
+SIZES = (1_000, 100_000, 1_000_000)
+STUDENTS = 100
+
+
+def seed(total_rows):
+    fresh_db()
+    days = total_rows // STUDENTS
+    start = date(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': 1, 'nome': 'prof', 'senha': 'x', 'email': 'prof@example.com', 'matricula': 'P0', 'isTeacher': True}
+        ] + [
+            {'id': i + 2, 'nome': f'aluno{i}', 'senha': 'x', 'email': f'aluno{i}@example.com',
+             'matricula': str(i), 'isTeacher': False} for i in range(STUDENTS)
+        ])
+        conn.execute(ProfessorAluno.__table__.insert(), [
+            {'id': i + 1, 'professor_id': 1, 'aluno_id': i + 2, 'presencas_count': days} for i in range(STUDENTS)
+        ])
+        conn.execute(Presenca.__table__.insert(), [
+            {'professor_aluno_id': i + 1, 'dia': start + timedelta(days=d)}
+            for i in range(STUDENTS) for d in range(days)
+        ])
+
+
+def main():
+    print(f"{'linhas':>10} {'1º bloco (ms)':>14} {'total (s)':>10} {'bytes':>12} {'pico memória (KiB)':>19}")
+    for size in SIZES:
+        seed(size)
+        tracemalloc.start()
+        start = time.perf_counter()
+        first = None
+        total_bytes = 0
+        for chunk in api.export_rows(operations.iter_attendance_history(1), 'csv'):
+            if first is None:
+                first = (time.perf_counter() - start) * 1000
+            total_bytes += len(chunk)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        operations.read_session.remove()
+        print(f"{size:>10} {first:>14.1f} {elapsed:>10.2f} {total_bytes:>12} {peak / 1024:>19.0f}")
+
+
+if __name__ == '__main__':
+    main()
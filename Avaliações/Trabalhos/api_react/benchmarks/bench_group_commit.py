@@ -0,0 +1,79 @@
+"""Benchmark do group commit em record_presence.
+
+Várias threads registram presenças ao mesmo tempo, simulando o início de
+uma aula com muitos professores fazendo a chamada. Compara commits
+individuais com janelas de group commit de 5, 10 e 20 ms.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_group_commit
+"""
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks._common import fresh_db
+
+from database import db_session
+from models import User, ProfessorAluno
+import operations
+
+THREADS = 32
+WRITES_PER_THREAD = 25
+WINDOWS_MS = (0, 5, 10, 20)
+
+
+def seed():
+    fresh_db()
+    professor = User(nome='prof', senha='x', email='prof@example.com', matricula='P0', isTeacher=True)
+    db_session.add(professor)
+    db_session.flush()
+    alunos = [User(nome=f'aluno{i}', senha='x', email=f'aluno{i}@example.com', matricula=str(i), isTeacher=False)
+              for i in range(THREADS)]
+    db_session.add_all(alunos)
+    db_session.flush()
+    relacoes = [ProfessorAluno(professor_id=professor.id, aluno_id=aluno.id) for aluno in alunos]
+    db_session.add_all(relacoes)
+    db_session.commit()
+    ids = [r.id for r in relacoes]
+    db_session.remove()
+    return ids
+
+
+def worker(professor_aluno_id, latencies, failures):
+    # Um dia diferente por escrita: a presença é única por relação e dia
+    today = date.today()
+    for i in range(WRITES_PER_THREAD):
+        start = time.perf_counter()
+        if not operations.record_presence(professor_aluno_id, today - timedelta(days=i)):
+            failures.append(professor_aluno_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    db_session.remove()
+
+
+def run(window_ms):
+    ids = seed()
+    committer = operations.configure_group_commit(window_ms)
+    latencies, failures = [], []
+    threads = [threading.Thread(target=worker, args=(i, latencies, failures)) for i in ids]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    stats = committer.stats() if committer else {'lote_medio': 1.0, 'commit_ms_medio': float('nan')}
+    print(f"{window_ms:>8} {len(latencies) / elapsed:>12.0f} {latencies[len(latencies) // 2]:>9.1f} "
+          f"{latencies[int(len(latencies) * 0.99)]:>9.1f} {stats['lote_medio']:>11.1f} "
+          f"{stats['commit_ms_medio']:>15.2f} {len(failures):>7}")
+
+
+def main():
+    print(f"{'janela':>8} {'escritas/s':>12} {'p50 (ms)':>9} {'p99 (ms)':>9} {'lote médio':>11} "
+          f"{'commit médio ms':>15} {'falhas':>7}")
+    for window_ms in WINDOWS_MS:
+        run(window_ms)
+    operations.configure_group_commit(0)
+
+
+if __name__ == '__main__':
+    main()
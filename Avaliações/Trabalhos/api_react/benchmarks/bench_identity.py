@@ -0,0 +1,111 @@
+"""Benchmark do mapa de identidade por requisição (identity.py).
+
+Conta os comandos SQL de cada requisição de escrita da lista de chamada,
+pelo cliente de testes do Flask, em três configurações:
+
+* rotas por nome e matrícula, com o mapa de identidade desligado;
+* as mesmas rotas com o mapa ligado;
+* as rotas por id (/api/chamada/alunos/<id>), com o mapa ligado.
+
+'criar' é o cadastro de um aluno novo pela lista de chamada, que só existe
+na rota por nome; o seu tempo inclui o hash da senha.
+
+Cada aluno passa uma única vez por adicionar, registrar presença e remover,
+para que todas as requisições façam o mesmo trabalho no banco.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_identity
+"""
+import datetime
+import statistics
+import urllib.parse
+
+from benchmarks._common import QueryCounter, fresh_db, timed
+
+import jwt
+
+from database import db_session
+from models import User
+import identity
+import main as api
+
+app = api.create_app()
+client = app.test_client()
+
+STUDENTS = 20
+
+
+def seed():
+    fresh_db()
+    professor = User(nome='prof', senha='x', email='prof@example.com', matricula='P0', isTeacher=True)
+    alunos = [User(nome=f'aluno {i}', senha='x', email=f'aluno{i}@example.com', matricula=str(1000 + i),
+                   isTeacher=False) for i in range(3 * STUDENTS)]
+    db_session.add(professor)
+    db_session.add_all(alunos)
+    db_session.commit()
+    result = professor.id, [(aluno.id, aluno.nome, aluno.matricula) for aluno in alunos]
+    db_session.remove()
+    return result
+
+
+def make_token(professor_id):
+    return jwt.encode({
+        'user_id': professor_id,
+        'username': 'prof',
+        'matricula': 'P0',
+        'isTeacher': True,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
+
+
+def by_name(aluno):
+    aluno_id, nome, matricula = aluno
+    quoted = urllib.parse.quote(nome)
+    return [
+        ('criar', 'POST', '/api/chamada', {'type': 'Adicionar', 'nome': f'novo {aluno_id}', 'matricula': f'N{aluno_id}'}),
+        ('adicionar', 'POST', '/api/chamada', {'type': 'Adicionar', 'nome': nome, 'matricula': matricula}),
+        ('presença', 'POST', f'/api/presenca/{quoted}/{matricula}', None),
+        ('remover', 'DELETE', f'/api/chamada/{quoted}', None),
+    ]
+
+
+def by_id(aluno):
+    aluno_id = aluno[0]
+    return [
+        ('adicionar', 'PUT', f'/api/chamada/alunos/{aluno_id}', None),
+        ('presença', 'POST', f'/api/chamada/alunos/{aluno_id}/presenca', None),
+        ('remover', 'DELETE', f'/api/chamada/alunos/{aluno_id}', None),
+    ]
+
+
+def run(alunos, routes, headers):
+    counts = {}
+    times = {}
+    for aluno in alunos:
+        for step, method, path, body in routes(aluno):
+            with QueryCounter() as counter, timed(times.setdefault(step, [])):
+                response = client.open(path, method=method, json=body, headers=headers)
+            assert response.status_code == 200, (path, response.get_json())
+            counts.setdefault(step, []).append(counter.count)
+    return {step: (statistics.mean(counts[step]), statistics.median(times[step])) for step in counts}
+
+
+def main():
+    professor_id, alunos = seed()
+    headers = {'Authorization': f'Bearer {make_token(professor_id)}'}
+
+    identity.enabled = False
+    sem_mapa = run(alunos[:STUDENTS], by_name, headers)
+    identity.enabled = True
+    com_mapa = run(alunos[STUDENTS:2 * STUDENTS], by_name, headers)
+    por_id = run(alunos[2 * STUDENTS:], by_id, headers)
+
+    print(f"{'requisição':<12} {'por nome, sem mapa':>20} {'por nome, com mapa':>20} {'por id, com mapa':>20}")
+    for step in sem_mapa:
+        cells = [f"{result[step][0]:.0f} ({result[step][1]:.2f} ms)" if step in result else '-'
+                 for result in (sem_mapa, com_mapa, por_id)]
+        print(f"{step:<12} {cells[0]:>20} {cells[1]:>20} {cells[2]:>20}")
+    print("(comandos SQL por requisição e mediana da latência)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark de logins por segundo para cada custo de hash.
+
+Simula um pico de logins: várias threads (como as threads do servidor)
+verificam senhas ao mesmo tempo através do executor de ``passwords``.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_password_hashing
+"""
+import os
+import threading
+import time
+
+import passwords
+
+COSTS = (10, 12, 14, 15)
+THREADS = 16
+LOGINS = 64
+
+
+def run(cost):
+    workers = os.cpu_count() or 2
+    passwords.configure(cost, workers=workers, queue=THREADS)
+    stored = passwords.hash_password('senha')
+    latencies = []
+
+    def login(count):
+        for _ in range(count):
+            start = time.perf_counter()
+            assert passwords.verify_password('senha', stored)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=login, args=(LOGINS // THREADS,)) for _ in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"{cost:>6} {workers:>8} {len(latencies) / elapsed:>11.1f} "
+          f"{latencies[len(latencies) // 2]:>9.1f} {latencies[-1]:>9.1f}")
+
+
+def main():
+    print(f"{'custo':>6} {'workers':>8} {'logins/s':>11} {'p50 (ms)':>9} {'máx (ms)':>9}")
+    for cost in COSTS:
+        run(cost)
+
+
+if __name__ == '__main__':
+    main()
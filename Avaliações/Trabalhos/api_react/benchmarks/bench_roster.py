@@ -0,0 +1,62 @@
+"""Benchmark da montagem da lista de chamada.
+
+Mostra que o número de consultas e a latência de
+``retrieve_students_for_professor`` / ``retrieve_professors_for_students``
+ficam estáveis conforme a turma cresce.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_roster
+"""
+from datetime import date, timedelta
+
+from benchmarks._common import QueryCounter, fresh_db, timed
+
+from database import db_session
+from models import User, ProfessorAluno, Presenca
+import operations
+from cache import roster_cache
+
+SIZES = (10, 100, 400, 1000)
+DIAS = 30
+REPEAT = 20
+
+
+def seed(n_students: int):
+    fresh_db()
+    professor = User(nome='prof', senha='x', email='prof@example.com', matricula='P0', isTeacher=True)
+    db_session.add(professor)
+    db_session.flush()
+    alunos = [User(nome=f'aluno{i}', senha='x', email=f'aluno{i}@example.com', matricula=str(i), isTeacher=False)
+              for i in range(n_students)]
+    db_session.add_all(alunos)
+    db_session.flush()
+    relacoes = [ProfessorAluno(professor_id=professor.id, aluno_id=aluno.id, presencas_count=DIAS)
+                for aluno in alunos]
+    db_session.add_all(relacoes)
+    db_session.flush()
+    inicio = date(2024, 3, 1)
+    db_session.bulk_save_objects([Presenca(professor_aluno_id=r.id, dia=inicio + timedelta(days=d))
+                                  for r in relacoes for d in range(DIAS)])
+    db_session.commit()
+    return professor.id, alunos[0].id
+
+
+def main():
+    # Mede a consulta em si, não o cache de listas de chamada
+    roster_cache.ttl = 0
+    print(f"{'alunos':>8} {'consultas':>10} {'média (ms)':>11} {'aluno: consultas':>17}")
+    for n in SIZES:
+        professor_id, aluno_id = seed(n)
+        tempos = []
+        with QueryCounter() as counter:
+            for _ in range(REPEAT):
+                with timed(tempos):
+                    alunos = operations.retrieve_students_for_professor(professor_id)
+        assert len(alunos) == n
+        consultas = counter.count // REPEAT
+        with QueryCounter() as aluno_counter:
+            operations.retrieve_professors_for_students(aluno_id)
+        print(f"{n:>8} {consultas:>10} {sum(tempos) / len(tempos):>11.2f} {aluno_counter.count:>17}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Micro-benchmark da serialização e da compressão da lista de chamada.
+
+Para turmas de 10, 100 e 1000 alunos, com nomes acentuados gerados como
+em seed.py, serializa a resposta de GET /api/chamada ({"alunos", "versao"})
+e mostra:
+
+* o tempo de serialização do provedor padrão do Flask (stdlib, com escapes
+  \\uXXXX) e de cada implementação de serialization.py;
+* os bytes enviados sem compressão, com gzip e com brotli (se instalado),
+  e o tempo de cada compressão.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_serialization
+"""
+import json
+import random
+import time
+
+import benchmarks._common  # noqa: F401  (define o DB_PATH temporário)
+
+from flask.json.provider import DefaultJSONProvider
+
+import compression
+import seed
+import serialization
+
+SIZES = (10, 100, 1000)
+MIN_TIME = 0.2
+
+
+def roster(n_students: int):
+    rng = random.Random(n_students)
+    alunos = {}
+    for i in range(n_students):
+        alunos[seed._name(rng, i)] = {'id': i + 2, 'matricula': seed.student_matricula(i),
+                                      'presencas': rng.randrange(60)}
+    return {'alunos': alunos, 'versao': n_students * 3}
+
+
+def flask_default(obj):
+    # O que o jsonify fazia antes: json.dumps com as opções padrão do Flask
+    return json.dumps(obj, default=DefaultJSONProvider.default, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def per_call_us(func, arg):
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        func(arg)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME:
+            return elapsed / calls * 1e6
+
+
+def main():
+    encoders = {'flask (antes)': flask_default, **serialization.encoders()}
+    codings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+    if compression.brotli is None:
+        print("brotli não instalado; apenas gzip")
+
+    print(f"{'alunos':>7} " + ' '.join(f"{name + ' µs':>16}" for name in encoders)
+          + f" {'bytes':>8} " + ' '.join(f"{coding + ' bytes':>11} {coding + ' µs':>9}" for coding in codings))
+    for n in SIZES:
+        payload = roster(n)
+        times = [per_call_us(func, payload) for func in encoders.values()]
+        before = flask_default(payload)
+        body = serialization.dumps(payload)
+        assert json.loads(before) == json.loads(body)
+        cells = []
+        for coding in codings:
+            compressed = compression.compress(body, coding)
+            cells.append(f"{len(compressed):>11} {per_call_us(lambda b: compression.compress(b, coding), body):>9.0f}")
+        print(f"{n:>7} " + ' '.join(f"{t:>16.1f}" for t in times)
+              + f" {len(body):>8} " + ' '.join(cells) + f"   (antes: {len(before)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark de inicialização a frio e memória por worker dos dois apps.
+
+Para api_react/ e flask/:
+
+* cold start: em um processo novo, tempo de ``import main``, de
+  ``create_app()`` e da primeira requisição, com banco novo (create_all e
+  migrações) e com banco já migrado (só a checagem de PRAGMA user_version);
+* memória: sobe o gunicorn com ``gunicorn.conf.py`` (WORKERS workers, com e
+  sem preload) e lê RSS e PSS de cada worker em /proc. O PSS divide as
+  páginas compartilhadas entre os processos, então mostra o ganho do
+  copy-on-write do preload.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_startup
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+APPS = {
+    'api_react': '/api/about',
+    'flask': '/about',
+}
+RUNS = 5
+WORKERS = 4
+
+COLD_START = '''
+import json, resource, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app()
+created = time.perf_counter()
+app.test_client().get({path!r})
+done = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (done - created) * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+'''
+
+
+def app_env(db_path, **extra):
+    return dict(os.environ, DB_PATH=db_path, SECRET_KEY='bench', **extra)
+
+
+def cold_start(app, path, db_path):
+    output = subprocess.run([sys.executable, '-c', COLD_START.format(path=path)],
+                            cwd=os.path.join(ROOT, app), env=app_env(db_path),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report_cold_start(app, path):
+    tmpdir = tempfile.mkdtemp(prefix='chamada-startup-')
+    runs = {'banco novo': [], 'banco migrado': []}
+    migrated = os.path.join(tmpdir, 'migrado.db')
+    cold_start(app, path, migrated)
+    for i in range(RUNS):
+        runs['banco novo'].append(cold_start(app, path, os.path.join(tmpdir, f'novo{i}.db')))
+        runs['banco migrado'].append(cold_start(app, path, migrated))
+    for label, results in runs.items():
+        medians = {key: statistics.median(result[key] for result in results) for key in results[0]}
+        print(f"  {label:<14} import={medians['import_ms']:6.1f} ms  create_app={medians['create_app_ms']:6.1f} ms  "
+              f"1ª requisição={medians['first_request_ms']:6.1f} ms  RSS={medians['rss_mb']:5.1f} MB")
+
+
+def memory(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0]) / 1024
+    return values
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def report_workers(app, path, preload):
+    port = free_port()
+    db_path = os.path.join(tempfile.mkdtemp(prefix='chamada-startup-'), 'gunicorn.db')
+    env = app_env(db_path, BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY=str(WORKERS),
+                  GUNICORN_PRELOAD='1' if preload else '0')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                               cwd=os.path.join(ROOT, app), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while len(children(process.pid)) < WORKERS and time.monotonic() < deadline:
+            time.sleep(0.1)
+        # Algumas requisições para que cada worker toque o banco e os templates
+        for _ in range(WORKERS * 10):
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5).read()
+            except OSError:
+                time.sleep(0.1)
+        workers = [memory(pid) for pid in children(process.pid)]
+        master = memory(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+    rss = statistics.mean(worker['Rss'] for worker in workers)
+    pss = statistics.mean(worker['Pss'] for worker in workers)
+    label = 'com preload' if preload else 'sem preload'
+    print(f"  {label:<14} mestre RSS={master['Rss']:5.1f} MB  por worker RSS={rss:5.1f} MB  PSS={pss:5.1f} MB  "
+          f"total PSS={master['Pss'] + pss * len(workers):6.1f} MB ({len(workers)} workers)")
+
+
+def main():
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        gunicorn = None
+    for app, path in APPS.items():
+        print(f"{app}: cold start (mediana de {RUNS} processos)")
+        report_cold_start(app, path)
+        if gunicorn is None:
+            print("  gunicorn não instalado; medição de memória por worker ignorada")
+            continue
+        print(f"{app}: memória com gunicorn")
+        for preload in (True, False):
+            report_workers(app, path, preload)
+
+
+if __name__ == '__main__':
+    main()
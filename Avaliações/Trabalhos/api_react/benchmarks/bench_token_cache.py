@@ -0,0 +1,55 @@
+"""Benchmark do custo de autenticação por requisição.
+
+Mede ``main.get_decoded_token`` com o mesmo token repetidamente, como fazem
+as páginas React ao chamar /api/chamada, com o cache de tokens desligado e
+ligado.
+
+Uso (a partir de api_react/): python -m benchmarks.bench_token_cache
+"""
+import datetime
+import time
+
+import benchmarks._common  # noqa: F401  (define o DB_PATH temporário)
+
+import jwt
+
+import main as api
+
+app = api.create_app()
+
+REQUESTS = 20000
+
+
+def make_token():
+    return jwt.encode({
+        'user_id': 1,
+        'username': 'prof',
+        'matricula': 'P0',
+        'isTeacher': True,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
+
+
+def run(maxsize, token):
+    api.token_cache.maxsize = maxsize
+    api.token_cache.clear()
+    headers = {'Authorization': f'Bearer {token}'}
+    with app.test_request_context('/api/chamada', headers=headers):
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            decoded, error, _ = api.get_decoded_token()
+            assert error is None
+        elapsed = time.perf_counter() - start
+    return elapsed / REQUESTS * 1e6
+
+
+def main():
+    token = make_token()
+    sem_cache = run(0, token)
+    com_cache = run(1024, token)
+    print(f"sem cache: {sem_cache:.1f} µs/requisição")
+    print(f"com cache: {com_cache:.1f} µs/requisição ({sem_cache / com_cache:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
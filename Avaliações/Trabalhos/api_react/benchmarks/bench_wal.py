@@ -0,0 +1,79 @@
+"""Benchmark de leituras da lista de chamada concorrendo com escritas.
+
+Uma thread mantém transações de escrita abertas (inserindo presenças)
+enquanto outra mede a latência de ``retrieve_students_for_professor``.
+Rode uma vez com o modo padrão e outra com DB_MODE=production para comparar:
+
+    python -m benchmarks.bench_wal
+    DB_MODE=production python -m benchmarks.bench_wal
+"""
+import threading
+import time
+from datetime import timedelta
+
+from benchmarks._common import fresh_db
+
+from database import db_mode, db_session, engine
+from models import User, ProfessorAluno, Presenca
+import operations
+from cache import roster_cache
+
+N_STUDENTS = 200
+READS = 200
+WRITE_HOLD_MS = 20
+
+
+def seed():
+    fresh_db()
+    professor = User(nome='prof', senha='x', email='prof@example.com', matricula='P0', isTeacher=True)
+    db_session.add(professor)
+    db_session.flush()
+    alunos = [User(nome=f'aluno{i}', senha='x', email=f'aluno{i}@example.com', matricula=str(i), isTeacher=False)
+              for i in range(N_STUDENTS)]
+    db_session.add_all(alunos)
+    db_session.flush()
+    relacoes = [ProfessorAluno(professor_id=professor.id, aluno_id=aluno.id) for aluno in alunos]
+    db_session.add_all(relacoes)
+    db_session.commit()
+    ids = professor.id, relacoes[0].id
+    db_session.remove()
+    return ids
+
+
+def writer(professor_aluno_id, stop):
+    # Segura o lock de escrita por WRITE_HOLD_MS a cada transação; um dia
+    # diferente por transação, já que a presença é única por relação e dia
+    today = operations.datetime.utcnow().date()
+    days_back = 0
+    while not stop.is_set():
+        with engine.begin() as conn:
+            conn.execute(Presenca.__table__.insert().values(professor_aluno_id=professor_aluno_id,
+                                                            dia=today - timedelta(days=days_back)))
+            time.sleep(WRITE_HOLD_MS / 1000)
+        days_back += 1
+
+
+def main():
+    # Mede a consulta em si, não o cache de listas de chamada
+    roster_cache.ttl = 0
+    professor_id, professor_aluno_id = seed()
+    stop = threading.Event()
+    thread = threading.Thread(target=writer, args=(professor_aluno_id, stop))
+    thread.start()
+    latencies = []
+    try:
+        for _ in range(READS):
+            start = time.perf_counter()
+            operations.retrieve_students_for_professor(professor_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+            operations.read_session.remove()
+    finally:
+        stop.set()
+        thread.join()
+    latencies.sort()
+    print(f"modo={db_mode} leituras={READS} p50={latencies[READS // 2]:.2f} ms "
+          f"p99={latencies[int(READS * 0.99)]:.2f} ms máx={latencies[-1]:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
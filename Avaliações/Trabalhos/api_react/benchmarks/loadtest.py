@@ -0,0 +1,188 @@
+"""Teste de carga de ponta a ponta contra um servidor em execução.
+
+Cada usuário virtual repete os fluxos do app React
+(app/src/pages/teachersFrequencyControl.tsx) como um professor gerado por
+seed.py:
+
+* login (POST /api/login), uma vez por usuário virtual;
+* abrir a lista (GET /api/chamada);
+* registrar presenças (POST /api/chamada/alunos/<id>/presenca);
+* adicionar e depois remover um aluno (POST /api/chamada, DELETE /api/chamada/alunos/<id>).
+
+Ao final mostra, por rota, o total de requisições, a vazão, os erros, as
+recusas do controle de admissão (429/503, ver admission.py) e as latências
+p50/p95/p99. Com --json os números também são gravados em um
+arquivo, para comparar execuções antes e depois de uma mudança.
+
+Todos os usuários virtuais saem do mesmo IP: para medir a capacidade do
+servidor, e não o limite por IP, suba-o com RATE_LIMIT_IP=0.
+
+Uso (a partir de api_react/):
+    python seed.py --reset
+    SECRET_KEY=... RATE_LIMIT_IP=0 gunicorn -c gunicorn.conf.py      # ou: uvicorn asgi:app --port 5000
+    python -m benchmarks.loadtest --usuarios 50 --duracao 60
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Mesmas convenções de seed.py, sem importar o banco
+DEFAULT_PASSWORD = 'senha123'
+
+# Fluxo -> peso na escolha da próxima ação de um usuário virtual
+FLOWS = {
+    'lista': 5,
+    'presenca': 4,
+    'adicionar_remover': 1,
+}
+
+
+class Recorder:
+    """Latências, erros e recusas por rota, compartilhados entre as threads."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.rejected = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, elapsed_ms: float, status: int):
+        with self._lock:
+            self.latencies.setdefault(route, []).append(elapsed_ms)
+            if status in (429, 503):
+                self.rejected[route] = self.rejected.get(route, 0) + 1
+            elif not 200 <= status < 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed_s: float):
+        result = {}
+        for route, values in sorted(self.latencies.items()):
+            pct = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+            result[route] = {
+                'requisicoes': len(values),
+                'req_s': len(values) / elapsed_s,
+                'erros': self.errors.get(route, 0),
+                'recusadas': self.rejected.get(route, 0),
+                'p50_ms': pct[49],
+                'p95_ms': pct[94],
+                'p99_ms': pct[98],
+            }
+        return result
+
+
+class Client:
+    """Cliente HTTP mínimo (urllib) que mede cada chamada."""
+
+    def __init__(self, base_url: str, recorder: Recorder):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.token = None
+
+    def request(self, method: str, path: str, route: str, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header('Authorization', f'Bearer {self.token}')
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            status = e.code
+        except OSError:
+            payload = b''
+            status = 0
+        self.recorder.record(route, (time.perf_counter() - start) * 1000, status)
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+
+def virtual_user(index: int, args, recorder: Recorder, deadline: float):
+    rng = random.Random(args.seed + index)
+    client = Client(args.url, recorder)
+    matricula = f'P{rng.randrange(args.professores):05d}'
+    status, body = client.request('POST', '/api/login', '/api/login',
+                                  {'matricula': matricula, 'password': args.senha})
+    if status != 200:
+        return
+    client.token = body['token']
+
+    flows, weights = zip(*FLOWS.items())
+    extra = 0
+    alunos = {}
+    while time.monotonic() < deadline:
+        flow = rng.choices(flows, weights)[0]
+        if flow == 'lista' or not alunos:
+            status, body = client.request('GET', '/api/chamada', '/api/chamada')
+            if status == 200 and body:
+                alunos = body.get('alunos', {})
+        elif flow == 'presenca':
+            nome = rng.choice(list(alunos))
+            client.request('POST', f"/api/chamada/alunos/{alunos[nome]['id']}/presenca",
+                           '/api/chamada/alunos/<id>/presenca')
+        else:
+            extra += 1
+            nome = f'Carga {index}-{extra}'
+            status, body = client.request('POST', '/api/chamada', '/api/chamada',
+                                          {'type': 'Adicionar', 'nome': nome, 'matricula': f'9{index:04d}{extra:06d}'})
+            added = body.get('alteracoes', {}).get('adicionados', {}) if status == 200 and body else {}
+            if nome in added:
+                client.request('DELETE', f"/api/chamada/alunos/{added[nome]['id']}", '/api/chamada/alunos/<id>')
+        if args.pausa_ms:
+            time.sleep(rng.uniform(0, 2 * args.pausa_ms) / 1000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Teste de carga dos fluxos do app React.')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--usuarios', type=int, default=20, help='usuários virtuais simultâneos')
+    parser.add_argument('--duracao', type=float, default=30, help='duração em segundos')
+    parser.add_argument('--professores', type=int, default=1000,
+                        help='professores gerados por seed.py (sorteados para o login)')
+    parser.add_argument('--senha', default=DEFAULT_PASSWORD)
+    parser.add_argument('--pausa-ms', type=float, default=0, help='pausa média entre ações de um usuário')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='grava o resumo neste arquivo')
+    args = parser.parse_args(argv)
+
+    recorder = Recorder()
+    start = time.monotonic()
+    deadline = start + args.duracao
+    threads = [threading.Thread(target=virtual_user, args=(i, args, recorder, deadline), daemon=True)
+               for i in range(args.usuarios)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    summary = recorder.summary(elapsed)
+    if not summary:
+        print("Nenhuma requisição concluída; o servidor está no ar?")
+        return 1
+    print(f"{args.usuarios} usuários, {elapsed:.1f} s")
+    print(f"{'rota':<36} {'req':>7} {'req/s':>8} {'erros':>6} {'recus.':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in summary.items():
+        print(f"{route:<36} {stats['requisicoes']:>7} {stats['req_s']:>8.1f} {stats['erros']:>6} {stats['recusadas']:>6} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+    total = sum(stats['requisicoes'] for stats in summary.values())
+    print(f"{'total':<36} {total:>7} {total / elapsed:>8.1f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'usuarios': args.usuarios, 'duracao_s': elapsed, 'rotas': summary}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Cache em memória das listas de chamada montadas por ``operations``.
+
+Cada entrada tem validade (TTL) e o cache tem tamanho máximo, descartando a
+entrada usada há mais tempo (LRU). As funções de escrita de ``operations``
+invalidam explicitamente as chaves do professor e do aluno afetados; o TTL
+limita a defasagem entre processos diferentes, que não compartilham o cache.
+
+Configuração pelo ambiente:
+    ROSTER_CACHE_TTL   validade das entradas em segundos (padrão 30, 0 desliga)
+    ROSTER_CACHE_SIZE  número máximo de entradas (padrão 1024)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Mapa limitado a ``maxsize`` entradas que expiram ``ttl`` segundos após gravadas."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Retorna o valor da chave, ou None se ausente ou expirado."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[1]:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
+
+roster_cache = TTLCache(maxsize=int(os.getenv("ROSTER_CACHE_SIZE", "1024")),
+                        ttl=float(os.getenv("ROSTER_CACHE_TTL", "30")))
+
+def professor_key(professor_id: int):
+    return ('professor', professor_id)
+
+def aluno_key(aluno_id: int):
+    return ('aluno', aluno_id)
+
+def invalidate_relationship(professor_id: int, aluno_id: int):
+    """Invalida as listas do professor e do aluno de uma relação."""
+    roster_cache.invalidate(professor_key(professor_id), aluno_key(aluno_id))
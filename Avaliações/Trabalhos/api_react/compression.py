@@ -0,0 +1,96 @@
+"""Compressão negociada (brotli ou gzip) das respostas da API.
+
+Respostas JSON e de texto acima de COMPRESS_MIN_BYTES são comprimidas com a
+melhor codificação aceita pelo cliente em ``Accept-Encoding``: brotli,
+quando o pacote ``brotli`` está instalado, senão gzip. Ficam de fora:
+
+* respostas em streaming (a exportação do histórico), que são enviadas em
+  blocos à medida que são geradas;
+* respostas já codificadas, sem corpo (304) ou de erro do servidor.
+
+A resposta comprimida leva ``Vary: Accept-Encoding`` e o seu ETag passa a
+ser fraco (``W/``), já que os bytes mudam com a codificação; as rotas
+comparam o If-None-Match com comparação fraca, então o 304 continua valendo.
+
+Configuração pelo ambiente:
+    COMPRESS_MIN_BYTES  tamanho mínimo do corpo para comprimir (padrão 1024; 0 desliga)
+    GZIP_LEVEL          nível do gzip (padrão 4)
+    BROTLI_QUALITY      qualidade do brotli (padrão 5)
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/html', 'text/csv', 'application/x-ndjson')
+
+min_bytes = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+gzip_level = int(os.getenv("GZIP_LEVEL", "4"))
+brotli_quality = int(os.getenv("BROTLI_QUALITY", "5"))
+
+def accepted_encodings(accept_encoding: str):
+    """Codificações de ``Accept-Encoding`` com q > 0."""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+def choose_encoding(accept_encoding: str):
+    """Melhor codificação disponível aceita pelo cliente, ou None."""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+def compress(body: bytes, encoding: str):
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime fixo: o mesmo corpo gera sempre os mesmos bytes
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+def should_compress(status: int, content_type: str, size: int, encoded: bool):
+    """Se uma resposta completa (não streaming) deve ser comprimida."""
+    if min_bytes <= 0 or encoded or size < min_bytes or status < 200 or status in (204, 206, 304) or status >= 500:
+        return False
+    return (content_type or '').split(';')[0].strip() in COMPRESSIBLE_TYPES
+
+def weak_etag(etag: str):
+    """Versão fraca de um valor de cabeçalho ETag."""
+    return etag if etag.startswith('W/') else f'W/{etag}'
+
+def init_app(app):
+    """Comprime as respostas do app Flask (after_request)."""
+    from flask import request
+
+    @app.after_request
+    def _compress(response):
+        if response.is_streamed or response.direct_passthrough:
+            return response
+        if not should_compress(response.status_code, response.content_type, response.content_length or 0,
+                               'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        response.set_data(compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+        if 'ETag' in response.headers:
+            response.headers['ETag'] = weak_etag(response.headers['ETag'])
+        return response
+
+    return app
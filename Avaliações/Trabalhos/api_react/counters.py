@@ -0,0 +1,87 @@
+"""Reconstrói e verifica os contadores de presença de ProfessorAluno.
+
+Uso:
+    python counters.py            # verifica e relata divergências
+    python counters.py --rebuild  # recalcula os contadores a partir de Presenca
+
+As presenças arquivadas (presenca_arquivo, ver archive.py) também contam.
+"""
+import logging
+import sys
+from sqlalchemy import func, select
+from archive import presences
+from database import db_session
+from models import ProfessorAluno, Presenca, PresencaArquivo
+
+logger = logging.getLogger(__name__)
+
+def _presenca_totals():
+    """Subconsulta com o total e o último dia de presença por relação."""
+    presencas = presences()
+    return db_session.query(
+        presencas.c.professor_aluno_id.label('professor_aluno_id'),
+        func.count().label('total'),
+        func.max(presencas.c.dia).label('ultima'),
+    ).group_by(presencas.c.professor_aluno_id).subquery()
+
+def verify():
+    """Retorna as relações cujos contadores divergem da tabela Presenca."""
+    totals = _presenca_totals()
+    rows = db_session.query(
+        ProfessorAluno.id,
+        ProfessorAluno.presencas_count,
+        ProfessorAluno.ultima_presenca,
+        func.coalesce(totals.c.total, 0),
+        totals.c.ultima,
+    ).outerjoin(totals, totals.c.professor_aluno_id == ProfessorAluno.id).all()
+
+    drift = []
+    for professor_aluno_id, count, ultima, expected_count, expected_ultima in rows:
+        if count != expected_count or ultima != expected_ultima:
+            drift.append({
+                'professor_aluno_id': professor_aluno_id,
+                'presencas_count': count,
+                'esperado': expected_count,
+                'ultima_presenca': ultima,
+                'ultima_esperada': expected_ultima,
+            })
+    return drift
+
+def rebuild():
+    """Recalcula todos os contadores a partir de Presenca numa única transação."""
+    try:
+        def count(table):
+            return select(func.count()).where(table.professor_aluno_id == ProfessorAluno.id).scalar_subquery()
+
+        def last(table):
+            return select(func.max(table.dia)).where(table.professor_aluno_id == ProfessorAluno.id).scalar_subquery()
+
+        total = count(Presenca) + count(PresencaArquivo)
+        # Os períodos arquivados são sempre anteriores às presenças ativas
+        ultima = func.coalesce(last(Presenca), last(PresencaArquivo))
+        updated = db_session.query(ProfessorAluno).update({
+            ProfessorAluno.presencas_count: total,
+            ProfessorAluno.ultima_presenca: ultima,
+        }, synchronize_session=False)
+        db_session.commit()
+        return updated
+    except Exception as e:
+        db_session.rollback()
+        logger.error("Erro ao reconstruir contadores: %s", e)
+        return None
+
+if __name__ == '__main__':
+    from database import init_db
+    init_db()
+
+    drift = verify()
+    for item in drift:
+        print(f"Relação {item['professor_aluno_id']}: contador {item['presencas_count']} "
+              f"(esperado {item['esperado']}), última presença {item['ultima_presenca']} "
+              f"(esperada {item['ultima_esperada']})")
+    print(f"{len(drift)} relação(ões) com divergência.")
+
+    if '--rebuild' in sys.argv[1:]:
+        print(f"{rebuild()} relação(ões) recalculada(s).")
+    elif drift:
+        sys.exit(1)
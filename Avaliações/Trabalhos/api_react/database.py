@@ -1,6 +1,7 @@
 import os
+import logging
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base
 
 # Load environment variables from .env file
@@ -12,18 +13,94 @@ db_path = os.getenv("DB_PATH")
 if not db_path:
     raise ValueError("DB_PATH environment variable is not set")
 
-print(f"Using database at {db_path}")
-engine = create_engine('sqlite:///' + db_path)
+# DB_MODE=production ativa WAL, um pool de conexões somente leitura para as
+# consultas de GET e uma única conexão de escrita para as mutações.
+# Os demais parâmetros podem ser ajustados individualmente pelo ambiente.
+db_mode = os.getenv("DB_MODE", "default")
+production = db_mode == "production"
+journal_mode = os.getenv("DB_JOURNAL_MODE", "WAL" if production else "")
+synchronous = os.getenv("DB_SYNCHRONOUS", "NORMAL" if production else "")
+busy_timeout_ms = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+read_pool_size = int(os.getenv("DB_READ_POOL_SIZE", "4"))
+write_timeout = float(os.getenv("DB_WRITE_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+def _set_pragmas(dbapi_connection, read_only: bool):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+    # Desligado por padrão no SQLite; necessário para o ON DELETE CASCADE de presenca
+    cursor.execute("PRAGMA foreign_keys = ON")
+    if journal_mode and not read_only:
+        cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+    if synchronous:
+        cursor.execute(f"PRAGMA synchronous = {synchronous}")
+    if read_only:
+        cursor.execute("PRAGMA query_only = 1")
+    cursor.close()
+
+if production:
+    # Um único escritor: as mutações esperam a vez no pool em vez de
+    # disputarem o lock do SQLite
+    engine = create_engine('sqlite:///' + db_path, pool_size=1, max_overflow=0, pool_timeout=write_timeout)
+    # Leitores abrem o arquivo em modo somente leitura; com WAL não esperam o escritor
+    read_engine = create_engine(f'sqlite:///file:{db_path}?mode=ro&uri=true',
+                                pool_size=read_pool_size, max_overflow=read_pool_size)
+    event.listen(read_engine, 'connect', lambda conn, record: _set_pragmas(conn, read_only=True))
+else:
+    engine = create_engine('sqlite:///' + db_path)
+    read_engine = engine
+
+event.listen(engine, 'connect', lambda conn, record: _set_pragmas(conn, read_only=False))
+
 db_session = scoped_session(sessionmaker(autocommit=False,
                                          autoflush=False,
                                          bind=engine))
+# Sessão das consultas somente leitura (listas de chamada); fora do modo de
+# produção é a própria db_session
+read_session = scoped_session(sessionmaker(autocommit=False,
+                                           autoflush=False,
+                                           bind=read_engine)) if production else db_session
 Base = declarative_base()
 Base.query = db_session.query_property()
 
+def remove_sessions():
+    """Devolve as conexões das sessões da thread atual aos pools."""
+    db_session.remove()
+    read_session.remove()
+
 def init_db():
     import models
+    import migrations
     Base.metadata.create_all(bind=engine)
-    print("Database initialized.")
+    migrations.migrate(engine)
+    logger.info("Banco de dados inicializado")
+
+def ensure_schema():
+    """Roda init_db apenas se o banco estiver atrás da última migração.
+
+    Verificar ``PRAGMA user_version`` é bem mais barato que o create_all
+    completo, então a inicialização de um banco já migrado fica rápida.
+    """
+    import migrations
+    logger.info("Usando o banco de dados em %s (modo %s)", db_path, db_mode)
+    with engine.connect() as conn:
+        if migrations.current_version(conn) >= migrations.LATEST_VERSION:
+            return False
+    init_db()
+    return True
+
+def dispose_engines():
+    """Descarta as conexões herdadas do processo pai após um fork.
+
+    Com ``preload_app`` o gunicorn cria o app (e abre conexões) antes de
+    criar os workers; cada worker precisa abrir as suas.
+    """
+    db_session.remove()
+    read_session.remove()
+    engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.dispose(close=False)
 
 if __name__ == '__main__':
-    init_db()
\ No newline at end of file
+    init_db()
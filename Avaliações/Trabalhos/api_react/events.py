@@ -0,0 +1,253 @@
+"""Publicação de alterações da chamada para as conexões Server-Sent Events.
+
+As escritas de ``operations`` (e de ``async_operations``) publicam, depois
+do commit, um evento para o professor e um para cada aluno da relação
+alterada, com os mesmos tipos de AlteracaoChamada:
+
+    adicionado  aluno vinculado à turma
+    atualizado  presença nova registrada
+    removido    aluno desvinculado da turma
+
+Cada conexão de GET /api/eventos é uma ``Subscription`` nos tópicos do seu
+usuário (as mesmas chaves das listas em cache.py). O evento só diz o que
+mudou; o cliente busca o conteúdo novo pelas rotas de sempre (por exemplo
+``GET /api/chamada?desde=<versao>``), então nenhum dado de outro usuário
+passa pelo canal.
+
+O buffer de cada conexão tem no máximo ``buffer_size`` eventos: um cliente
+lento que deixa o buffer encher perde os eventos pendentes e recebe um único
+``resync``, pedindo para recarregar a lista inteira. A memória por conexão
+fica limitada, qualquer que seja a velocidade do cliente.
+
+A distribuição é em memória, dentro do processo: com vários workers
+(gunicorn.conf.py) uma conexão só vê as escritas feitas no seu worker. Para
+as conexões longas de SSE, sirva a API com asgi.py num único processo. O app
+Flask de main.py responde 204 em /api/eventos, salvo com SSE_WSGI=1: nos
+workers síncronos do gunicorn cada conexão ocuparia um worker inteiro por
+até SSE_MAX_SECONDS, e poucas abas abertas travariam todas as outras rotas.
+Com o 204 o EventSource desiste e as páginas ficam com as respostas das
+próprias mutações.
+
+Configuração pelo ambiente:
+    SSE_BUFFER_SIZE      eventos pendentes por conexão (padrão 64)
+    SSE_HEARTBEAT_S      intervalo dos comentários de keep-alive (padrão 15)
+    SSE_MAX_SUBSCRIBERS  conexões simultâneas por processo (padrão 1000)
+    SSE_MAX_SECONDS      duração máxima de uma conexão (padrão 600)
+    SSE_WSGI             1 para o app Flask também manter as conexões, num
+                         servidor com threads ou gevent (padrão 0)
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from cache import professor_key, aluno_key
+
+buffer_size = int(os.getenv("SSE_BUFFER_SIZE", "64"))
+heartbeat_s = float(os.getenv("SSE_HEARTBEAT_S", "15"))
+max_subscribers = int(os.getenv("SSE_MAX_SUBSCRIBERS", "1000"))
+max_seconds = float(os.getenv("SSE_MAX_SECONDS", "600"))
+wsgi_streams = os.getenv("SSE_WSGI", "0") == "1"
+
+# Intervalo de reconexão sugerido ao EventSource, em milissegundos
+RETRY_MS = 3000
+
+class TooManySubscribers(Exception):
+    """Limite de conexões SSE do processo atingido."""
+
+class Subscription:
+    """Buffer limitado dos eventos de uma conexão.
+
+    Os eventos chegam de qualquer thread (``put``) e são consumidos por uma
+    thread (``get``) ou por uma corrotina (``get_async``).
+    """
+
+    def __init__(self, broker, topics: tuple, maxsize: int):
+        self.broker = broker
+        self.topics = topics
+        self.maxsize = maxsize
+        self.overflowed = False
+        self.dropped = 0
+        self._events = deque()
+        self._cond = threading.Condition()
+        self._loop = None
+        self._wakeup = None
+        self._waiting = False
+
+    def put(self, event: tuple):
+        with self._cond:
+            if self.overflowed:
+                self.dropped += 1
+                return
+            if len(self._events) >= self.maxsize:
+                # Cliente lento: descarta o pendente e pede um resync
+                self.dropped += len(self._events) + 1
+                self._events.clear()
+                self.overflowed = True
+            else:
+                self._events.append(event)
+            self._cond.notify()
+            if self._waiting:
+                # Um único aviso por espera: as demais publicações só enchem o buffer
+                self._waiting = False
+                try:
+                    self._loop.call_soon_threadsafe(self._wakeup.set)
+                except RuntimeError:
+                    # Event loop já encerrado; a conexão está sendo fechada
+                    pass
+
+    def _drain(self):
+        if self.overflowed:
+            self.overflowed = False
+            return [('resync', {})]
+        events = list(self._events)
+        self._events.clear()
+        return events
+
+    def get(self, timeout: float):
+        """Eventos pendentes, esperando até ``timeout`` segundos; [] se nada chegou."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._events or self.overflowed, timeout)
+            return self._drain()
+
+    async def get_async(self, timeout: float):
+        """Como ``get``, sem bloquear o event loop."""
+        with self._cond:
+            if self._loop is None:
+                self._wakeup = asyncio.Event()
+                self._loop = asyncio.get_running_loop()
+            if self._events or self.overflowed:
+                return self._drain()
+            self._wakeup.clear()
+            self._waiting = True
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._cond:
+            self._waiting = False
+            return self._drain()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class Broker:
+    """Distribuição em memória: tópico -> conexões inscritas."""
+
+    def __init__(self, max_subscribers: int, buffer_size: int):
+        self.max_subscribers = max_subscribers
+        self.buffer_size = buffer_size
+        self._topics = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, *topics):
+        """Nova conexão inscrita em ``topics``; lança ``TooManySubscribers`` no limite."""
+        subscription = Subscription(self, topics, self.buffer_size)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers()
+            self._count += 1
+            for topic in topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            removed = False
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers and subscription in subscribers:
+                    subscribers.discard(subscription)
+                    removed = True
+                    if not subscribers:
+                        del self._topics[topic]
+            if removed:
+                self._count -= 1
+
+    def publish(self, topic, tipo: str, data: dict):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+            self.published += 1
+        for subscription in subscribers:
+            subscription.put((tipo, data))
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': self._count, 'topics': len(self._topics), 'published': self.published}
+
+broker = Broker(max_subscribers, buffer_size)
+
+def publish_change(tipo: str, professor_id: int, aluno_ids):
+    """Publica uma alteração das relações de um professor com ``aluno_ids``.
+
+    O professor recebe um único evento com todos os alunos (uma presença em
+    lote não vira um evento por aluno); cada aluno recebe o seu.
+    """
+    aluno_ids = list(aluno_ids)
+    if not aluno_ids:
+        return
+    broker.publish(professor_key(professor_id), tipo, {'alunos': aluno_ids})
+    for aluno_id in aluno_ids:
+        broker.publish(aluno_key(aluno_id), tipo, {'professor_id': professor_id})
+
+def topics_for(user_id: int, is_teacher: bool):
+    """Tópicos que um usuário pode acompanhar: apenas as próprias relações."""
+    return (professor_key(user_id),) if is_teacher else (aluno_key(user_id),)
+
+def format_event(tipo: str, data: dict):
+    """Um evento no formato text/event-stream."""
+    return f"event: {tipo}\ndata: {json.dumps(data, sort_keys=True, separators=(',', ':'))}\n\n"
+
+def format_heartbeat():
+    # Linhas iniciadas por ':' são comentários, ignorados pelo EventSource
+    return ": ping\n\n"
+
+def format_open():
+    return f"retry: {RETRY_MS}\n: conectado\n\n"
+
+def deadline_for(claims: dict):
+    """Fim de uma conexão (relógio ``time.monotonic``): SSE_MAX_SECONDS ou o ``exp`` do token, o que vier antes.
+
+    O EventSource reconecta sozinho; ao reconectar, o token é conferido de novo.
+    """
+    seconds = max_seconds
+    if isinstance(claims.get('exp'), (int, float)):
+        seconds = min(seconds, claims['exp'] - time.time())
+    return time.monotonic() + seconds
+
+def stream(subscription: Subscription, deadline: float):
+    """Corpo text/event-stream de uma conexão até ``deadline``, com heartbeats."""
+    try:
+        yield format_open()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = subscription.get(min(heartbeat_s, remaining))
+            if not events:
+                # Também é o que detecta um cliente que já se desconectou
+                yield format_heartbeat()
+            for tipo, data in events:
+                yield format_event(tipo, data)
+    finally:
+        subscription.close()
+
+async def stream_async(subscription: Subscription, deadline: float):
+    """Como ``stream``, para o handler assíncrono de asgi.py."""
+    try:
+        yield format_open()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = await subscription.get_async(min(heartbeat_s, remaining))
+            if not events:
+                yield format_heartbeat()
+            for tipo, data in events:
+                yield format_event(tipo, data)
+    finally:
+        subscription.close()
@@ -0,0 +1,128 @@
+"""Group commit para escritas curtas e frequentes (registro de presença).
+
+No SQLite cada ``commit`` custa um fsync e só existe um escritor por vez.
+O ``GroupCommitter`` junta as escritas que chegam dentro de uma janela curta
+(alguns milissegundos) e as grava numa única transação, devolvendo a cada
+chamador o seu próprio resultado por meio de um ``Future``.
+
+Se o commit do lote falhar, cada item é regravado individualmente para que
+apenas as escritas realmente inválidas retornem erro. Qualquer falha (inclusive
+ao abrir a sessão, por exemplo um timeout do pool) é entregue aos ``Future``
+do lote; a thread do group commit nunca deixa um chamador sem resposta.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+from queue import Empty, Queue
+
+class GroupCommitter:
+    """Agrupa escritas concorrentes em transações de até ``max_batch`` itens.
+
+    ``apply`` recebe ``(session, *args)`` e executa a escrita sem commit;
+    o valor retornado é entregue ao chamador depois do commit.
+    """
+
+    def __init__(self, apply, session_factory, window_ms: float = 10, max_batch: int = 256):
+        self.apply = apply
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'lotes': 0,
+            'escritas': 0,
+            'falhas': 0,
+            'maior_lote': 0,
+            'commit_ms_total': 0.0,
+            'commit_ms_max': 0.0,
+        }
+
+    def submit(self, *args):
+        """Enfileira uma escrita e retorna o ``Future`` com o seu resultado."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((args, future))
+        return future
+
+    def stats(self):
+        """Contadores de tamanho de lote e latência de commit."""
+        with self._lock:
+            stats = dict(self._stats)
+        lotes = stats['lotes'] or 1
+        stats['lote_medio'] = stats['escritas'] / lotes
+        stats['commit_ms_medio'] = stats['commit_ms_total'] / lotes
+        return stats
+
+    def _ensure_worker(self):
+        # A thread não sobrevive a um fork, então é recriada por processo
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # Fila herdada do processo pai; na mesma thread morta, as
+                # escritas já enfileiradas continuam na fila para a nova thread
+                self._queue = Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+            self._thread.start()
+
+    def _collect(self):
+        """Bloqueia até a primeira escrita e junta as que chegarem na janela."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                self._commit_batch(batch)
+            except Exception:
+                # Lote inválido: grava item a item para isolar as falhas
+                for item in batch:
+                    try:
+                        self._commit_batch([item])
+                    except Exception as e:
+                        item[1].set_exception(e)
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._stats['lotes'] += 1
+                self._stats['escritas'] += len(batch)
+                self._stats['maior_lote'] = max(self._stats['maior_lote'], len(batch))
+                self._stats['commit_ms_total'] += elapsed
+                self._stats['commit_ms_max'] = max(self._stats['commit_ms_max'], elapsed)
+
+    def _commit_batch(self, batch):
+        session = None
+        try:
+            session = self.session_factory()
+            results = [self.apply(session, *args) for args, _ in batch]
+            session.commit()
+        except Exception as e:
+            if session is not None:
+                session.rollback()
+            if len(batch) > 1:
+                raise
+            with self._lock:
+                self._stats['falhas'] += 1
+            batch[0][1].set_exception(e)
+            return
+        finally:
+            if session is not None:
+                session.close()
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
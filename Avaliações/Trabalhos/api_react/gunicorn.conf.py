@@ -0,0 +1,37 @@
+"""Configuração do gunicorn para servir o app com vários processos (pre-fork).
+
+    SECRET_KEY=... gunicorn -c gunicorn.conf.py
+
+Com ``preload_app`` o app é criado uma única vez no processo mestre: o
+esquema é verificado (e migrado, se preciso) uma vez só e o código já
+importado é compartilhado com os workers por copy-on-write. Conexões
+SQLite não podem atravessar um fork, então ``post_fork`` descarta as
+conexões herdadas e cada worker abre as suas no primeiro uso.
+
+SECRET_KEY precisa estar definida e ser a mesma em todos os workers (os
+tokens JWT emitidos por um worker são verificados pelos outros);
+sem ela o app cai na chave fixa de desenvolvimento, que não deve ir para
+produção.
+
+Os workers são síncronos: /api/eventos (SSE) responde 204 aqui, e as
+páginas seguem só com as respostas das mutações. Para o stream, sirva
+asgi.py com uvicorn, ou use threads (GUNICORN_THREADS) com SSE_WSGI=1
+sabendo que cada aba aberta ocupa uma thread.
+
+Variáveis de ambiente:
+    BIND               endereço de escuta (padrão 127.0.0.1:5000)
+    WEB_CONCURRENCY    número de workers (padrão 2 * CPUs + 1)
+    GUNICORN_THREADS   threads por worker (padrão 1)
+    GUNICORN_PRELOAD   0 para criar o app em cada worker (padrão 1)
+"""
+import os
+
+wsgi_app = 'main:create_app()'
+bind = os.getenv('BIND', '127.0.0.1:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(2 * (os.cpu_count() or 1) + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') != '0'
+
+def post_fork(server, worker):
+    from database import dispose_engines
+    dispose_engines()
@@ -0,0 +1,54 @@
+"""Mapa de identidade por requisição para User, ProfessorAluno e a versão da lista.
+
+Numa mesma requisição, várias funções de ``operations`` procuram o mesmo
+aluno (por id ou por nome e matrícula) e a mesma relação professor-aluno.
+Dentro de uma requisição do Flask, o resultado de cada busca fica em
+``flask.g``, então cada entidade é lida do banco no máximo uma vez por
+requisição; buscas sem resultado também ficam guardadas.
+
+Os usuários guardados são objetos da ``db_session`` da requisição, que é
+descartada no teardown junto com ``g``. Das relações guarda-se apenas o id,
+que não expira com o commit. A versão da lista de um professor ('versao') é
+lida uma vez; as escritas da requisição a substituem pelo id da alteração
+que gravaram, ou a descartam quando não o conhecem. Fora de uma requisição (scripts, group commit,
+rotas assíncronas de asgi.py) nada é guardado.
+"""
+from flask import g, has_app_context
+
+# Desligável para comparação nos benchmarks
+enabled = True
+
+def _store():
+    if not enabled or not has_app_context():
+        return None
+    store = g.get('identity_map')
+    if store is None:
+        store = g.identity_map = {}
+    return store
+
+def lookup(kind: str, key, load):
+    """Retorna a entidade ``(kind, key)`` da requisição atual, carregando-a com ``load()`` na primeira vez."""
+    store = _store()
+    if store is None:
+        return load()
+    if (kind, key) not in store:
+        store[(kind, key)] = load()
+    return store[(kind, key)]
+
+def remember(kind: str, key, value):
+    """Guarda (ou atualiza, depois de uma escrita) a entidade ``(kind, key)``."""
+    store = _store()
+    if store is not None:
+        store[(kind, key)] = value
+
+def forget(kind: str, key):
+    """Descarta a entidade ``(kind, key)``; a próxima busca volta ao banco."""
+    store = _store()
+    if store is not None:
+        store.pop((kind, key), None)
+
+def remember_user(user):
+    """Guarda um usuário pelas duas chaves usadas nas buscas."""
+    if user is not None:
+        remember('user', user.id, user)
+        remember('user_nome_matricula', (user.nome, user.matricula), user)
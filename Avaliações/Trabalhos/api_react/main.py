@@ -1,17 +1,77 @@
-from flask import Flask, jsonify, request, session
+from flask import Blueprint, Flask, Response, current_app, jsonify, make_response, request, session, stream_with_context
 import jwt
+import csv
+import io
+import json
+import os
 import datetime
+import logging
 import operations
+import metrics
+import admission
+import compression
+import events
+from serialization import JSONProvider
+import analytics
+from token_cache import TokenCache
+from passwords import HashingBusy
+from cache import roster_cache
 from flask_cors import CORS
-from database import init_db
+from database import ensure_schema, remove_sessions
 
-init_db()
-app = Flask(__name__)
-CORS(app)
-app.config['SECRET_KEY'] = 'sua_chave_secreta'
+# Chave usada apenas em desenvolvimento; em produção defina SECRET_KEY, que
+# precisa ser a mesma em todos os workers
+DEV_SECRET_KEY = 'sua_chave_secreta'
+MAX_PAGE_SIZE = 500
+logger = logging.getLogger(__name__)
+token_cache = TokenCache(maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "1024")))
 
-def get_decoded_token():
+api = Blueprint('api', __name__)
+
+def create_app(config: dict = None):
+    """Cria o app Flask da API.
+
+    A configuração vem do ambiente e pode ser sobrescrita por ``config``.
+    O esquema do banco só é criado ou migrado aqui, e apenas se estiver
+    desatualizado; importar este módulo não toca no banco.
+    """
+    metrics.configure_logging()
+    ensure_schema()
+    app = Flask(__name__)
+    app.json = JSONProvider(app)
+    secret_key = os.getenv("SECRET_KEY")
+    if not secret_key:
+        logger.warning("SECRET_KEY não definida; usando a chave de desenvolvimento")
+    app.config['SECRET_KEY'] = secret_key or DEV_SECRET_KEY
+    if config:
+        app.config.update(config)
+    CORS(app)
+    app.register_blueprint(api)
+    app.register_error_handler(HashingBusy, hashing_busy)
+    app.teardown_appcontext(shutdown_session)
+    metrics.init_app(app)
+    admission.init_app(app, request_user_id)
+    compression.init_app(app)
+    metrics.register_collector('roster_cache', roster_cache.stats)
+    metrics.register_collector('token_cache', token_cache.stats)
+    metrics.register_collector('admission', admission.controller.stats)
+    metrics.register_collector('events', events.broker.stats)
+    metrics.register_collector('group_commit', lambda: operations.presence_committer.stats()
+                               if operations.presence_committer is not None else {})
+    return app
+
+def hashing_busy(error):
+    # Fila de hash de senhas cheia: o cliente deve tentar de novo em instantes
+    return jsonify({"error": "Servidor ocupado, tente novamente em instantes."}), 503, {"Retry-After": "1"}
+
+def shutdown_session(exception=None):
+    remove_sessions()
+
+def get_decoded_token(allow_query: bool = False):
     token = request.headers.get('Authorization')
+    if not token and allow_query and request.args.get('token'):
+        # O EventSource do navegador não envia cabeçalhos: só em /api/eventos
+        token = f"Bearer {request.args['token']}"
     if not token:
         return None, jsonify({"error": "Unauthorized, please provide a token."}), 401
 
@@ -21,28 +81,66 @@ def get_decoded_token():
         else:
             return None, jsonify({"error": "Invalid token format, please provide a Bearer token."}), 401
 
-        decoded_token = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+        secret_key = current_app.config['SECRET_KEY']
+        decoded_token = token_cache.get(secret_key, token)
+        if decoded_token is None:
+            decoded_token = jwt.decode(token, secret_key, algorithms=["HS256"])
+            token_cache.put(secret_key, token, decoded_token)
         return decoded_token, None, None
     except jwt.ExpiredSignatureError:
         return None, jsonify({"error": "Token expired, please log in again."}), 401
     except jwt.InvalidTokenError:
         return None, jsonify({"error": "Invalid token, please log in again."}), 401
 
-@app.route('/')
+def request_user_id():
+    """``user_id`` do token da requisição atual, ou None (usado pelo controle de admissão)."""
+    decoded_token, _, _ = get_decoded_token(allow_query=request.endpoint == 'api.events_stream')
+    return decoded_token['user_id'] if decoded_token else None
+
+@api.route('/')
 def home():
     session.clear()
     return jsonify({"message": "API Home - Session Cleared"})
 
-@app.route('/api/user/<username>', methods=['GET'])
+@api.route('/api/user/<username>', methods=['GET'])
 def user(username):
     return jsonify({"message": f"Hello, {username}!"})
 
-@app.route('/api/about', methods=['GET'])
+@api.route('/api/about', methods=['GET'])
 def about():
     text = 'This is the about page.'
     return jsonify({"message": text})
 
-@app.route('/api/chamada', methods=['GET', 'POST', 'DELETE'])
+def not_modified(etag: str):
+    """Resposta 304 se o cliente já tem a versão ``etag``; senão None."""
+    # Comparação fraca: a resposta comprimida leva o ETag como W/ (compression.py)
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def changes_baseline(professor_id: int):
+    """Versão a partir da qual as mutações devolvem as alterações da lista.
+
+    O cliente pode informar ``?desde=N``; caso contrário vale a versão atual,
+    lida antes da mutação.
+    """
+    since = request.args.get('desde', type=int)
+    return since if since is not None else operations.roster_version(professor_id)
+
+def with_changes(payload: dict, professor_id: int, since: int):
+    """Acrescenta a nova versão e as alterações desde ``since`` à resposta de uma mutação."""
+    version = operations.roster_version(professor_id)
+    payload['versao'] = version
+    payload['alteracoes'] = operations.roster_delta(professor_id, since)
+    return jsonify(payload)
+
+@api.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({"roster": roster_cache.stats()})
+
+@api.route('/api/chamada', methods=['GET', 'POST', 'DELETE'])
 def chamada():
     decoded_token, error_response, status_code = get_decoded_token()
     if error_response:
@@ -52,10 +150,17 @@ def chamada():
     is_teacher = decoded_token['isTeacher']
 
     if not is_teacher:
-        teachers = operations.retrieve_professors_for_students(user_id)
-        return jsonify({"teachers": teachers})
+        version = operations.student_version(user_id)
+        etag = f'aluno-{user_id}-{version}'
+        response = not_modified(etag)
+        if response is None:
+            teachers = operations.retrieve_professors_for_students(user_id, version)
+            response = jsonify({"teachers": teachers, "versao": version})
+            response.set_etag(etag)
+        return response
 
     if request.method == 'POST':
+        since = changes_baseline(user_id)
         data = request.get_json()
         if data['type'] == 'Adicionar':
             novo_nome = data['nome']
@@ -68,56 +173,322 @@ def chamada():
                     return jsonify({"error": "Matrícula já existente para um professor"}), 400
 
                 if operations.add_professor_student_relationship_if_exists(user_id, nova_matricula, novo_nome):
-                    return jsonify({"message": "Relação com aluno existente adicionada com sucesso"})
+                    return with_changes({"message": "Relação com aluno existente adicionada com sucesso"}, user_id, since)
                 else:
                     return jsonify({"error": "Erro ao adicionar relação com aluno existente"}), 500
 
             aluno = operations.create_user(nome=novo_nome, senha='default_password', email=f'{novo_nome}@example.com', matricula=nova_matricula, isTeacher=False)
             if aluno:
                 if operations.add_professor_student_relationship_if_exists(user_id, aluno.matricula, aluno.nome):
-                    return jsonify({"message": "Novo aluno criado e relação adicionada com sucesso"})
+                    return with_changes({"message": "Novo aluno criado e relação adicionada com sucesso"}, user_id, since)
                 else:
                     return jsonify({"error": "Erro ao adicionar relação com novo aluno"}), 500
             else:
                 return jsonify({"error": "Erro ao criar novo aluno"}), 500
 
-    alunos = operations.retrieve_students_for_professor(user_id)
-    return jsonify({"alunos": alunos})
+    version = operations.roster_version(user_id)
+    etag = f'professor-{user_id}-{version}'
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    since = request.args.get('desde', type=int)
+    if 'limite' in request.args:
+        # Lista paginada; sem 'limite' a resposta completa continua disponível
+        try:
+            limit = min(max(request.args.get('limite', type=int) or 0, 1), MAX_PAGE_SIZE)
+            alunos, next_cursor = operations.retrieve_students_page(
+                user_id, limit,
+                sort=request.args.get('ordem', 'nome'),
+                descending=request.args.get('direcao', 'asc') == 'desc',
+                cursor=request.args.get('cursor'),
+                below=request.args.get('presencas_abaixo_de', type=int))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        response = jsonify({"alunos": alunos, "proximo_cursor": next_cursor, "versao": version})
+    elif since:
+        # Sincronização incremental: apenas o que mudou desde a versão informada
+        response = jsonify({"versao": version, "alteracoes": operations.roster_delta(user_id, since)})
+    else:
+        alunos = operations.retrieve_students_for_professor(user_id, version)
+        response = jsonify({"alunos": alunos, "versao": version})
+    response.set_etag(etag)
+    return response
+
+def parse_import_rows(data):
+    """Normaliza o corpo de uma importação para uma lista de {'nome', 'matricula'}.
+
+    Aceita uma lista de objetos, {"alunos": [...]} ou o formato de alunos.json
+    ({nome: matricula}).
+    """
+    if isinstance(data, dict) and isinstance(data.get('alunos'), list):
+        data = data['alunos']
+    if isinstance(data, dict):
+        return [{'nome': nome, 'matricula': matricula} for nome, matricula in data.items()]
+    if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+        return data
+    return None
+
+@api.route('/api/chamada/importar', methods=['POST'])
+def import_students():
+    decoded_token, error_response, status_code = get_decoded_token()
+    if error_response:
+        return error_response, status_code
+
+    if not decoded_token['isTeacher']:
+        return jsonify({"error": "Apenas professores podem importar alunos"}), 403
+
+    arquivo = request.files.get('arquivo')
+    try:
+        if arquivo is None:
+            rows = parse_import_rows(request.get_json(silent=True))
+        elif arquivo.filename.lower().endswith('.json'):
+            rows = parse_import_rows(json.load(arquivo.stream))
+        else:
+            # CSV com cabeçalho contendo as colunas nome e matricula
+            rows = list(csv.DictReader(io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig')))
+    except (ValueError, UnicodeDecodeError):
+        rows = None
+
+    if rows is None:
+        return jsonify({"error": "Formato de importação inválido"}), 400
+
+    results = operations.import_students(decoded_token['user_id'], rows)
+    if results is None:
+        return jsonify({"error": "Erro ao importar alunos"}), 500
+
+    totals = {status: sum(1 for result in results if result['status'] == status)
+              for status in ('criado', 'vinculado', 'rejeitado')}
+    return jsonify({"resultados": results, "totais": totals})
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+def export_rows(rows, formato: str, batch_size: int = 1000):
+    """Serializa as linhas do histórico em blocos, sem acumular o arquivo em memória."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if formato == 'csv':
+        writer.writerow(['nome', 'matricula', 'dia'])
+    pending = 0
+    for nome, matricula, dia in rows:
+        if formato == 'csv':
+            writer.writerow([nome, matricula, dia.isoformat()])
+        else:
+            buffer.write(json.dumps({'nome': nome, 'matricula': matricula, 'dia': dia.isoformat()},
+                                    ensure_ascii=False) + '\n')
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+@api.route('/api/chamada/exportar', methods=['GET'])
+def export_attendance():
+    decoded_token, error_response, status_code = get_decoded_token()
+    if error_response:
+        return error_response, status_code
+
+    if not decoded_token['isTeacher']:
+        return jsonify({"error": "Apenas professores podem exportar presenças"}), 403
+
+    formato = request.args.get('formato', 'csv')
+    if formato not in EXPORT_FORMATS:
+        return jsonify({"error": "Formato inválido, use csv ou ndjson"}), 400
+    try:
+        start = datetime.date.fromisoformat(request.args['de']) if 'de' in request.args else None
+        end = datetime.date.fromisoformat(request.args['ate']) if 'ate' in request.args else None
+    except ValueError:
+        return jsonify({"error": "Datas devem estar no formato AAAA-MM-DD"}), 400
+
+    rows = operations.iter_attendance_history(decoded_token['user_id'], start, end)
+    response = Response(stream_with_context(export_rows(rows, formato)), mimetype=EXPORT_FORMATS[formato])
+    response.headers['Content-Disposition'] = f'attachment; filename=presencas.{formato}'
+    return response
+
+@api.route('/api/eventos', methods=['GET'])
+def events_stream():
+    """Server-Sent Events com as alterações das relações do usuário (ver events.py)."""
+    if not events.wsgi_streams:
+        # Worker síncrono: a conexão ocuparia o worker inteiro. O EventSource
+        # não reconecta depois de um 204; o stream fica com asgi.py
+        return '', 204
+
+    decoded_token, error_response, status_code = get_decoded_token(allow_query=True)
+    if error_response:
+        return error_response, status_code
+
+    try:
+        subscription = events.broker.subscribe(*events.topics_for(decoded_token['user_id'],
+                                                                  decoded_token['isTeacher']))
+    except events.TooManySubscribers:
+        return jsonify({"error": "Servidor ocupado, tente novamente em instantes."}), 503, {"Retry-After": "5"}
+
+    # Sem stream_with_context: a conexão não usa o banco, e a sessão do
+    # contexto da requisição é liberada antes de o stream começar
+    response = Response(events.stream(subscription, events.deadline_for(decoded_token)),
+                        mimetype='text/event-stream')
+    # Se o servidor fechar a resposta antes de iterar o gerador
+    response.call_on_close(subscription.close)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
-@app.route('/api/chamada/<nome>', methods=['DELETE'])
+@api.route('/api/analytics', methods=['GET'])
+def attendance_analytics():
+    decoded_token, error_response, status_code = get_decoded_token()
+    if error_response:
+        return error_response, status_code
+
+    if not decoded_token['isTeacher']:
+        return jsonify({"error": "Apenas professores podem ver os indicadores da turma"}), 403
+
+    last_classes = request.args.get('ultimas_aulas', 10, type=int)
+    threshold = request.args.get('limite', 0.75, type=float)
+    if last_classes < 1 or not 0 <= threshold <= 1:
+        return jsonify({"error": "Use ultimas_aulas >= 1 e limite entre 0 e 1"}), 400
+
+    return jsonify(analytics.professor_report(decoded_token['user_id'], last_classes, threshold))
+
+@api.route('/api/chamada/<nome>', methods=['DELETE'])
 def remove_user(nome):
     decoded_token, error_response, status_code = get_decoded_token()
     if error_response:
         return error_response, status_code
 
     professor_id = decoded_token['user_id']
+    since = changes_baseline(professor_id)
 
     success = operations.remove_professor_aluno_relationship(professor_id, nome)
     if success:
-        return jsonify({"message": f"Relação com {nome} removida com sucesso"})
+        return with_changes({"message": f"Relação com {nome} removida com sucesso"}, professor_id, since)
     else:
         return jsonify({"error": f"Falha ao remover relação com {nome}"}), 500
 
-@app.route('/api/presenca/<nome>/<matricula>', methods=['POST'])
+def presence_response(created, nome, professor_id: int, since: int):
+    """Resposta de record_presence: True (nova), False (já registrada hoje) ou None (falha)."""
+    if created:
+        return with_changes({"message": f"Presença de {nome} registrada com sucesso", "nova": True},
+                            professor_id, since)
+    elif created is False:
+        return with_changes({"message": f"Presença de {nome} já registrada hoje", "nova": False},
+                            professor_id, since)
+    else:
+        return jsonify({"error": f"Falha ao registrar presença de {nome}"}), 500
+
+@api.route('/api/presenca/<nome>/<matricula>', methods=['POST'])
 def record_presence(nome, matricula):
     decoded_token, error_response, status_code = get_decoded_token()
     if error_response:
         return error_response, status_code
 
     professor_id = decoded_token['user_id']
+    since = changes_baseline(professor_id)
     aluno = operations.get_user_by_nome_matricula(matricula, nome)
     if aluno != None:
         professor_aluno_id = operations.get_professor_aluno_id(professor_id, aluno.id)
-        print(professor_aluno_id)
         if professor_aluno_id != None:
-            success = operations.record_presence(professor_aluno_id)
-            if success:
-                return jsonify({"message": f"Presença de {nome} registrada com sucesso"})
-            else:
-                return jsonify({"error": f"Falha ao registrar presença de {nome}"}), 500
+            return presence_response(operations.record_presence(professor_aluno_id), nome, professor_id, since)
     return jsonify({"error": f"Aluno {nome} não encontrado"}), 404
 
-@app.route('/api/login', methods=['POST'])
+# Rotas endereçadas pelo id do aluno (campo 'id' da lista de chamada): não
+# dependem de o nome ser único e dispensam a busca por nome e matrícula.
+
+@api.route('/api/chamada/alunos/<int:aluno_id>', methods=['PUT', 'DELETE'])
+def student_by_id(aluno_id):
+    decoded_token, error_response, status_code = get_decoded_token()
+    if error_response:
+        return error_response, status_code
+
+    if not decoded_token['isTeacher']:
+        return jsonify({"error": "Apenas professores podem alterar a lista de chamada"}), 403
+
+    professor_id = decoded_token['user_id']
+    since = changes_baseline(professor_id)
+    aluno = operations.get_user_by_id(aluno_id)
+    if aluno is None or aluno.isTeacher:
+        return jsonify({"error": f"Aluno {aluno_id} não encontrado"}), 404
+    # Lido antes do commit, que expira o objeto
+    nome = aluno.nome
+
+    if request.method == 'PUT':
+        if operations.add_professor_student_relationship(professor_id, aluno):
+            return with_changes({"message": f"Relação com {nome} adicionada com sucesso"}, professor_id, since)
+        return jsonify({"error": f"Erro ao adicionar relação com {nome}"}), 500
+
+    if operations.remove_professor_aluno_relationship_by_id(professor_id, aluno_id):
+        return with_changes({"message": f"Relação com {nome} removida com sucesso"}, professor_id, since)
+    return jsonify({"error": f"Falha ao remover relação com {nome}"}), 500
+
+@api.route('/api/chamada/alunos/<int:aluno_id>/presenca', methods=['POST'])
+def record_presence_by_id(aluno_id):
+    decoded_token, error_response, status_code = get_decoded_token()
+    if error_response:
+        return error_response, status_code
+
+    if not decoded_token['isTeacher']:
+        return jsonify({"error": "Apenas professores podem registrar presenças"}), 403
+
+    professor_id = decoded_token['user_id']
+    since = changes_baseline(professor_id)
+    professor_aluno_id = operations.get_professor_aluno_id(professor_id, aluno_id)
+    if professor_aluno_id is None:
+        return jsonify({"error": f"Aluno {aluno_id} não encontrado na turma"}), 404
+    return presence_response(operations.record_presence(professor_aluno_id), f"aluno {aluno_id}", professor_id, since)
+
+def batch_matriculas(alunos):
+    """Matrículas de uma lista ``[{"matricula": "..."}, ...]``; None se o formato for inválido."""
+    if not isinstance(alunos, list):
+        return None
+    if not all(isinstance(aluno, dict) and isinstance(aluno.get('matricula'), str) for aluno in alunos):
+        return None
+    return [aluno['matricula'] for aluno in alunos]
+
+@api.route('/api/presenca', methods=['POST'])
+def record_presence_batch():
+    decoded_token, error_response, status_code = get_decoded_token()
+    if error_response:
+        return error_response, status_code
+
+    if not decoded_token['isTeacher']:
+        return jsonify({"error": "Apenas professores podem registrar presenças"}), 403
+
+    professor_id = decoded_token['user_id']
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Informe 'alunos' ou 'todos'"}), 400
+    if data.get('todos'):
+        # Turma inteira, exceto os alunos listados
+        exceto = batch_matriculas(data.get('exceto', []))
+        if exceto is None:
+            return jsonify({"error": "'exceto' deve ser uma lista de objetos com 'matricula' (texto)"}), 400
+        since = changes_baseline(professor_id)
+        result = operations.record_presence_batch(professor_id, exceto=exceto)
+    elif 'alunos' in data:
+        matriculas = batch_matriculas(data['alunos'])
+        if matriculas is None:
+            return jsonify({"error": "'alunos' deve ser uma lista de objetos com 'matricula' (texto)"}), 400
+        since = changes_baseline(professor_id)
+        result = operations.record_presence_batch(professor_id, matriculas=matriculas)
+    else:
+        return jsonify({"error": "Informe 'alunos' ou 'todos'"}), 400
+
+    if result is None:
+        return jsonify({"error": "Falha ao registrar presenças"}), 500
+
+    alunos, nao_encontrados, ja_registrados = result
+    return with_changes({
+        "message": f"{len(alunos) - len(ja_registrados)} presença(s) registrada(s) com sucesso",
+        "alunos": alunos,
+        "nao_encontrados": nao_encontrados,
+        "ja_registrados": ja_registrados
+    }, professor_id, since)
+
+@api.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
     matricula = data['matricula']
@@ -132,7 +503,7 @@ def login():
             'matricula': user.matricula,
             'isTeacher': user.isTeacher,
             'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
-        }, app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
+        }, current_app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
 
         return jsonify({
             "message": "Login bem-sucedido",
@@ -146,7 +517,7 @@ def login():
     else:
         return jsonify({"error": "Matrícula ou senha inválidos"}), 401
 
-@app.route('/api/signin', methods=['POST'])
+@api.route('/api/signin', methods=['POST'])
 def signin():
     data = request.get_json()
     nome = data['name']
@@ -165,7 +536,7 @@ def signin():
             'matricula': user.matricula,
             'isTeacher': user.isTeacher,
             'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
-        }, app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
+        }, current_app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
 
         return jsonify({
             "message": "Usuário criado com sucesso",
@@ -180,4 +551,4 @@ def signin():
         return jsonify({"error": "Não foi possível criar o usuário."}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""Métricas por requisição, log de consultas lentas e endpoint /metrics.
+
+Para cada rota são registrados, em histogramas no formato texto do
+Prometheus:
+
+* a latência da requisição (por método, rota e status);
+* o número de comandos SQL executados durante a requisição;
+* o tempo total gasto no banco durante a requisição.
+
+Os comandos SQL são contados pelos eventos ``before_cursor_execute`` /
+``after_cursor_execute`` de todos os engines do processo; a requisição
+atual fica num ``ContextVar``, então o mesmo código serve para threads
+(Flask) e corrotinas (asgi.py). Comandos acima de SLOW_QUERY_MS são
+registrados no log com o texto do comando.
+
+As métricas são do processo: com vários workers (gunicorn.conf.py), cada
+coleta do Prometheus vê o worker que atendeu a requisição.
+
+Configuração pelo ambiente:
+    LOG_LEVEL      nível do log (padrão INFO)
+    SLOW_QUERY_MS  limite para registrar um comando como lento (padrão 100)
+"""
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PREFIX = 'chamada'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+slow_query_ms = float(os.getenv("SLOW_QUERY_MS", "100"))
+logger = logging.getLogger('chamada.sql')
+
+class LogfmtFormatter(logging.Formatter):
+    """Formata os registros como ``chave=valor`` (logfmt), um por linha."""
+
+    def format(self, record):
+        message = record.getMessage()
+        if record.exc_info:
+            message += '\n' + self.formatException(record.exc_info)
+        fields = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': message,
+        }
+        fields.update(getattr(record, 'fields', {}))
+        return ' '.join(f'{key}={_logfmt_value(value)}' for key, value in fields.items())
+
+def _logfmt_value(value):
+    value = str(value)
+    if not value or any(char in value for char in ' ="\n'):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+    return value
+
+def configure_logging(level: str = None):
+    """Configura o logger raiz com o formato logfmt e o nível de LOG_LEVEL."""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(LogfmtFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+
+class Histogram:
+    """Histograma cumulativo com rótulos, no estilo do cliente do Prometheus."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple, buckets: tuple):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                labels = ','.join(f'{key}="{_escape(value)}"' for key, value in zip(self.labels, label_values))
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'{self.name}_sum{{{labels}}} {total}')
+                lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+class Counter:
+    """Contador sem rótulos."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def render(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter', f'{self.name} {self.value}']
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+request_latency = Histogram(f'{PREFIX}_http_request_duration_seconds', 'Latência das requisições.',
+                            ('method', 'route', 'status'), LATENCY_BUCKETS)
+request_statements = Histogram(f'{PREFIX}_http_request_sql_statements', 'Comandos SQL por requisição.',
+                               ('method', 'route'), STATEMENT_BUCKETS)
+request_db_time = Histogram(f'{PREFIX}_http_request_db_seconds', 'Tempo no banco por requisição.',
+                            ('method', 'route'), DB_TIME_BUCKETS)
+statements_total = Counter(f'{PREFIX}_db_statements_total', 'Comandos SQL executados.')
+slow_queries_total = Counter(f'{PREFIX}_db_slow_queries_total', 'Comandos SQL acima de SLOW_QUERY_MS.')
+
+# Coletores extras: nome -> função que retorna {chave: número}, exportados como gauges
+_collectors = {}
+
+def register_collector(name: str, collect):
+    """Exporta o dicionário retornado por ``collect()`` como gauges ``chamada_<name>_<chave>``."""
+    _collectors[name] = collect
+
+# [comandos, segundos] da requisição atual, ou None fora de uma requisição
+_current = contextvars.ContextVar('chamada_request_db', default=None)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    statements_total.inc()
+    current = _current.get()
+    if current is not None:
+        current[0] += 1
+        current[1] += elapsed
+    if elapsed * 1000 >= slow_query_ms:
+        slow_queries_total.inc()
+        logger.warning("Consulta lenta", extra={'fields': {
+            'duration_ms': round(elapsed * 1000, 1),
+            'statement': ' '.join(statement.split()),
+        }})
+
+def begin_request():
+    """Começa a contar os comandos SQL da requisição atual; retorna o token para ``end_request``."""
+    return _current.set([0, 0.0]), time.perf_counter()
+
+def end_request(state, method: str, route: str, status: int):
+    """Registra latência, comandos e tempo de banco da requisição iniciada em ``begin_request``."""
+    token, start = state
+    statements, db_seconds = _current.get()
+    _current.reset(token)
+    request_latency.observe(time.perf_counter() - start, method, route, str(status))
+    request_statements.observe(statements, method, route)
+    request_db_time.observe(db_seconds, method, route)
+
+def render():
+    """Todas as métricas no formato texto do Prometheus."""
+    lines = []
+    for metric in (request_latency, request_statements, request_db_time, statements_total, slow_queries_total):
+        lines.extend(metric.render())
+    for name, collect in sorted(_collectors.items()):
+        try:
+            values = collect()
+        except Exception:
+            logging.getLogger('chamada.metrics').exception("Falha no coletor %s", name)
+            continue
+        for key, value in sorted(values.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metric = f'{PREFIX}_{name}_{key}'
+                lines.extend([f'# TYPE {metric} gauge', f'{metric} {value}'])
+    return '\n'.join(lines) + '\n'
+
+def init_app(app):
+    """Instrumenta todas as rotas do app Flask e registra GET /metrics."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_metrics():
+        g.metrics_state = begin_request()
+
+    @app.after_request
+    def _record_metrics(response):
+        state = g.pop('metrics_state', None)
+        if state is not None:
+            route = request.url_rule.rule if request.url_rule else 'desconhecida'
+            end_request(state, request.method, route, response.status_code)
+        return response
+
+    @app.teardown_request
+    def _record_failed_request(exception=None):
+        # after_request não roda quando a view lança uma exceção não tratada
+        state = g.pop('metrics_state', None)
+        if state is not None:
+            route = request.url_rule.rule if request.url_rule else 'desconhecida'
+            end_request(state, request.method, route, 500)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    return app
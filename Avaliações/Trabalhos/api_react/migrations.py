@@ -0,0 +1,165 @@
+"""Migrações versionadas do esquema SQLite.
+
+``Base.metadata.create_all`` só cria tabelas que ainda não existem, então
+bancos já em uso (como test.db) nunca recebem colunas ou índices novos.
+Cada migração abaixo leva o esquema de uma versão para a seguinte; a versão
+aplicada fica gravada em ``PRAGMA user_version`` no próprio arquivo.
+
+As migrações são idempotentes: um banco recém-criado por ``create_all`` já
+tem o esquema final e apenas avança a versão.
+
+Uso:
+    python migrations.py
+"""
+from sqlalchemy import inspect
+
+def _columns(conn, table: str):
+    return {column['name'] for column in inspect(conn).get_columns(table)}
+
+def _counter_columns(conn):
+    """Contadores de presença em professor_aluno."""
+    columns = _columns(conn, 'professor_aluno')
+    if 'presencas_count' in columns and 'ultima_presenca' in columns:
+        return
+
+    if 'presencas_count' not in columns:
+        conn.exec_driver_sql("ALTER TABLE professor_aluno ADD COLUMN presencas_count INTEGER NOT NULL DEFAULT 0")
+    if 'ultima_presenca' not in columns:
+        conn.exec_driver_sql("ALTER TABLE professor_aluno ADD COLUMN ultima_presenca DATE")
+
+    # Preenche os contadores a partir do histórico existente
+    conn.exec_driver_sql("""
+        UPDATE professor_aluno SET
+            presencas_count = (SELECT count(*) FROM presenca WHERE presenca.professor_aluno_id = professor_aluno.id),
+            ultima_presenca = (SELECT max(dia) FROM presenca WHERE presenca.professor_aluno_id = professor_aluno.id)
+    """)
+
+def _attendance_indexes(conn):
+    """Índices secundários usados pelas consultas de operations.py."""
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_users_nome ON users (nome)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_professor_aluno_aluno_id ON professor_aluno (aluno_id)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_presenca_professor_aluno_dia ON presenca (professor_aluno_id, dia)")
+
+def _roster_page_index(conn):
+    """Índice da paginação por número de presenças."""
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_professor_aluno_presencas "
+                         "ON professor_aluno (professor_id, presencas_count, aluno_id)")
+
+def _unique_presence_day(conn):
+    """Uma presença por relação por dia: remove as duplicatas e torna o índice único."""
+    index = next((index for index in inspect(conn).get_indexes('presenca')
+                  if index['name'] == 'ix_presenca_professor_aluno_dia'), None)
+    if index is not None and index['unique']:
+        return
+
+    # Relações com presenças repetidas, cujos contadores mudam com a limpeza
+    duplicated = conn.exec_driver_sql("""
+        SELECT DISTINCT professor_aluno_id FROM presenca
+        GROUP BY professor_aluno_id, dia HAVING count(*) > 1
+    """).all()
+
+    # Mantém a primeira presença de cada dia
+    conn.exec_driver_sql("""
+        DELETE FROM presenca WHERE id NOT IN (
+            SELECT min(id) FROM presenca GROUP BY professor_aluno_id, dia
+        )
+    """)
+    if duplicated:
+        conn.exec_driver_sql("""
+            UPDATE professor_aluno SET
+                presencas_count = (SELECT count(*) FROM presenca WHERE presenca.professor_aluno_id = professor_aluno.id)
+            WHERE id = ?
+        """, [tuple(row) for row in duplicated])
+
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_presenca_professor_aluno_dia")
+    conn.exec_driver_sql("CREATE UNIQUE INDEX ix_presenca_professor_aluno_dia ON presenca (professor_aluno_id, dia)")
+
+def _presence_cascade(conn):
+    """ON DELETE CASCADE em presenca.professor_aluno_id.
+
+    O SQLite não altera chaves estrangeiras de uma tabela existente, então a
+    tabela é reconstruída. Presenças órfãs (de relações já removidas) são
+    descartadas antes da cópia.
+    """
+    foreign_keys = inspect(conn).get_foreign_keys('presenca')
+    if all(fk['options'].get('ondelete', '').upper() == 'CASCADE' for fk in foreign_keys):
+        return
+
+    conn.exec_driver_sql("DELETE FROM presenca WHERE professor_aluno_id NOT IN (SELECT id FROM professor_aluno)")
+    conn.exec_driver_sql("""
+        CREATE TABLE presenca_nova (
+            id INTEGER NOT NULL PRIMARY KEY,
+            dia DATE NOT NULL,
+            professor_aluno_id INTEGER NOT NULL REFERENCES professor_aluno (id) ON DELETE CASCADE
+        )
+    """)
+    conn.exec_driver_sql("INSERT INTO presenca_nova (id, dia, professor_aluno_id) "
+                         "SELECT id, dia, professor_aluno_id FROM presenca")
+    conn.exec_driver_sql("DROP TABLE presenca")
+    conn.exec_driver_sql("ALTER TABLE presenca_nova RENAME TO presenca")
+    conn.exec_driver_sql("CREATE UNIQUE INDEX ix_presenca_professor_aluno_dia ON presenca (professor_aluno_id, dia)")
+
+def _presence_archive(conn):
+    """Tabelas do arquivamento por período letivo (archive.py)."""
+    from models import PresencaArquivo, PeriodoArquivado
+    PresencaArquivo.__table__.create(conn, checkfirst=True)
+    PeriodoArquivado.__table__.create(conn, checkfirst=True)
+
+def _roster_name_columns(conn):
+    """Nome e matrícula do aluno em professor_aluno, com os índices da paginação e os gatilhos."""
+    from models import PROFESSOR_ALUNO_TRIGGERS
+    columns = _columns(conn, 'professor_aluno')
+    if 'aluno_nome' not in columns:
+        conn.exec_driver_sql("ALTER TABLE professor_aluno ADD COLUMN aluno_nome VARCHAR(50)")
+    if 'aluno_matricula' not in columns:
+        conn.exec_driver_sql("ALTER TABLE professor_aluno ADD COLUMN aluno_matricula VARCHAR(20)")
+    conn.exec_driver_sql("""
+        UPDATE professor_aluno SET
+            aluno_nome = (SELECT nome FROM users WHERE users.id = professor_aluno.aluno_id),
+            aluno_matricula = (SELECT matricula FROM users WHERE users.id = professor_aluno.aluno_id)
+        WHERE aluno_nome IS NULL OR aluno_matricula IS NULL
+    """)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_professor_aluno_nome "
+                         "ON professor_aluno (professor_id, aluno_nome, aluno_id)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_professor_aluno_matricula "
+                         "ON professor_aluno (professor_id, aluno_matricula, aluno_id)")
+    for trigger in PROFESSOR_ALUNO_TRIGGERS:
+        conn.exec_driver_sql(trigger)
+
+# Versão -> migração. Novas migrações entram sempre no fim da lista.
+MIGRATIONS = [
+    (1, _counter_columns),
+    (2, _attendance_indexes),
+    (3, _roster_page_index),
+    (4, _unique_presence_day),
+    (5, _presence_cascade),
+    (6, _presence_archive),
+    (7, _roster_name_columns),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(conn):
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+def migrate(engine):
+    """Aplica, em ordem, as migrações ainda não registradas no banco."""
+    applied = []
+    with engine.begin() as conn:
+        version = current_version(conn)
+        for target, migration in MIGRATIONS:
+            if target <= version:
+                continue
+            migration(conn)
+            # PRAGMA não aceita parâmetros; target vem da lista acima
+            conn.exec_driver_sql(f"PRAGMA user_version = {int(target)}")
+            applied.append(target)
+    return applied
+
+if __name__ == '__main__':
+    from database import engine, init_db
+    with engine.connect() as conn:
+        print(f"Versão atual do esquema: {current_version(conn)}")
+    init_db()
+    with engine.connect() as conn:
+        print(f"Versão após migração: {current_version(conn)} (última: {LATEST_VERSION})")
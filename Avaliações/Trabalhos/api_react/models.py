@@ -1,5 +1,5 @@
-from sqlalchemy import Boolean, Column, Date, ForeignKey, Integer, String, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import DDL, Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint, event
+from sqlalchemy.orm import backref, relationship
 from database import Base
 from datetime import datetime
 
@@ -15,6 +15,7 @@ class User(Base):
 
     __table_args__ = (
         UniqueConstraint('nome', 'matricula', name='_nome_matricula_uc'),
+        Index('ix_users_nome', 'nome'),
     )
     def __repr__(self):
         return f'<User {self.nome}>'
@@ -25,24 +26,118 @@ class ProfessorAluno(Base):
     id = Column(Integer, primary_key=True)
     professor_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     aluno_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    # Contadores mantidos por operations.record_presence (ver counters.py)
+    presencas_count = Column(Integer, nullable=False, default=0, server_default='0')
+    ultima_presenca = Column(Date, nullable=True)
+    # Cópias de users.nome e users.matricula mantidas pelos gatilhos de
+    # PROFESSOR_ALUNO_TRIGGERS, para a paginação ordenada usar um índice
+    aluno_nome = Column(String(50), nullable=True)
+    aluno_matricula = Column(String(20), nullable=True)
 
     professor = relationship('User', foreign_keys=[professor_id], backref='alunos')
     aluno = relationship('User', foreign_keys=[aluno_id], backref='professores')
 
-    __table_args__ = (UniqueConstraint('professor_id', 'aluno_id', name='_professor_aluno_uc'),)
+    __table_args__ = (
+        UniqueConstraint('professor_id', 'aluno_id', name='_professor_aluno_uc'),
+        Index('ix_professor_aluno_aluno_id', 'aluno_id'),
+        # Paginação da lista ordenada por presenças, nome ou matrícula (ver retrieve_students_page)
+        Index('ix_professor_aluno_presencas', 'professor_id', 'presencas_count', 'aluno_id'),
+        Index('ix_professor_aluno_nome', 'professor_id', 'aluno_nome', 'aluno_id'),
+        Index('ix_professor_aluno_matricula', 'professor_id', 'aluno_matricula', 'aluno_id'),
+    )
 
 
     def __repr__(self):
         return f'<ProfessorAluno {self.professor_id}-{self.aluno_id}>'
 
+# Preenchem aluno_nome e aluno_matricula em qualquer inserção (ORM, lote,
+# seed.py) e os acompanham se o usuário mudar de nome ou matrícula
+PROFESSOR_ALUNO_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS tr_professor_aluno_nome AFTER INSERT ON professor_aluno
+    BEGIN
+        UPDATE professor_aluno SET
+            aluno_nome = (SELECT nome FROM users WHERE id = NEW.aluno_id),
+            aluno_matricula = (SELECT matricula FROM users WHERE id = NEW.aluno_id)
+        WHERE id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tr_users_nome_professor_aluno AFTER UPDATE OF nome, matricula ON users
+    BEGIN
+        UPDATE professor_aluno SET aluno_nome = NEW.nome, aluno_matricula = NEW.matricula
+        WHERE aluno_id = NEW.id;
+    END
+    """,
+]
+
+for _trigger in PROFESSOR_ALUNO_TRIGGERS:
+    event.listen(ProfessorAluno.__table__, 'after_create', DDL(_trigger))
+
 class Presenca(Base):
     __tablename__ = 'presenca'
 
     id = Column(Integer, primary_key=True)
     dia = Column(Date, default=datetime.utcnow, nullable=False)
-    professor_aluno_id = Column(Integer, ForeignKey('professor_aluno.id'), nullable=False)
+    # Removida junto com a relação pelo próprio SQLite (PRAGMA foreign_keys em database.py)
+    professor_aluno_id = Column(Integer, ForeignKey('professor_aluno.id', ondelete='CASCADE'), nullable=False)
 
-    professor_aluno = relationship('ProfessorAluno', backref='presencas')
+    professor_aluno = relationship('ProfessorAluno', backref=backref('presencas', passive_deletes=True))
+
+    # Uma presença por relação por dia (ver operations._add_presence)
+    __table_args__ = (Index('ix_presenca_professor_aluno_dia', 'professor_aluno_id', 'dia', unique=True),)
 
     def __repr__(self):
         return f'<Presenca {self.dia} - {self.professor_aluno_id}>'
+
+class PresencaArquivo(Base):
+    """Presenças de períodos letivos encerrados, movidas de ``presenca`` por archive.py.
+
+    Tabela WITHOUT ROWID com chave (relação, dia): sem a coluna id e sem
+    índice secundário, cada presença ocupa uma única entrada da árvore.
+    """
+    __tablename__ = 'presenca_arquivo'
+
+    professor_aluno_id = Column(Integer, ForeignKey('professor_aluno.id', ondelete='CASCADE'), primary_key=True)
+    dia = Column(Date, primary_key=True)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    def __repr__(self):
+        return f'<PresencaArquivo {self.dia} - {self.professor_aluno_id}>'
+
+class PeriodoArquivado(Base):
+    """Períodos letivos já movidos para presenca_arquivo (ver archive.py)."""
+    __tablename__ = 'periodo_arquivado'
+
+    # 'AAAA-1' (janeiro a junho) ou 'AAAA-2' (julho a dezembro)
+    periodo = Column(String(7), primary_key=True)
+    inicio = Column(Date, nullable=False)
+    fim = Column(Date, nullable=False)
+    presencas = Column(Integer, nullable=False, default=0)
+    arquivado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PeriodoArquivado {self.periodo} ({self.presencas})>'
+
+class AlteracaoChamada(Base):
+    """Registro de cada alteração numa relação professor-aluno.
+
+    O id crescente funciona como versão: a versão da lista de um professor
+    (ou de um aluno) é o maior id das suas alterações.
+    """
+    __tablename__ = 'alteracao_chamada'
+
+    id = Column(Integer, primary_key=True)
+    professor_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    aluno_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    # 'adicionado', 'atualizado' ou 'removido'
+    tipo = Column(String(20), nullable=False)
+
+    __table_args__ = (
+        Index('ix_alteracao_chamada_professor', 'professor_id', 'id'),
+        Index('ix_alteracao_chamada_aluno', 'aluno_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<AlteracaoChamada {self.id} {self.tipo} {self.professor_id}-{self.aluno_id}>'
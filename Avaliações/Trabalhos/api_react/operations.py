@@ -1,26 +1,59 @@
-from database import db_session
-from models import User, ProfessorAluno, Presenca
+import os
+import logging
+import base64
+import heapq
+import json
+from database import db_session, engine, read_engine, read_session, write_timeout
+from models import User, ProfessorAluno, Presenca, PresencaArquivo, AlteracaoChamada
+from group_commit import GroupCommitter
+from passwords import HashingBusy, hash_password, needs_upgrade, verify_password
+from cache import roster_cache, professor_key, aluno_key, invalidate_relationship
+import identity
+import events
+from sqlalchemy import case, func, inspect, or_, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker
+from concurrent.futures import TimeoutError as FutureTimeout
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 def create_user(nome: str, senha: str, email: str, matricula: str, isTeacher: bool):
-    """Cria um novo usuário no banco de dados."""
+    """Cria um novo usuário no banco de dados, guardando apenas o hash da senha."""
     try:
-        user = User(nome=nome, senha=senha, email=email, matricula=matricula, isTeacher=isTeacher)
+        user = User(nome=nome, senha=hash_password(senha), email=email, matricula=matricula, isTeacher=isTeacher)
         db_session.add(user)
         db_session.commit()
+        roster_cache.invalidate(professor_key(user.id), aluno_key(user.id))
+        identity.remember_user(user)
         return user
+    except HashingBusy:
+        raise
     except Exception as e:
         db_session.rollback()
-        print(f"Erro ao criar usuário: {e}")  # Log do erro para depuração
+        logger.error("Erro ao criar usuário: %s", e)
         return None
 
 def login(matricula: str, senha: str):
-    """Realiza o login de um usuário verificando a matrícula e a senha."""
+    """Realiza o login de um usuário verificando a matrícula e a senha.
+
+    Senhas ainda em texto puro (ou com custo de hash antigo) são regravadas
+    com o hash atual depois de um login bem-sucedido.
+    """
     try:
-        user = db_session.query(User).filter_by(matricula=matricula, senha=senha).first()
+        user = db_session.query(User).filter_by(matricula=matricula).first()
+        # Matrícula inexistente também paga um hash (ver passwords.py)
+        if not verify_password(senha, user.senha if user is not None else None):
+            return None
+        if needs_upgrade(user.senha):
+            user.senha = hash_password(senha)
+            db_session.commit()
         return user
+    except HashingBusy:
+        raise
     except Exception as e:
-        print(f"Erro ao realizar login: {e}")  # Log do erro para depuração
+        db_session.rollback()
+        logger.error("Erro ao realizar login: %s", e)
         return None
 
 def add_professor_aluno_relationship(professor_id: int, aluno_id: int):
@@ -28,147 +61,642 @@ def add_professor_aluno_relationship(professor_id: int, aluno_id: int):
     try:
         relationship = ProfessorAluno(professor_id=professor_id, aluno_id=aluno_id)
         db_session.add(relationship)
+        _log_change(db_session, professor_id, aluno_id, 'adicionado')
+        # O id vem do flush; lido depois do commit custaria outra consulta
+        db_session.flush()
+        relationship_id = relationship.id
         db_session.commit()
+        identity.remember('relacao', (professor_id, aluno_id), relationship_id)
+        _remember_versions(db_session)
+        invalidate_relationship(professor_id, aluno_id)
+        events.publish_change('adicionado', professor_id, [aluno_id])
         return relationship
     except Exception as e:
         db_session.rollback()
-        print(f"Erro ao adicionar relação professor-aluno: {e}")  # Log do erro para depuração
+        logger.error("Erro ao adicionar relação professor-aluno: %s", e)
         return None
 
+def _log_change(session, professor_id: int, aluno_id: int, tipo: str):
+    """Registra uma alteração da relação, avançando a versão das listas envolvidas."""
+    change = AlteracaoChamada(professor_id=professor_id, aluno_id=aluno_id, tipo=tipo)
+    session.add(change)
+    session.info.setdefault('alteracoes', []).append((professor_id, change))
+
+def _remember_versions(session):
+    """Depois do commit: a versão que as alterações gravadas deram à lista de cada professor.
+
+    O id da alteração é a nova versão (roster_version); vem da chave de
+    identidade do registro, sem recarregá-lo do banco. Alterações desfeitas
+    por rollback não têm chave e ficam de fora.
+    """
+    for professor_id, change in session.info.pop('alteracoes', []):
+        key = inspect(change).identity
+        if key is not None:
+            identity.remember('versao', professor_id, key[0])
+
+def _counter_update(dia):
+    """Valores de UPDATE que somam uma presença no dia informado aos contadores da relação."""
+    return {
+        ProfessorAluno.presencas_count: ProfessorAluno.presencas_count + 1,
+        ProfessorAluno.ultima_presenca: case(
+            (ProfessorAluno.ultima_presenca == None, dia),
+            (ProfessorAluno.ultima_presenca < dia, dia),
+            else_=ProfessorAluno.ultima_presenca,
+        ),
+    }
+
+def _insert_presences(session, relationship_ids: list, dia):
+    """INSERT ... ON CONFLICT DO NOTHING das presenças do dia, sem commit.
+
+    Retorna o conjunto das relações em que a presença é nova; as que já
+    tinham presença nesse dia ficam de fora (índice único em Presenca).
+    """
+    inserted = set()
+    for chunk in _chunks(relationship_ids):
+        inserted.update(session.scalars(
+            sqlite_insert(Presenca)
+            .values([{'professor_aluno_id': relationship_id, 'dia': dia} for relationship_id in chunk])
+            .on_conflict_do_nothing(index_elements=['professor_aluno_id', 'dia'])
+            .returning(Presenca.professor_aluno_id)
+        ))
+    return inserted
+
+def _add_presence(session, professor_aluno_id: int, dia):
+    """Registra a presença do dia e atualiza os contadores da relação, sem commit.
+
+    Retorna a tupla (nova, professor_id, aluno_id). Se a relação já tinha
+    presença nesse dia (clique duplo, reenvio do cliente) nada é alterado e
+    a tupla é (False, None, None); senão o chamador recebe o professor e o
+    aluno para invalidar o cache depois do commit.
+    """
+    if not _insert_presences(session, [professor_aluno_id], dia):
+        return False, None, None
+    relationship = session.execute(
+        update(ProfessorAluno).where(ProfessorAluno.id == professor_aluno_id)
+        .values(_counter_update(dia))
+        .returning(ProfessorAluno.professor_id, ProfessorAluno.aluno_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if relationship is None:
+        raise ValueError(f"Relação professor-aluno {professor_aluno_id} não existe")
+    _log_change(session, relationship.professor_id, relationship.aluno_id, 'atualizado')
+    return True, relationship.professor_id, relationship.aluno_id
+
+# Group commit opcional para record_presence (PRESENCE_GROUP_COMMIT_MS > 0)
+presence_committer = None
+
+def configure_group_commit(window_ms: float, max_batch: int = 256):
+    """Ativa (window_ms > 0) ou desativa o group commit de record_presence."""
+    global presence_committer
+    if window_ms > 0:
+        session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        presence_committer = GroupCommitter(_add_presence, session_factory, window_ms, max_batch)
+    else:
+        presence_committer = None
+    return presence_committer
+
+configure_group_commit(float(os.getenv("PRESENCE_GROUP_COMMIT_MS", "0")),
+                       int(os.getenv("PRESENCE_GROUP_COMMIT_MAX_BATCH", "256")))
+
 def record_presence(professor_aluno_id: int, dia: datetime = None):
-    """Registra a presença de um aluno em um dia específico."""
+    """Registra a presença de um aluno em um dia específico.
+
+    Idempotente por dia: retorna True se a presença é nova, False se o aluno
+    já tinha presença nesse dia e None em caso de erro.
+    """
     try:
         dia = dia or datetime.utcnow().date()
-        presence = Presenca(professor_aluno_id=professor_aluno_id, dia=dia)
-        db_session.add(presence)
-        db_session.commit()
-        return presence
+        if presence_committer is not None:
+            # Libera a conexão de escrita desta thread para o group commit
+            # e espera o commit do lote em que a escrita foi incluída
+            db_session.close()
+            try:
+                created, professor_id, aluno_id = presence_committer.submit(professor_aluno_id, dia) \
+                    .result(timeout=write_timeout)
+            except FutureTimeout:
+                # Group commit travado: grava direto. Se o lote ainda gravar
+                # depois, o índice único do dia impede a presença em dobro
+                logger.warning("Group commit sem resposta em %ss; gravando a presença diretamente", write_timeout)
+                created, professor_id, aluno_id = _add_presence(db_session, professor_aluno_id, dia)
+                db_session.commit()
+        else:
+            created, professor_id, aluno_id = _add_presence(db_session, professor_aluno_id, dia)
+            db_session.commit()
+        if created:
+            # Gravada pelo group commit, a alteração não passa por esta sessão
+            identity.forget('versao', professor_id)
+            _remember_versions(db_session)
+            invalidate_relationship(professor_id, aluno_id)
+            events.publish_change('atualizado', professor_id, [aluno_id])
+        return created
     except Exception as e:
         db_session.rollback()
-        print(f"Erro ao registrar presença: {e}")  # Log do erro para depuração
+        logger.error("Erro ao registrar presença: %s", e)
         return None
     
 def remove_professor_aluno_relationship(professor_id: int, nome_aluno: str):
     """Remove a relação entre um professor e um aluno, incluindo todas as presenças associadas."""
     try:
         aluno_id = db_session.query(User).filter_by(nome=nome_aluno).first().id
-        
-        # Inicia uma transação
-        with db_session.begin_nested():
-            relationship = db_session.query(ProfessorAluno).filter_by(professor_id=professor_id, aluno_id=aluno_id).first()
-
-            if relationship:
-                # Primeiro, removemos as presenças associadas a esta relação
-                db_session.query(Presenca).filter_by(professor_aluno_id=relationship.id).delete()
-
-                # Depois, removemos a relação entre o professor e o aluno
-                db_session.delete(relationship)
-            
-            db_session.commit()
-            return True
+    except Exception as e:
+        logger.error("Erro ao remover relação professor-aluno: %s", e)
         return False
+    return remove_professor_aluno_relationship_by_id(professor_id, aluno_id)
+
+def remove_professor_aluno_relationship_by_id(professor_id: int, aluno_id: int):
+    """Remove a relação entre um professor e o aluno ``aluno_id``, incluindo todas as presenças associadas."""
+    try:
+        # Sem SAVEPOINT: ele abriria a transação já na leitura abaixo, e o SQLite
+        # recusa na hora (sem esperar o busy_timeout) a promoção de um leitor a
+        # escritor enquanto outro processo escreve. O commit único já é atômico.
+        relationship_id = get_professor_aluno_id(professor_id, aluno_id)
+
+        if relationship_id is not None:
+            # As presenças da relação saem junto, pelo ON DELETE CASCADE do SQLite
+            db_session.query(ProfessorAluno).filter_by(id=relationship_id).delete(synchronize_session=False)
+            _log_change(db_session, professor_id, aluno_id, 'removido')
+
+        db_session.commit()
+        identity.remember('relacao', (professor_id, aluno_id), None)
+        _remember_versions(db_session)
+        invalidate_relationship(professor_id, aluno_id)
+        if relationship_id is not None:
+            events.publish_change('removido', professor_id, [aluno_id])
+        return True
     
     except Exception as e:
         db_session.rollback()
-        print(f"Erro ao remover relação professor-aluno: {e}")  # Log do erro para depuração
+        logger.error("Erro ao remover relação professor-aluno: %s", e)
         return False
 
-def retrieve_students_for_professor(professor_id: int):
-    """Recupera todos os alunos que têm uma relação com um professor específico e exibe o número de presenças."""
-    try:
-        # Recupera todas as relações entre o professor e seus alunos
-        relationships = db_session.query(ProfessorAluno).filter_by(professor_id=professor_id).all()
-        
-        # IDs dos alunos associados ao professor
-        aluno_ids = [relationship.aluno_id for relationship in relationships]
-        
-        # Recupera todos os alunos que não são professores e têm uma relação com o professor
-        students = db_session.query(User).filter(User.id.in_(aluno_ids), User.isTeacher == False).all()
-
-        # Cria um dicionário para mapear aluno_id para o número de presenças
-        student_presencas = {}
-        for relationship in relationships:
-            # Conta o número de presenças do aluno
-            presencas_count = db_session.query(Presenca).filter_by(professor_aluno_id=relationship.id).count()
-            student_presencas[relationship.aluno_id] = presencas_count
-        
-        # Formata os dados dos alunos com o número de presenças
-        formatted_students = {}
-        for student in students:
-            # Recupera o número de presenças para o aluno
-            presencas_count = student_presencas.get(student.id, 0)
-            formatted_students[student.nome] = {
-                'matricula': student.matricula,
-                'presencas': presencas_count
-            }
+def roster_version(professor_id: int):
+    """Versão atual da lista de chamada de um professor (0 se nunca alterada).
 
+    Lida uma vez por requisição; as escritas da requisição a atualizam (ver identity.py).
+    """
+    return identity.lookup('versao', professor_id, lambda: read_session.query(func.max(AlteracaoChamada.id))
+                           .filter(AlteracaoChamada.professor_id == professor_id).scalar() or 0)
+
+def student_version(aluno_id: int):
+    """Versão atual da lista de professores de um aluno (0 se nunca alterada)."""
+    return read_session.query(func.max(AlteracaoChamada.id)) \
+        .filter(AlteracaoChamada.aluno_id == aluno_id).scalar() or 0
+
+def _students_for_professor(session, professor_id: int):
+    """Consulta da lista de alunos de um professor, sem cache.
+
+    Recebe a sessão para ser compartilhada com a versão assíncrona
+    (``async_operations``), que a executa via ``run_sync``.
+    """
+    # Uma única consulta usando o contador mantido em ProfessorAluno
+    rows = session.query(User.id, User.nome, User.matricula, ProfessorAluno.presencas_count) \
+        .join(ProfessorAluno, ProfessorAluno.aluno_id == User.id) \
+        .filter(ProfessorAluno.professor_id == professor_id, User.isTeacher == False) \
+        .order_by(User.id) \
+        .all()
+
+    # Formata os dados dos alunos com o número de presenças; o id permite
+    # usar as rotas /api/chamada/alunos/<id>
+    formatted_students = {}
+    for aluno_id, nome, matricula, presencas_count in rows:
+        formatted_students[nome] = {
+            'id': aluno_id,
+            'matricula': matricula,
+            'presencas': presencas_count
+        }
+    return formatted_students
+
+def _professors_for_student(session, student_id: int):
+    """Consulta da lista de professores de um aluno, sem cache."""
+    # Uma única consulta usando o contador mantido em ProfessorAluno
+    rows = session.query(User.nome, ProfessorAluno.presencas_count) \
+        .join(ProfessorAluno, ProfessorAluno.professor_id == User.id) \
+        .filter(ProfessorAluno.aluno_id == student_id, User.isTeacher == True) \
+        .order_by(User.id) \
+        .all()
+
+    # Formata os dados dos professores com o número de presenças
+    formatted_professors = {}
+    for nome, presencas_count in rows:
+        formatted_professors[nome] = presencas_count
+    return formatted_professors
+
+def retrieve_students_for_professor(professor_id: int, version: int = None):
+    """Recupera todos os alunos que têm uma relação com um professor específico e exibe o número de presenças.
+
+    O cache só é usado se tiver sido gravado na versão atual da lista, lida
+    antes da consulta; assim uma escrita concorrente nunca deixa dados velhos
+    no cache com uma versão nova.
+    """
+    try:
+        if version is None:
+            version = roster_version(professor_id)
+        cached = roster_cache.get(professor_key(professor_id))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        formatted_students = _students_for_professor(read_session, professor_id)
+        roster_cache.set(professor_key(professor_id), (version, formatted_students))
         return formatted_students
     except Exception as e:
-        print(f"Erro ao recuperar alunos para o professor: {e}")  # Log do erro para depuração
+        logger.error("Erro ao recuperar alunos para o professor: %s", e)
         return {}
     
-def retrieve_professors_for_students(student_id: int):
+def retrieve_professors_for_students(student_id: int, version: int = None):
     """Recupera todos os professores associados a um aluno específico e exibe o número de presenças com cada professor."""
     try:
-        # Recupera todas as relações entre o aluno e seus professores
-        relationships = db_session.query(ProfessorAluno).filter_by(aluno_id=student_id).all()
-        
-        # IDs dos professores associados ao aluno
-        professor_ids = [relationship.professor_id for relationship in relationships]
-        
-        # Recupera todos os professores que têm uma relação com o aluno
-        professors = db_session.query(User).filter(User.id.in_(professor_ids), User.isTeacher == True).all()
-
-        # Cria um dicionário para mapear professor_id para o número de presenças
-        professor_presencas = {}
-        for relationship in relationships:
-            # Conta o número de presenças do aluno com o professor
-            presencas_count = db_session.query(Presenca).filter_by(professor_aluno_id=relationship.id).count()
-            professor_presencas[relationship.professor_id] = presencas_count
-        
-        # Formata os dados dos professores com o número de presenças
-        formatted_professors = {}
-        for professor in professors:
-            # Recupera o número de presenças para o aluno com o professor
-            presencas_count = professor_presencas.get(professor.id, 0)
-            formatted_professors[professor.nome] = presencas_count
+        if version is None:
+            version = student_version(student_id)
+        cached = roster_cache.get(aluno_key(student_id))
+        if cached is not None and cached[0] == version:
+            return cached[1]
 
+        formatted_professors = _professors_for_student(read_session, student_id)
+        roster_cache.set(aluno_key(student_id), (version, formatted_professors))
         return formatted_professors
     except Exception as e:
-        print(f"Erro ao recuperar professores para o aluno: {e}")  # Log do erro para depuração
+        logger.error("Erro ao recuperar professores para o aluno: %s", e)
         return {}
     
 def get_user_by_nome_matricula(matricula: str,  nome: str):
-    """Recupera um usuário pelo número de matrícula."""
-    try:
-        print(matricula, nome)
+    """Recupera um usuário pelo número de matrícula (uma vez por requisição, ver identity.py)."""
+    def load():
+        logger.debug("Buscando usuário matricula=%s nome=%s", matricula, nome)
         user = db_session.query(User).filter_by(matricula=matricula, nome=nome).first()
+        if user is not None:
+            identity.remember('user', user.id, user)
         return user
+
+    try:
+        return identity.lookup('user_nome_matricula', (nome, matricula), load)
     except Exception as e:
-        print(f"Erro ao recuperar usuário por matrícula: {e}")  # Log do erro para depuração
+        logger.error("Erro ao recuperar usuário por matrícula: %s", e)
         return None
 
+def get_user_by_id(user_id: int):
+    """Recupera um usuário pelo id (uma vez por requisição, ver identity.py)."""
+    try:
+        return identity.lookup('user', user_id, lambda: db_session.get(User, user_id))
+    except Exception as e:
+        logger.error("Erro ao recuperar usuário por id: %s", e)
+        return None
+
+def _link_student(professor_id: int, user):
+    """Adiciona a relação com ``user`` se ele for um aluno; True se a relação existir ao final."""
+    if user is None or user.isTeacher:
+        return False
+    if get_professor_aluno_id(professor_id, user.id) is not None:
+        return True
+    return add_professor_aluno_relationship(professor_id, user.id) is not None
+
 def add_professor_student_relationship_if_exists(professor_id: int, matricula: str, nome: str):
     """Adiciona uma relação entre um professor e um aluno se o aluno existir."""
     try:
-        user = get_user_by_nome_matricula(matricula, nome)
-        checkIfAlreadyExists = db_session.query(ProfessorAluno).filter_by(professor_id=professor_id, aluno_id=user.id).first()
-        if checkIfAlreadyExists:
-            return True
-        if user and not user.isTeacher:
-            relationship = add_professor_aluno_relationship(professor_id, user.id)
-            return relationship is not None
+        return _link_student(professor_id, get_user_by_nome_matricula(matricula, nome))
+    except Exception as e:
+        logger.error("Erro ao adicionar relação professor-aluno: %s", e)
         return False
+
+def add_professor_student_relationship(professor_id: int, aluno: User):
+    """Adiciona uma relação entre um professor e ``aluno``, já carregado pela rota (ver identity.py)."""
+    try:
+        return _link_student(professor_id, aluno)
     except Exception as e:
-        print(f"Erro ao adicionar relação professor-aluno: {e}")  # Log do erro para depuração
+        logger.error("Erro ao adicionar relação professor-aluno: %s", e)
         return False
 
 def get_professor_aluno_id(professor_id: int, aluno_id: int):
-    """Obtém o ID da relação entre professor e aluno."""
+    """Obtém o ID da relação entre professor e aluno (uma vez por requisição, ver identity.py)."""
+    def load():
+        relationship_id = db_session.query(ProfessorAluno.id) \
+            .filter_by(professor_id=professor_id, aluno_id=aluno_id).scalar()
+        logger.debug("Relação professor=%s aluno=%s: %s", professor_id, aluno_id, relationship_id)
+        return relationship_id
+
     try:
-        relationship = db_session.query(ProfessorAluno).filter_by(professor_id=professor_id, aluno_id=aluno_id).first()
-        print("Relação", professor_id, aluno_id, relationship)
-        return relationship.id if relationship else None
+        return identity.lookup('relacao', (professor_id, aluno_id), load)
     except Exception as e:
-        print(f"Erro ao recuperar relação professor-aluno: {e}")
-        return None
\ No newline at end of file
+        logger.error("Erro ao recuperar relação professor-aluno: %s", e)
+        return None
+
+# Limite de parâmetros por IN (...) para ficar abaixo do máximo do SQLite
+_IN_CHUNK = 500
+
+def _chunks(values: list, size: int = _IN_CHUNK):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _import_field(value, accept_int: bool = False):
+    """Valor de um campo da importação como texto sem espaços nas pontas.
+
+    Campo ausente vira ''; listas, objetos, booleanos e números (salvo
+    inteiros, com ``accept_int``) não são convertidos e retornam None.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value.strip()
+    if accept_int and isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    return None
+
+def import_students(professor_id: int, rows: list):
+    """Importa uma lista de alunos ({'nome', 'matricula'}) para a turma de um professor.
+
+    Cria os usuários que ainda não existem e as relações que faltam numa única
+    transação, com inserções em lote. Retorna o resultado de cada linha:
+    'criado', 'vinculado' ou 'rejeitado' (com o motivo).
+    """
+    results = []
+    pending = []
+    seen = set()
+    for row in rows:
+        nome = _import_field(row.get('nome'))
+        matricula = _import_field(row.get('matricula'), accept_int=True)
+        result = {'nome': row.get('nome') if nome is None else nome,
+                  'matricula': row.get('matricula') if matricula is None else matricula}
+        results.append(result)
+        if nome is None:
+            result.update(status='rejeitado', motivo='Nome deve ser texto')
+        elif matricula is None:
+            result.update(status='rejeitado', motivo='Matrícula deve ser texto ou número inteiro')
+        elif not nome or not matricula:
+            result.update(status='rejeitado', motivo='Nome e matrícula são obrigatórios')
+        elif matricula in seen:
+            result.update(status='rejeitado', motivo='Matrícula repetida na importação')
+        else:
+            seen.add(matricula)
+            pending.append(result)
+
+    try:
+        # Uma consulta (por bloco) para os usuários já existentes
+        matriculas = [result['matricula'] for result in pending]
+        emails = [f"{result['nome']}@example.com" for result in pending]
+        existing = {}
+        for chunk in _chunks(matriculas):
+            for user in db_session.query(User).filter(User.matricula.in_(chunk)):
+                existing[user.matricula] = user
+        used_emails = set()
+        for chunk in _chunks(emails):
+            used_emails.update(email for (email,) in db_session.query(User.email).filter(User.email.in_(chunk)))
+
+        to_link = []
+        new_users = []
+        # A senha padrão é a mesma para todos: um único hash por importação
+        default_senha = None
+        for result in pending:
+            user = existing.get(result['matricula'])
+            if user is None:
+                email = f"{result['nome']}@example.com"
+                if email in used_emails:
+                    result.update(status='rejeitado', motivo='Email já existente para outro usuário')
+                    continue
+                used_emails.add(email)
+                default_senha = default_senha or hash_password('default_password')
+                user = User(nome=result['nome'], senha=default_senha, email=email,
+                            matricula=result['matricula'], isTeacher=False)
+                new_users.append(user)
+                result['status'] = 'criado'
+            elif user.isTeacher:
+                result.update(status='rejeitado', motivo='Matrícula já existente para um professor')
+                continue
+            elif user.nome != result['nome']:
+                result.update(status='rejeitado', motivo='Matrícula já existente para outro aluno')
+                continue
+            else:
+                result['status'] = 'vinculado'
+            to_link.append((result, user))
+
+        # Inserção em lote dos novos usuários (os ids vêm do flush)
+        db_session.add_all(new_users)
+        db_session.flush()
+
+        aluno_ids = []
+        for result, user in to_link:
+            result['id'] = user.id
+            aluno_ids.append(user.id)
+        linked = set()
+        for chunk in _chunks(aluno_ids):
+            linked.update(aluno_id for (aluno_id,) in db_session.query(ProfessorAluno.aluno_id)
+                          .filter(ProfessorAluno.professor_id == professor_id, ProfessorAluno.aluno_id.in_(chunk)))
+        new_links = [aluno_id for aluno_id in aluno_ids if aluno_id not in linked]
+        db_session.add_all([ProfessorAluno(professor_id=professor_id, aluno_id=aluno_id) for aluno_id in new_links])
+        db_session.bulk_insert_mappings(AlteracaoChamada, [{'professor_id': professor_id, 'aluno_id': aluno_id,
+                                                            'tipo': 'adicionado'} for aluno_id in new_links])
+        db_session.commit()
+
+        roster_cache.invalidate(professor_key(professor_id), *(aluno_key(aluno_id) for aluno_id in aluno_ids))
+        # Alterações gravadas em lote, sem objetos: a versão volta a ser lida do banco
+        identity.forget('versao', professor_id)
+        events.publish_change('adicionado', professor_id, new_links)
+        return results
+    except HashingBusy:
+        db_session.rollback()
+        raise
+    except Exception as e:
+        db_session.rollback()
+        logger.error("Erro ao importar alunos: %s", e)
+        return None
+
+def record_presence_batch(professor_id: int, matriculas: list = None, exceto: list = None, dia: datetime = None):
+    """Registra a presença de vários alunos de um professor numa única transação.
+
+    Com ``matriculas`` registra apenas esses alunos; sem ``matriculas`` registra
+    a turma inteira, exceto as matrículas em ``exceto``. Alunos que já têm
+    presença no dia não são contados de novo. Retorna a tupla (alunos no
+    formato de retrieve_students_for_professor, com o id, matrículas não encontradas
+    na turma, matrículas que já tinham presença no dia).
+    """
+    try:
+        dia = dia or datetime.utcnow().date()
+        query = db_session.query(ProfessorAluno.id, ProfessorAluno.aluno_id, User.nome, User.matricula,
+                                 ProfessorAluno.presencas_count) \
+            .join(User, ProfessorAluno.aluno_id == User.id) \
+            .filter(ProfessorAluno.professor_id == professor_id, User.isTeacher == False)
+
+        # Resolve todos os alunos com uma consulta (por bloco de matrículas)
+        if matriculas is not None:
+            matriculas = [str(matricula) for matricula in matriculas]
+            rows = []
+            for chunk in _chunks(matriculas):
+                rows.extend(query.filter(User.matricula.in_(chunk)).all())
+        else:
+            excluded = {str(matricula) for matricula in exceto or []}
+            rows = [row for row in query.all() if row.matricula not in excluded]
+
+        found = {row.matricula for row in rows}
+        not_found = [matricula for matricula in matriculas or [] if matricula not in found]
+
+        # Contadores e log só para as relações em que a presença é nova
+        created = _insert_presences(db_session, [row.id for row in rows], dia)
+        new_rows = [row for row in rows if row.id in created]
+        for chunk in _chunks([row.id for row in new_rows]):
+            db_session.query(ProfessorAluno).filter(ProfessorAluno.id.in_(chunk)) \
+                .update(_counter_update(dia), synchronize_session=False)
+        db_session.bulk_insert_mappings(AlteracaoChamada, [{'professor_id': professor_id, 'aluno_id': row.aluno_id,
+                                                            'tipo': 'atualizado'} for row in new_rows])
+        db_session.commit()
+
+        if new_rows:
+            roster_cache.invalidate(professor_key(professor_id), *(aluno_key(row.aluno_id) for row in new_rows))
+            identity.forget('versao', professor_id)
+            events.publish_change('atualizado', professor_id, [row.aluno_id for row in new_rows])
+        updated = {row.nome: {'id': row.aluno_id, 'matricula': row.matricula,
+                              'presencas': row.presencas_count + (1 if row.id in created else 0)} for row in rows}
+        already = [row.matricula for row in rows if row.id not in created]
+        return updated, not_found, already
+    except Exception as e:
+        db_session.rollback()
+        logger.error("Erro ao registrar presenças em lote: %s", e)
+        return None
+
+def _roster_delta(session, professor_id: int, since: int):
+    """Consulta de roster_delta, recebendo a sessão (ver _students_for_professor)."""
+    changes = session.query(
+        AlteracaoChamada.aluno_id,
+        func.max(case((AlteracaoChamada.tipo == 'adicionado', 1), else_=0)),
+    ).filter(AlteracaoChamada.professor_id == professor_id, AlteracaoChamada.id > since) \
+        .group_by(AlteracaoChamada.aluno_id).all()
+    added = {aluno_id for aluno_id, was_added in changes if was_added}
+    aluno_ids = [aluno_id for aluno_id, _ in changes]
+
+    delta = {'adicionados': {}, 'atualizados': {}, 'removidos': []}
+    current = set()
+    for chunk in _chunks(aluno_ids):
+        rows = session.query(User.id, User.nome, User.matricula, ProfessorAluno.presencas_count) \
+            .join(ProfessorAluno, ProfessorAluno.aluno_id == User.id) \
+            .filter(ProfessorAluno.professor_id == professor_id, User.isTeacher == False,
+                    ProfessorAluno.aluno_id.in_(chunk)).all()
+        for aluno_id, nome, matricula, presencas_count in rows:
+            current.add(aluno_id)
+            key = 'adicionados' if aluno_id in added else 'atualizados'
+            delta[key][nome] = {'id': aluno_id, 'matricula': matricula, 'presencas': presencas_count}
+
+    delta['removidos'] = [aluno_id for aluno_id in aluno_ids if aluno_id not in current]
+    return delta
+
+def roster_delta(professor_id: int, since: int):
+    """Alterações na lista de um professor depois da versão ``since``.
+
+    Retorna os alunos adicionados e atualizados (no formato de
+    retrieve_students_for_professor, com o id de cada aluno) e os ids dos
+    alunos removidos.
+    """
+    try:
+        return _roster_delta(read_session, professor_id, since)
+    except Exception as e:
+        logger.error("Erro ao recuperar alterações da lista de chamada: %s", e)
+        return None
+
+# Colunas aceitas para ordenar a lista paginada; todas de professor_aluno,
+# cada uma com um índice (professor_id, coluna, aluno_id)
+ROSTER_SORT_COLUMNS = {
+    'nome': ProfessorAluno.aluno_nome,
+    'matricula': ProfessorAluno.aluno_matricula,
+    'presencas': ProfessorAluno.presencas_count,
+}
+
+def encode_cursor(value, aluno_id: int, sort: str, descending: bool):
+    payload = [sort, 'desc' if descending else 'asc', value, aluno_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str, sort: str, descending: bool):
+    """Retorna (valor da ordenação, aluno_id) do último item da página anterior.
+
+    O cursor guarda a ordenação em que foi gerado: com outra ``sort`` ou
+    direção o valor seria comparado com a coluna errada (o SQLite compara
+    texto com número sem erro) e a página viria errada, então é recusado.
+    """
+    try:
+        cursor_sort, direction, value, aluno_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        aluno_id = int(aluno_id)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+    if [cursor_sort, direction] != [sort, 'desc' if descending else 'asc']:
+        raise ValueError("Cursor gerado com outra ordenação; recomece a paginação sem cursor")
+    expected = int if sort == 'presencas' else str
+    if not isinstance(value, expected) or isinstance(value, bool):
+        raise ValueError("Cursor inválido")
+    return value, aluno_id
+
+def retrieve_students_page(professor_id: int, limit: int, sort: str = 'nome', descending: bool = False,
+                           cursor: str = None, below: int = None):
+    """Recupera uma página da lista de alunos de um professor com paginação por chave (keyset).
+
+    A página começa depois do último item identificado por ``cursor`` (gerado
+    com a mesma ordenação) e é buscada com uma única consulta que percorre o
+    índice (professor_id, ``sort``, aluno_id) de professor_aluno. Com
+    ``below`` traz apenas alunos com menos de ``below`` presenças. Retorna a
+    lista de alunos e o cursor da próxima página (None na última).
+    """
+    if sort not in ROSTER_SORT_COLUMNS:
+        raise ValueError(f"Ordenação inválida: {sort}")
+    column = ROSTER_SORT_COLUMNS[sort]
+    key = tuple_(column, ProfessorAluno.aluno_id)
+
+    query = read_session.query(ProfessorAluno.aluno_id, User.nome, User.matricula, ProfessorAluno.presencas_count) \
+        .join(User, ProfessorAluno.aluno_id == User.id) \
+        .filter(ProfessorAluno.professor_id == professor_id, User.isTeacher == False)
+    if below is not None:
+        query = query.filter(ProfessorAluno.presencas_count < below)
+    if cursor:
+        last = tuple_(*decode_cursor(cursor, sort, descending))
+        query = query.filter(key < last if descending else key > last)
+    if descending:
+        query = query.order_by(column.desc(), ProfessorAluno.aluno_id.desc())
+    else:
+        query = query.order_by(column, ProfessorAluno.aluno_id)
+
+    # Um item a mais indica se existe próxima página
+    rows = query.limit(limit + 1).all()
+    students = [{'id': aluno_id, 'nome': nome, 'matricula': matricula, 'presencas': presencas_count}
+                for aluno_id, nome, matricula, presencas_count in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = students[-1]
+        next_cursor = encode_cursor(last[sort], last['id'], sort, descending)
+    return students, next_cursor
+
+def iter_attendance_history(professor_id: int, start=None, end=None, batch_size: int = 1000):
+    """Gera (nome, matrícula, dia) de cada presença registrada por um professor.
+
+    As linhas vêm em blocos de ``batch_size``, com paginação por chave
+    (aluno, dia) na ordem dos índices, então a memória usada não depende do
+    tamanho do histórico e a primeira linha sai logo após o primeiro bloco.
+    Cada bloco é lido numa conexão e numa transação próprias, encerradas
+    antes de as linhas seguirem para o cliente: fora do WAL, um leitor com a
+    transação aberta durante o download bloquearia todas as escritas. Por
+    isso a exportação não é um retrato de um único instante; presenças
+    gravadas durante o download podem ou não aparecer. Presenças ativas e
+    arquivadas (archive.py) são lidas separadamente e intercaladas na mesma
+    ordem. ``start`` e ``end`` limitam o intervalo de dias (inclusive).
+    """
+    def rows(table):
+        query = select(ProfessorAluno.aluno_id, User.nome, User.matricula, table.dia) \
+            .select_from(ProfessorAluno) \
+            .join(table, table.professor_aluno_id == ProfessorAluno.id) \
+            .join(User, User.id == ProfessorAluno.aluno_id) \
+            .where(ProfessorAluno.professor_id == professor_id) \
+            .order_by(ProfessorAluno.aluno_id, table.dia) \
+            .limit(batch_size)
+        if start is not None:
+            query = query.where(table.dia >= start)
+        if end is not None:
+            query = query.where(table.dia <= end)
+
+        page = query
+        while True:
+            with read_engine.connect() as conn:
+                chunk = conn.execute(page).all()
+            yield from chunk
+            if len(chunk) < batch_size:
+                return
+            last_aluno, _, _, last_dia = chunk[-1]
+            # A condição em aluno_id sozinha delimita o índice; a outra
+            # descarta os dias já lidos do último aluno
+            page = query.where(ProfessorAluno.aluno_id >= last_aluno,
+                               or_(ProfessorAluno.aluno_id > last_aluno, table.dia > last_dia))
+
+    merged = heapq.merge(rows(Presenca), rows(PresencaArquivo), key=lambda row: (row[0], row[3]))
+    for _, nome, matricula, dia in merged:
+        yield nome, matricula, dia
@@ -0,0 +1,121 @@
+"""Hash de senhas com scrypt executado num pool limitado de threads.
+
+O custo do scrypt é proposital, então o cálculo roda em um executor
+dedicado em vez de ocupar a thread do Flask. A fila do executor é limitada:
+quando já há ``workers + queue`` hashes pendentes, ``HashingBusy`` é lançada
+e a rota responde 503 em vez de acumular requisições.
+
+Formato armazenado: ``scrypt$<log2 N>$<r>$<p>$<salt base64>$<hash base64>``.
+Senhas antigas em texto puro continuam aceitas e são convertidas no login
+(ver ``needs_upgrade``). Para uma matrícula inexistente o login confere a
+senha com um hash fictício do custo atual: as duas respostas levam o mesmo
+tempo e não revelam quais matrículas existem.
+
+Configuração pelo ambiente:
+    PASSWORD_HASH_COST     log2 do parâmetro N do scrypt (padrão 14)
+    PASSWORD_HASH_WORKERS  threads do executor (padrão: número de CPUs)
+    PASSWORD_HASH_QUEUE    hashes que podem esperar na fila (padrão 32)
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PREFIX = 'scrypt'
+BLOCK_SIZE = 8
+PARALLELISM = 1
+KEY_LENGTH = 32
+
+class HashingBusy(Exception):
+    """A fila do executor de hash está cheia."""
+
+cost = None
+_executor = None
+_slots = None
+_dummy_hash = None
+
+def configure(new_cost: int = None, workers: int = None, queue: int = None):
+    """(Re)cria o executor com o custo e os limites informados."""
+    global cost, _executor, _slots, _dummy_hash
+    cost = new_cost or int(os.getenv("PASSWORD_HASH_COST", "14"))
+    _dummy_hash = _dummy(cost)
+    workers = workers or int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+    queue = queue if queue is not None else int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    _slots = threading.BoundedSemaphore(workers + queue)
+
+def _run(func, *args):
+    """Executa ``func`` no executor e espera o resultado, respeitando o limite da fila."""
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        return _executor.submit(func, *args).result()
+    finally:
+        _slots.release()
+
+async def _run_async(func, *args):
+    """Versão de ``_run`` para corrotinas: aguarda o executor sem bloquear o event loop."""
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        return await asyncio.wrap_future(_executor.submit(func, *args))
+    finally:
+        _slots.release()
+
+def _scrypt(password: str, salt: bytes, log_n: int, r: int, p: int):
+    n = 1 << log_n
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r, dklen=KEY_LENGTH)
+
+def _encode(password: str, log_n: int):
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, log_n, BLOCK_SIZE, PARALLELISM)
+    return '$'.join((PREFIX, str(log_n), str(BLOCK_SIZE), str(PARALLELISM),
+                     base64.b64encode(salt).decode('ascii'), base64.b64encode(digest).decode('ascii')))
+
+def _dummy(log_n: int):
+    """Valor no formato armazenado, com o custo ``log_n``, que nenhuma senha confere (hash zerado)."""
+    return '$'.join((PREFIX, str(log_n), str(BLOCK_SIZE), str(PARALLELISM),
+                     base64.b64encode(os.urandom(16)).decode('ascii'), base64.b64encode(bytes(KEY_LENGTH)).decode('ascii')))
+
+def _check(password: str, stored: str):
+    if not is_hashed(stored):
+        # Senha legada em texto puro
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    _, log_n, r, p, salt, digest = stored.split('$')
+    candidate = _scrypt(password, base64.b64decode(salt), int(log_n), int(r), int(p))
+    return hmac.compare_digest(candidate, base64.b64decode(digest))
+
+def is_hashed(stored: str):
+    return stored.startswith(PREFIX + '$')
+
+def needs_upgrade(stored: str):
+    """Indica se a senha armazenada está em texto puro ou com custo diferente do atual."""
+    return not is_hashed(stored) or stored.split('$')[1] != str(cost)
+
+def hash_password(password: str):
+    """Calcula o hash da senha no executor. Pode lançar ``HashingBusy``."""
+    return _run(_encode, password, cost)
+
+def verify_password(password: str, stored: str = None):
+    """Confere a senha com o valor armazenado no executor. Pode lançar ``HashingBusy``.
+
+    Com ``stored`` None (usuário inexistente) faz o mesmo trabalho contra o
+    hash fictício e retorna False.
+    """
+    return _run(_check, password, _dummy_hash if stored is None else stored) and stored is not None
+
+async def hash_password_async(password: str):
+    """Como ``hash_password``, para os handlers assíncronos (asgi.py)."""
+    return await _run_async(_encode, password, cost)
+
+async def verify_password_async(password: str, stored: str = None):
+    """Como ``verify_password``, para os handlers assíncronos (asgi.py)."""
+    return await _run_async(_check, password, _dummy_hash if stored is None else stored) and stored is not None
+
+configure()
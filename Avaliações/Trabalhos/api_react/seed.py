@@ -0,0 +1,166 @@
+"""Gera um banco de dados sintético em escala de produção.
+
+Cria professores, alunos, a rede de relações ProfessorAluno e anos de
+histórico de Presenca, com os contadores de ProfessorAluno e o log de
+alterações (alteracao_chamada) já consistentes. As linhas são inseridas em
+lotes com executemany, sem passar pelo ORM.
+
+Todos os usuários recebem a mesma senha (um único hash scrypt), para que
+benchmarks/loadtest.py consiga fazer login:
+
+    professores  matrícula P00000, P00001, ...
+    alunos       matrícula 2000000, 2000001, ...
+
+Uso:
+    python seed.py --reset                       # valores padrão
+    python seed.py --reset --professores 2000 --alunos 40000 --anos 3
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+from database import engine, ensure_schema
+from models import Base, User, ProfessorAluno, Presenca, AlteracaoChamada
+from passwords import hash_password
+
+DEFAULT_PASSWORD = 'senha123'
+STUDENT_MATRICULA_BASE = 2000000
+BATCH_SIZE = 50000
+
+FIRST_NAMES = ('Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+               'João', 'Larissa', 'Lucas', 'Mariana', 'Mateus', 'Natália', 'Otávio', 'Paula', 'Pedro',
+               'Rafaela', 'Rodrigo', 'Sofia', 'Thiago', 'Valentina', 'Vinícius')
+LAST_NAMES = ('Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Ferreira', 'Gomes', 'Lima', 'Martins',
+              'Nunes', 'Oliveira', 'Pereira', 'Ribeiro', 'Rocha', 'Santos', 'Silva', 'Souza')
+
+def professor_matricula(index: int):
+    return f'P{index:05d}'
+
+def student_matricula(index: int):
+    return str(STUDENT_MATRICULA_BASE + index)
+
+def _name(rng, index: int):
+    # Sufixo com o índice: as rotas localizam alunos pelo nome, que precisa ser único
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}'
+
+def _insert(conn, table, rows):
+    """Insere ``rows`` (iterável de dicts) em lotes de BATCH_SIZE; retorna o total."""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+def _class_days(rng, start: date, end: date, per_week: int):
+    """Dias de aula de uma turma: ``per_week`` dias úteis fixos por semana, entre start e end."""
+    weekdays = set(rng.sample(range(5), per_week))
+    day = start
+    while day <= end:
+        if day.weekday() in weekdays:
+            yield day
+        day += timedelta(days=1)
+
+def seed(professores: int, alunos: int, turmas_por_aluno: int, anos: float, aulas_por_semana: int,
+         senha: str = DEFAULT_PASSWORD, seed_value: int = 0, log=print):
+    """Gera o banco; retorna a contagem de linhas inseridas por tabela."""
+    rng = random.Random(seed_value)
+    senha_hash = hash_password(senha)
+    end = date.today()
+    start = end - timedelta(days=int(365 * anos))
+    counts = {}
+
+    with engine.begin() as conn:
+        # Inserção em massa: o arquivo é descartável até o fim da carga
+        conn.exec_driver_sql("PRAGMA synchronous = OFF")
+        # Presenca é inserida antes de ProfessorAluno (ver abaixo): chaves
+        # estrangeiras conferidas só no commit
+        conn.exec_driver_sql("PRAGMA defer_foreign_keys = ON")
+
+        users = [{'id': i + 1, 'nome': _name(rng, i), 'senha': senha_hash, 'email': f'professor{i}@example.com',
+                  'matricula': professor_matricula(i), 'isTeacher': True} for i in range(professores)]
+        users += [{'id': professores + i + 1, 'nome': _name(rng, professores + i), 'senha': senha_hash,
+                   'email': f'aluno{i}@example.com', 'matricula': student_matricula(i), 'isTeacher': False}
+                  for i in range(alunos)]
+        counts['users'] = _insert(conn, User.__table__, users)
+        log(f"users: {counts['users']}")
+
+        # Cada aluno tem turmas_por_aluno professores distintos; cada professor tem um calendário
+        calendars = {professor_id: list(_class_days(rng, start, end, aulas_por_semana))
+                     for professor_id in range(1, professores + 1)}
+        relationships = []
+        for aluno_id in range(professores + 1, professores + alunos + 1):
+            for professor_id in rng.sample(range(1, professores + 1), min(turmas_por_aluno, professores)):
+                relationships.append([professor_id, aluno_id, rng.uniform(0.5, 1.0)])
+        rng.shuffle(relationships)
+
+        def presences():
+            for pa_id, (professor_id, aluno_id, rate) in enumerate(relationships, start=1):
+                count = 0
+                last = None
+                for dia in calendars[professor_id]:
+                    if rng.random() < rate:
+                        count += 1
+                        last = dia
+                        yield {'professor_aluno_id': pa_id, 'dia': dia}
+                relationships[pa_id - 1] = (professor_id, aluno_id, count, last)
+
+        # Presenca primeiro: o gerador calcula os contadores de cada relação
+        counts['presenca'] = _insert(conn, Presenca.__table__, presences())
+        log(f"presenca: {counts['presenca']}")
+
+        counts['professor_aluno'] = _insert(conn, ProfessorAluno.__table__, (
+            {'id': pa_id, 'professor_id': professor_id, 'aluno_id': aluno_id,
+             'presencas_count': count, 'ultima_presenca': last}
+            for pa_id, (professor_id, aluno_id, count, last) in enumerate(relationships, start=1)))
+        log(f"professor_aluno: {counts['professor_aluno']}")
+
+        counts['alteracao_chamada'] = _insert(conn, AlteracaoChamada.__table__, (
+            {'professor_id': professor_id, 'aluno_id': aluno_id, 'tipo': 'adicionado'}
+            for professor_id, aluno_id, _, _ in relationships))
+        log(f"alteracao_chamada: {counts['alteracao_chamada']}")
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--professores', type=int, default=1000)
+    parser.add_argument('--alunos', type=int, default=20000)
+    parser.add_argument('--turmas-por-aluno', type=int, default=5)
+    parser.add_argument('--anos', type=float, default=2)
+    parser.add_argument('--aulas-por-semana', type=int, default=1, choices=range(1, 6))
+    parser.add_argument('--senha', default=DEFAULT_PASSWORD)
+    parser.add_argument('--seed', type=int, default=0, help='semente do gerador aleatório')
+    parser.add_argument('--reset', action='store_true', help='apaga todas as tabelas antes de gerar')
+    args = parser.parse_args(argv)
+
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA user_version = 0")
+    ensure_schema()
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(User.__table__)).scalar():
+            print("O banco já tem usuários; use --reset para recriá-lo.")
+            return 1
+
+    started = time.perf_counter()
+    seed(args.professores, args.alunos, args.turmas_por_aluno, args.anos, args.aulas_por_semana,
+         senha=args.senha, seed_value=args.seed)
+    print(f"Concluído em {time.perf_counter() - started:.1f} s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Serialização JSON das respostas da API.
+
+``dumps`` usa o orjson quando instalado (várias vezes mais rápido que o
+``json`` da stdlib nas listas de chamada grandes) e cai para a stdlib caso
+contrário. As duas implementações geram os mesmos bytes: chaves ordenadas,
+sem espaços e UTF-8 sem escapes ``\\uXXXX`` (o mesmo contrato do
+``jsonify`` do Flask, que escapava os acentos). Datas e os demais tipos
+que o Flask sabe serializar passam pelo ``default`` do próprio Flask nas
+duas. Nas duas, chaves que não são texto (números, booleanos, None, datas)
+viram texto antes da ordenação, e NaN e infinitos saem como ``null`` (JSON
+não os representa). O que o orjson recusa (inteiros acima de 64 bits, por
+exemplo) é serializado pela stdlib. A única diferença restante é a notação
+de floats com expoente (``1e+20`` na stdlib, ``1e20`` no orjson), que é o
+mesmo número para qualquer leitor de JSON.
+
+``JSONProvider`` aplica ``dumps`` a ``jsonify`` no app Flask de main.py,
+e asgi.py usa ``dumps`` diretamente.
+
+Configuração pelo ambiente:
+    JSON_ENCODER  'orjson' (padrão, se instalado) ou 'stdlib'
+"""
+import datetime
+import json
+import math
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_default = DefaultJSONProvider.default
+
+def _key(key):
+    """Chave de dicionário como texto, como o orjson com ``OPT_NON_STR_KEYS``."""
+    if isinstance(key, str):
+        return key
+    if isinstance(key, (datetime.date, datetime.time)):
+        return key.isoformat()
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)
+    raise TypeError(f"keys must be str, int, float, bool, None or date, not {type(key).__name__}")
+
+def _normalize(obj):
+    """Cópia de ``obj`` com as chaves como texto e NaN/infinitos como None."""
+    # Comparações de tipo exatas e textos e inteiros copiados sem chamada:
+    # a lista de chamada é quase só isso
+    kind = type(obj)
+    if kind is dict or isinstance(obj, dict):
+        return {key if type(key) is str else _key(key):
+                value if type(value) is str or type(value) is int else _normalize(value)
+                for key, value in obj.items()}
+    if kind is list or kind is tuple or isinstance(obj, (list, tuple)):
+        return [value if type(value) is str or type(value) is int else _normalize(value) for value in obj]
+    if kind is float and not math.isfinite(obj):
+        return None
+    return obj
+
+def _dumps_stdlib(obj):
+    return json.dumps(_normalize(obj), default=_default, ensure_ascii=False, sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+if orjson is not None:
+    # Datas vão para o default do Flask, como na stdlib
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def _dumps_orjson(obj):
+        try:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # Fora do que o orjson aceita (inteiros acima de 64 bits, por exemplo)
+            return _dumps_stdlib(obj)
+else:
+    _dumps_orjson = None
+
+def encoders():
+    """Implementações disponíveis: nome -> função ``obj -> bytes``."""
+    available = {'stdlib': _dumps_stdlib}
+    if _dumps_orjson is not None:
+        available['orjson'] = _dumps_orjson
+    return available
+
+def _select(name: str = None):
+    name = name or os.getenv("JSON_ENCODER", "orjson")
+    return encoders().get(name, _dumps_stdlib)
+
+dumps = _select()
+encoder_name = 'orjson' if dumps is _dumps_orjson else 'stdlib'
+
+class JSONProvider(DefaultJSONProvider):
+    """Provedor JSON do Flask que serializa as respostas com ``dumps``.
+
+    ``app.json.dumps`` com argumentos extras (indentação, por exemplo)
+    continua indo para a stdlib.
+    """
+
+    ensure_ascii = False
+
+    def response(self, *args, **kwargs):
+        if self._app.debug and self.compact is not False:
+            # Indentado para leitura em modo debug, como o provedor padrão
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,50 @@
+"""Configuração comum dos testes.
+
+Os testes rodam contra um banco SQLite temporário, criado e migrado uma vez
+por sessão. O DB_PATH precisa ser definido antes de importar ``database``
+(e os limites de taxa, antes de importar ``admission``).
+
+Uso (a partir de api_react/): python -m pytest
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='chamada-test-'), 'test.db')
+# Os testes fazem muitas requisições do mesmo usuário e IP
+os.environ.setdefault('RATE_LIMIT_USER', '0')
+os.environ.setdefault('RATE_LIMIT_IP', '0')
+
+
+@pytest.fixture(scope='session')
+def migrated_db():
+    """Banco temporário com o esquema completo (create_all + migrações)."""
+    from database import engine, init_db, remove_sessions
+    init_db()
+    yield engine
+    remove_sessions()
+
+
+def _reset():
+    import models
+    from cache import roster_cache
+    from database import engine, init_db, remove_sessions
+    remove_sessions()
+    models.Base.metadata.drop_all(bind=engine)
+    init_db()
+    roster_cache.clear()
+
+
+@pytest.fixture
+def reset_db(migrated_db):
+    """Função que recria o banco vazio e limpa o cache das listas.
+
+    O banco também é recriado ao final do teste, para não deixar dados aos
+    testes seguintes.
+    """
+    _reset()
+    yield _reset
+    _reset()
@@ -0,0 +1,100 @@
+"""Contrato JSON igual nos dois servidores: app Flask (main.py) e asgi.py.
+
+A mesma sequência de requisições roda em cada servidor, cada um com o banco
+recriado do zero, e as respostas (status, ETag e corpo JSON) têm de ser
+iguais passo a passo. Cobre as rotas com handler assíncrono em asgi.py; as
+demais vão para o próprio app Flask pelo fallback WSGI.
+"""
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+import main
+
+PROFESSOR = {'name': 'prof', 'email': 'prof@example.com', 'studentNumber': 'P1', 'password': 'senha', 'isTeacher': True}
+ALUNO = {'name': 'Ana', 'email': 'ana@example.com', 'studentNumber': '100', 'password': 'senha', 'isTeacher': False}
+
+# (descrição, método, caminho, corpo JSON, quem se autentica: 'professor', 'aluno', None ou um token literal)
+CASES = [
+    ('sobre', 'GET', '/api/about', None, None),
+    ('usuário', 'GET', '/api/user/joão', None, None),
+    ('login do professor', 'POST', '/api/login', {'matricula': 'P1', 'password': 'senha'}, None),
+    ('login com senha errada', 'POST', '/api/login', {'matricula': 'P1', 'password': 'errada'}, None),
+    ('lista vazia', 'GET', '/api/chamada', None, 'professor'),
+    ('vincula aluno existente', 'POST', '/api/chamada', {'type': 'Adicionar', 'nome': 'Ana', 'matricula': '100'},
+     'professor'),
+    ('cria e vincula aluno', 'POST', '/api/chamada', {'type': 'Adicionar', 'nome': 'Bia', 'matricula': '101'},
+     'professor'),
+    ('matrícula de professor', 'POST', '/api/chamada', {'type': 'Adicionar', 'nome': 'prof', 'matricula': 'P1'},
+     'professor'),
+    ('lista da turma', 'GET', '/api/chamada', None, 'professor'),
+    ('alterações desde a versão 1', 'GET', '/api/chamada?desde=1', None, 'professor'),
+    ('presença', 'POST', '/api/presenca/Ana/100', None, 'professor'),
+    ('presença repetida', 'POST', '/api/presenca/Ana/100', None, 'professor'),
+    ('presença de aluno inexistente', 'POST', '/api/presenca/Zé/999', None, 'professor'),
+    ('lista do aluno', 'GET', '/api/chamada', None, 'aluno'),
+    ('remove aluno vinculado', 'DELETE', '/api/chamada/Bia', None, 'professor'),
+    ('remove aluno já desvinculado', 'DELETE', '/api/chamada/Bia', None, 'professor'),
+    ('remove aluno inexistente', 'DELETE', '/api/chamada/Ninguém', None, 'professor'),
+    ('lista após remoção', 'GET', '/api/chamada', None, 'professor'),
+    ('sem token', 'GET', '/api/chamada', None, None),
+    ('token inválido', 'GET', '/api/chamada', None, 'invalido'),
+]
+
+
+class FlaskRunner:
+    def __init__(self):
+        self.client = main.create_app().test_client()
+
+    def __call__(self, method, path, body, headers):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.headers.get('ETag'), response.get_json()
+
+
+class ASGIRunner:
+    def __init__(self, client):
+        self.client = client
+
+    def __call__(self, method, path, body, headers):
+        response = self.client.request(method, path, json=body, headers=headers)
+        return response.status_code, response.headers.get('etag'), response.json()
+
+
+def run(call):
+    """Cadastra o professor e o aluno e executa ``CASES``; retorna {descrição: resposta}."""
+    tokens = {}
+    for name, user in (('professor', PROFESSOR), ('aluno', ALUNO)):
+        status, _, body = call('POST', '/api/signin', user, {})
+        assert status == 200, body
+        tokens[name] = body.pop('token')
+    results = {}
+    for description, method, path, body, auth in CASES:
+        token = tokens.get(auth, auth)
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        status, etag, payload = call(method, path, body, headers)
+        # O token de login muda a cada emissão
+        if isinstance(payload, dict):
+            payload.pop('token', None)
+        results[description] = (status, etag, payload)
+    return results
+
+
+@pytest.fixture(scope='module')
+def asgi_client():
+    with TestClient(asgi.app) as client:
+        yield client
+
+
+def test_same_responses(reset_db, asgi_client):
+    expected = run(FlaskRunner())
+    reset_db()
+    actual = run(ASGIRunner(asgi_client))
+    for description, *_ in CASES:
+        assert actual[description] == expected[description], description
+
+
+def test_remove_unlinked_student_succeeds(reset_db, asgi_client):
+    """Remover um aluno que existe mas não está na turma não é erro em nenhum dos servidores."""
+    results = run(ASGIRunner(asgi_client))
+    assert results['remove aluno já desvinculado'][0] == 200
+    assert results['remove aluno inexistente'][0] == 500
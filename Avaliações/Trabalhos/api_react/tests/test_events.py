@@ -0,0 +1,47 @@
+"""GET /api/eventos: stream no asgi.py, 204 no app Flask (workers síncronos)."""
+import datetime
+
+import jwt
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+import events
+import main
+
+
+@pytest.fixture
+def token():
+    return jwt.encode({'user_id': 1, 'username': 'prof', 'matricula': 'P0', 'isTeacher': True,
+                       'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                      asgi.SECRET_KEY, algorithm="HS256").decode('UTF-8')
+
+
+@pytest.fixture
+def short_streams(monkeypatch):
+    monkeypatch.setattr(events, 'max_seconds', 0.2)
+    monkeypatch.setattr(events, 'heartbeat_s', 0.05)
+
+
+def test_flask_answers_no_content(reset_db, token):
+    """O EventSource não reconecta depois de um 204: nenhum worker fica preso."""
+    response = main.create_app().test_client().get(f'/api/eventos?token={token}')
+    assert response.status_code == 204
+    assert response.data == b''
+    assert events.broker.stats()['subscribers'] == 0
+
+
+def test_flask_streams_when_enabled(reset_db, token, short_streams, monkeypatch):
+    monkeypatch.setattr(events, 'wsgi_streams', True)
+    response = main.create_app().test_client().get(f'/api/eventos?token={token}')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.get_data(as_text=True).startswith(events.format_open())
+
+
+def test_asgi_streams(reset_db, token, short_streams):
+    with TestClient(asgi.app) as client:
+        with client.stream('GET', f'/api/eventos?token={token}') as response:
+            assert response.status_code == 200
+            body = ''.join(response.iter_text())
+    assert body.startswith(events.format_open())
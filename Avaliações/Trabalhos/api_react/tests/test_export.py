@@ -0,0 +1,61 @@
+"""Exportação do histórico (GET /api/chamada/exportar) enquanto o banco recebe escritas."""
+import datetime
+import os
+import sqlite3
+
+import jwt
+import pytest
+
+import main
+from database import engine
+from models import Presenca, ProfessorAluno, User
+
+STUDENTS = 30
+DAYS = 100
+
+
+@pytest.fixture
+def client(reset_db):
+    start = datetime.date(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': 1, 'nome': 'prof', 'senha': 'x', 'email': 'prof@example.com', 'matricula': 'P0', 'isTeacher': True}
+        ] + [
+            {'id': i + 2, 'nome': f'aluno{i}', 'senha': 'x', 'email': f'aluno{i}@example.com',
+             'matricula': str(i), 'isTeacher': False} for i in range(STUDENTS)
+        ])
+        conn.execute(ProfessorAluno.__table__.insert(), [
+            {'id': i + 1, 'professor_id': 1, 'aluno_id': i + 2, 'presencas_count': DAYS} for i in range(STUDENTS)
+        ])
+        conn.execute(Presenca.__table__.insert(), [
+            {'professor_aluno_id': i + 1, 'dia': start + datetime.timedelta(days=d)}
+            for i in range(STUDENTS) for d in range(DAYS)
+        ])
+    app = main.create_app()
+    token = jwt.encode({'user_id': 1, 'username': 'prof', 'matricula': 'P0', 'isTeacher': True,
+                        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                       app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
+    return app.test_client(), {'Authorization': f'Bearer {token}'}
+
+
+def test_write_during_export(client):
+    """Um download em andamento não segura o lock do banco: outra conexão consegue escrever."""
+    client, headers = client
+    response = client.get('/api/chamada/exportar?formato=csv', headers=headers, buffered=False)
+    chunks = iter(response.response)
+    body = next(chunks)
+
+    writer = sqlite3.connect(os.environ['DB_PATH'], timeout=1)
+    try:
+        writer.execute("INSERT INTO users (nome, senha, email, matricula, isTeacher) "
+                       "VALUES ('novo', 'x', 'novo@example.com', 'N1', 0)")
+        writer.commit()
+    finally:
+        writer.close()
+
+    body += b''.join(chunks)
+    response.close()
+    lines = body.decode('utf-8').splitlines()
+    assert lines[0] == 'nome,matricula,dia'
+    assert len(lines) == 1 + STUDENTS * DAYS
+    assert lines[1] == 'aluno0,0,2024-01-01' and lines[-1] == f'aluno{STUDENTS - 1},{STUDENTS - 1},2024-04-09'
@@ -0,0 +1,133 @@
+"""Rotas por id (/api/chamada/alunos/<id>) e o mapa de identidade (identity.py).
+
+Cada requisição lê cada entidade no máximo uma vez: o aluno, a relação e a
+versão da lista, que depois da escrita vem do id da alteração gravada. A
+versão devolvida tem de ser a do banco, e ``removidos`` traz ids.
+"""
+import datetime
+
+import jwt
+import pytest
+from sqlalchemy import event, func
+
+import main
+import operations
+from database import db_session, engine
+from models import AlteracaoChamada, User
+
+# Comandos SQL por requisição: versão, aluno, relação, escrita(s) e as duas
+# consultas das alterações (nenhuma releitura da versão ou dos nomes)
+MAX_STATEMENTS = {'PUT': 7, 'presenca': 7, 'DELETE': 7}
+
+
+@pytest.fixture
+def client(reset_db):
+    professor = User(nome='prof', senha='x', email='prof@example.com', matricula='P0', isTeacher=True)
+    alunos = [User(nome='Ana', senha='x', email=f'ana{i}@example.com', matricula=str(100 + i), isTeacher=False)
+              for i in range(2)]
+    db_session.add_all([professor, *alunos])
+    db_session.commit()
+    app = main.create_app()
+    token = jwt.encode({'user_id': professor.id, 'username': 'prof', 'matricula': 'P0', 'isTeacher': True,
+                        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                       app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
+    ids = professor.id, [aluno.id for aluno in alunos]
+    db_session.remove()
+    return app.test_client(), {'Authorization': f'Bearer {token}'}, ids
+
+
+def request(client, method, path, headers, body=None):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        response = client.open(path, method=method, headers=headers, json=body)
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json(), len(statements)
+
+
+def stored_version(professor_id):
+    version = db_session.query(func.max(AlteracaoChamada.id)) \
+        .filter(AlteracaoChamada.professor_id == professor_id).scalar() or 0
+    db_session.remove()
+    return version
+
+
+def test_id_routes(client):
+    client, headers, (professor_id, (ana, homonima)) = client
+
+    for aluno_id in (ana, homonima):
+        body, count = request(client, 'PUT', f'/api/chamada/alunos/{aluno_id}', headers)
+        assert count <= MAX_STATEMENTS['PUT']
+        assert body['versao'] == stored_version(professor_id)
+
+    body, count = request(client, 'POST', f'/api/chamada/alunos/{ana}/presenca', headers)
+    assert count <= MAX_STATEMENTS['presenca']
+    assert body['nova'] is True
+    assert body['versao'] == stored_version(professor_id)
+
+    body, count = request(client, 'DELETE', f'/api/chamada/alunos/{ana}', headers)
+    assert count <= MAX_STATEMENTS['DELETE']
+    assert body['versao'] == stored_version(professor_id)
+    assert body['alteracoes']['removidos'] == [ana]
+
+    # Alunos com o mesmo nome continuam distinguíveis pelo id
+    body, _ = request(client, 'GET', '/api/chamada?desde=1', headers)
+    assert body['alteracoes']['removidos'] == [ana]
+    assert [aluno['id'] for aluno in body['alteracoes']['adicionados'].values()] == [homonima]
+
+
+def test_version_after_duplicate_presence(client):
+    client, headers, (professor_id, (ana, _)) = client
+    request(client, 'PUT', f'/api/chamada/alunos/{ana}', headers)
+    request(client, 'POST', f'/api/chamada/alunos/{ana}/presenca', headers)
+    body, _ = request(client, 'POST', f'/api/chamada/alunos/{ana}/presenca', headers)
+    assert body['nova'] is False
+    assert body['versao'] == stored_version(professor_id)
+    assert body['alteracoes'] == {'adicionados': {}, 'atualizados': {}, 'removidos': []}
+
+
+def test_version_with_group_commit(client):
+    """Gravada pelo group commit, a alteração não passa pela sessão da requisição: a versão é relida."""
+    client, headers, (professor_id, (ana, _)) = client
+    request(client, 'PUT', f'/api/chamada/alunos/{ana}', headers)
+    operations.configure_group_commit(5)
+    try:
+        body, _ = request(client, 'POST', f'/api/chamada/alunos/{ana}/presenca', headers)
+    finally:
+        operations.configure_group_commit(0)
+    assert body['nova'] is True
+    assert body['versao'] == stored_version(professor_id)
+    assert list(body['alteracoes']['atualizados'].values())[0]['presencas'] == 1
+
+
+def test_batch_presence_carries_ids(client):
+    """O resultado do lote entra na lista do cliente pelo id, sem nova consulta."""
+    client, headers, (professor_id, (ana, homonima)) = client
+    for aluno_id in (ana, homonima):
+        request(client, 'PUT', f'/api/chamada/alunos/{aluno_id}', headers)
+    since = stored_version(professor_id)
+
+    body, _ = request(client, 'POST', f'/api/presenca?desde={since}', headers, {'alunos': [{'matricula': '101'}]})
+    assert body['alunos'] == {'Ana': {'id': homonima, 'matricula': '101', 'presencas': 1}}
+    assert body['versao'] == stored_version(professor_id)
+    assert list(body['alteracoes']['atualizados'].values()) == [{'id': homonima, 'matricula': '101', 'presencas': 1}]
+
+
+def test_mutation_since_client_version(client):
+    """Com ?desde= a mutação devolve também o que outra aba gravou depois da versão do cliente."""
+    client, headers, (professor_id, (ana, homonima)) = client
+    body, _ = request(client, 'PUT', f'/api/chamada/alunos/{ana}', headers)
+    local = body['versao']
+    # Outra aba vincula a homônima; esta página ainda está em ``local``
+    request(client, 'PUT', f'/api/chamada/alunos/{homonima}', headers)
+
+    body, _ = request(client, 'POST', f'/api/chamada/alunos/{ana}/presenca?desde={local}', headers)
+    assert body['versao'] == stored_version(professor_id)
+    assert [aluno['id'] for aluno in body['alteracoes']['adicionados'].values()] == [homonima]
+    assert [aluno['id'] for aluno in body['alteracoes']['atualizados'].values()] == [ana]
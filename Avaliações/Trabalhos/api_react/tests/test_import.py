@@ -0,0 +1,50 @@
+"""Importação de alunos (POST /api/chamada/importar): resultado de cada linha."""
+import datetime
+
+import jwt
+import pytest
+
+import main
+from database import db_session
+from models import User
+
+
+@pytest.fixture
+def client(reset_db):
+    professor = User(nome='prof', senha='x', email='prof@example.com', matricula='P0', isTeacher=True)
+    db_session.add(professor)
+    db_session.commit()
+    app = main.create_app()
+    token = jwt.encode({'user_id': professor.id, 'username': 'prof', 'matricula': 'P0', 'isTeacher': True,
+                        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                       app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
+    db_session.remove()
+    return app.test_client(), {'Authorization': f'Bearer {token}'}
+
+
+def test_field_types(client):
+    client, headers = client
+    rows = [
+        {'nome': 'Ana', 'matricula': '100'},
+        {'nome': 'Bia', 'matricula': 101},
+        {'nome': ['a'], 'matricula': '102'},
+        {'nome': {'x': 1}, 'matricula': '103'},
+        {'nome': 0, 'matricula': '104'},
+        {'nome': 'Caio', 'matricula': False},
+        {'nome': 'Davi', 'matricula': 1.5},
+        {'nome': 'Eva', 'matricula': ['105']},
+        {'nome': 'Fábio'},
+    ]
+    response = client.post('/api/chamada/importar', json=rows, headers=headers)
+    assert response.status_code == 200
+    results = response.get_json()['resultados']
+
+    assert [result['status'] for result in results] == ['criado', 'criado'] + ['rejeitado'] * 7
+    assert results[1]['matricula'] == '101'
+    assert [result['motivo'] for result in results[2:]] == ['Nome deve ser texto'] * 3 + \
+        ['Matrícula deve ser texto ou número inteiro'] * 3 + ['Nome e matrícula são obrigatórios']
+    # O valor recusado volta como veio, sem virar texto
+    assert results[2]['nome'] == ['a']
+    assert results[5]['matricula'] is False
+    assert sorted(nome for (nome,) in db_session.query(User.nome).filter(User.isTeacher == False)) == ['Ana', 'Bia']
+    db_session.remove()
@@ -0,0 +1,32 @@
+"""Login (operations.login e async_operations.login) com matrícula existente e inexistente."""
+import asyncio
+
+import pytest
+
+import async_operations
+import operations
+import passwords
+
+
+@pytest.fixture
+def scrypt_calls(reset_db, monkeypatch):
+    operations.create_user('prof', 'senha', 'prof@example.com', 'P1', True)
+    calls = []
+    scrypt = passwords._scrypt
+
+    def counting(*args):
+        calls.append(args[2:])
+        return scrypt(*args)
+
+    monkeypatch.setattr(passwords, '_scrypt', counting)
+    return calls
+
+
+@pytest.mark.parametrize('login', [operations.login, lambda **kwargs: asyncio.run(async_operations.login(**kwargs))],
+                         ids=['sync', 'async'])
+def test_unknown_matricula_costs_one_hash(scrypt_calls, login):
+    """As duas respostas pagam um scrypt com o custo atual: o tempo não revela a matrícula."""
+    assert login(matricula='P1', senha='errada') is None
+    assert login(matricula='X9', senha='errada') is None
+    assert login(matricula='P1', senha='senha') is not None
+    assert scrypt_calls == [(passwords.cost, passwords.BLOCK_SIZE, passwords.PARALLELISM)] * 3
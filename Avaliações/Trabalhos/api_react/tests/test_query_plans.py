@@ -0,0 +1,142 @@
+"""``EXPLAIN QUERY PLAN`` de todas as consultas de operations.py.
+
+Cada função de ``operations`` roda contra o banco temporário migrado
+(conftest.py); o SQL emitido é capturado e o plano de cada SELECT, UPDATE e
+DELETE não pode ter ``SCAN`` (varredura completa de tabela, mesmo via
+índice) fora de ``ALLOWED_SCANS``. As operações de ``INDEX_ORDERED`` também
+não podem ordenar numa B-tree temporária: a ordem tem de vir do índice.
+Uma regressão de índice quebra o CI.
+
+Uso (a partir de api_react/): python -m pytest tests/test_query_plans.py
+"""
+import inspect
+import re
+
+import pytest
+from sqlalchemy import event
+
+import operations
+
+# Varreduras aceitas: (operação ou None para todas, regex da linha do plano).
+# Toda entrada nova precisa de um motivo.
+ALLOWED_SCANS = [
+    # VALUES de um INSERT ... RETURNING: linha constante, nenhuma tabela lida
+    (None, r'^SCAN CONSTANT ROW$'),
+]
+
+# Operações cuja ordem vem do índice (sem ``USE TEMP B-TREE``): cada página
+# lê só as linhas que devolve
+INDEX_ORDERED = {'retrieve_students_page'}
+
+# Funções públicas de operations.py que não consultam o banco
+WITHOUT_QUERIES = {'configure_group_commit', 'encode_cursor', 'decode_cursor'}
+
+
+class Seed:
+    """Usuários criados uma vez para as chamadas de ``CALLS``."""
+
+    def __init__(self):
+        self.professor = operations.create_user('prof', 'senha', 'prof@example.com', 'P1', True)
+        self.aluno = operations.create_user('aluno', 'senha', 'aluno@example.com', 'A1', False)
+        self.outro = operations.create_user('outro', 'senha', 'outro@example.com', 'A2', False)
+
+
+# (nome, função que recebe o Seed); a ordem importa: as remoções ficam no fim
+CALLS = [
+    ('create_user', lambda s: operations.create_user('novo', 'senha', 'novo@example.com', 'A3', False)),
+    ('login', lambda s: operations.login(s.aluno.matricula, 'senha')),
+    ('add_professor_aluno_relationship', lambda s: operations.add_professor_aluno_relationship(s.professor.id, s.aluno.id)),
+    ('add_professor_student_relationship_if_exists',
+     lambda s: operations.add_professor_student_relationship_if_exists(s.professor.id, s.outro.matricula, s.outro.nome)),
+    ('get_user_by_nome_matricula', lambda s: operations.get_user_by_nome_matricula(s.aluno.matricula, s.aluno.nome)),
+    ('get_user_by_id', lambda s: operations.get_user_by_id(s.aluno.id)),
+    ('add_professor_student_relationship',
+     lambda s: operations.add_professor_student_relationship(s.professor.id, operations.get_user_by_id(s.outro.id))),
+    ('get_professor_aluno_id', lambda s: operations.get_professor_aluno_id(s.professor.id, s.aluno.id)),
+    ('record_presence',
+     lambda s: operations.record_presence(operations.get_professor_aluno_id(s.professor.id, s.aluno.id))),
+    ('record_presence_batch', lambda s: operations.record_presence_batch(s.professor.id, matriculas=[s.aluno.matricula])),
+    ('record_presence_batch (turma)', lambda s: operations.record_presence_batch(s.professor.id, exceto=[s.aluno.matricula])),
+    ('retrieve_students_for_professor', lambda s: operations.retrieve_students_for_professor(s.professor.id)),
+    ('retrieve_professors_for_students', lambda s: operations.retrieve_professors_for_students(s.aluno.id)),
+    ('import_students', lambda s: operations.import_students(s.professor.id, [
+        {'nome': s.aluno.nome, 'matricula': s.aluno.matricula}, {'nome': 'importado', 'matricula': 'A4'}])),
+    ('roster_version', lambda s: operations.roster_version(s.professor.id)),
+    ('student_version', lambda s: operations.student_version(s.aluno.id)),
+    ('roster_delta', lambda s: operations.roster_delta(s.professor.id, 0)),
+    ('retrieve_students_page (nome)', lambda s: operations.retrieve_students_page(
+        s.professor.id, 10, cursor=operations.encode_cursor(s.aluno.nome, s.aluno.id, 'nome', False))),
+    ('retrieve_students_page (nome, desc)', lambda s: operations.retrieve_students_page(
+        s.professor.id, 10, descending=True, cursor=operations.encode_cursor(s.aluno.nome, s.aluno.id, 'nome', True))),
+    ('retrieve_students_page (matricula)', lambda s: operations.retrieve_students_page(
+        s.professor.id, 10, sort='matricula',
+        cursor=operations.encode_cursor(s.aluno.matricula, s.aluno.id, 'matricula', False))),
+    ('retrieve_students_page (presencas)', lambda s: operations.retrieve_students_page(
+        s.professor.id, 10, sort='presencas', descending=True, below=5,
+        cursor=operations.encode_cursor(3, s.aluno.id, 'presencas', True))),
+    ('retrieve_students_page (primeira página)', lambda s: operations.retrieve_students_page(s.professor.id, 10)),
+    ('iter_attendance_history',
+     lambda s: list(operations.iter_attendance_history(s.professor.id, '2024-01-01', '2099-12-31'))),
+    # Blocos de uma linha: cobre a consulta de continuação (depois do último aluno e dia lidos)
+    ('iter_attendance_history (blocos)',
+     lambda s: list(operations.iter_attendance_history(s.professor.id, '2024-01-01', '2099-12-31', batch_size=1))),
+    ('remove_professor_aluno_relationship',
+     lambda s: operations.remove_professor_aluno_relationship(s.professor.id, s.outro.nome)),
+    ('remove_professor_aluno_relationship_by_id',
+     lambda s: operations.remove_professor_aluno_relationship_by_id(s.professor.id, s.aluno.id)),
+]
+
+
+@pytest.fixture(scope='module')
+def seed(migrated_db):
+    return Seed()
+
+
+def capture(engine, func):
+    """Executa ``func`` e devolve os comandos SQL (com parâmetros) emitidos."""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+    return statements
+
+
+def explain(engine, statement, parameters):
+    """Linhas de ``EXPLAIN QUERY PLAN`` de um comando."""
+    with engine.connect() as conn:
+        cursor = conn.connection.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+        return [row[3] for row in cursor.fetchall()]
+
+
+def allowed(name, line):
+    return any((operation is None or operation == name) and re.search(pattern, line)
+               for operation, pattern in ALLOWED_SCANS)
+
+
+@pytest.mark.parametrize('name, call', CALLS, ids=[name for name, _ in CALLS])
+def test_no_full_scan(migrated_db, seed, name, call):
+    statements = [(statement, parameters) for statement, parameters in capture(migrated_db, lambda: call(seed))
+                  if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE'))]
+    scans = []
+    for statement, parameters in statements:
+        for line in explain(migrated_db, statement, parameters):
+            if 'SCAN' in line and not allowed(name, line):
+                scans.append(f"{line}\n    {' '.join(statement.split())}")
+            elif 'TEMP B-TREE' in line and name.split(' ')[0] in INDEX_ORDERED:
+                scans.append(f"{line}\n    {' '.join(statement.split())}")
+    assert not scans, f"{name}: varredura completa ou ordenação fora do índice\n" + '\n'.join(scans)
+
+
+def test_every_operation_is_checked():
+    """Uma função nova em operations.py precisa entrar em CALLS (ou em WITHOUT_QUERIES)."""
+    public = {name for name, func in inspect.getmembers(operations, inspect.isfunction)
+              if func.__module__ == operations.__name__ and not name.startswith('_')}
+    checked = {name.split(' ')[0] for name, _ in CALLS}
+    assert public - checked - WITHOUT_QUERIES == set()
@@ -0,0 +1,71 @@
+"""Lista paginada (GET /api/chamada?limite=N): ordenações, cursor e índices."""
+import datetime
+
+import jwt
+import pytest
+
+import main
+from database import db_session
+from models import ProfessorAluno, User
+
+ORDERINGS = [(sort, direction) for sort in ('nome', 'matricula', 'presencas') for direction in ('asc', 'desc')]
+
+
+@pytest.fixture
+def client(reset_db):
+    professor = User(nome='prof', senha='x', email='prof@example.com', matricula='P0', isTeacher=True)
+    # Nomes repetidos e fora da ordem das matrículas
+    alunos = [User(nome=f'aluno{i % 4}', senha='x', email=f'a{i}@example.com', matricula=f'{(7 * i) % 11:03d}',
+                   isTeacher=False) for i in range(11)]
+    db_session.add_all([professor, *alunos])
+    db_session.flush()
+    db_session.add_all(ProfessorAluno(professor_id=professor.id, aluno_id=aluno.id, presencas_count=i % 3)
+                       for i, aluno in enumerate(alunos))
+    db_session.commit()
+    app = main.create_app()
+    token = jwt.encode({'user_id': professor.id, 'username': 'prof', 'matricula': 'P0', 'isTeacher': True,
+                        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                       app.config['SECRET_KEY'], algorithm="HS256").decode('UTF-8')
+    db_session.remove()
+    return app.test_client(), {'Authorization': f'Bearer {token}'}
+
+
+def get(client, headers, **params):
+    return client.get('/api/chamada', query_string={'limite': 3, **params}, headers=headers)
+
+
+@pytest.mark.parametrize('sort, direction', ORDERINGS)
+def test_pages_follow_the_ordering(client, sort, direction):
+    client, headers = client
+    full = get(client, headers, limite=100, ordem=sort, direcao=direction).get_json()['alunos']
+    expected = sorted(full, key=lambda aluno: (aluno[sort], aluno['id']), reverse=direction == 'desc')
+    assert full == expected and len(full) == 11
+
+    pages, cursor = [], None
+    while True:
+        body = get(client, headers, ordem=sort, direcao=direction, **({'cursor': cursor} if cursor else {})).get_json()
+        pages.extend(body['alunos'])
+        cursor = body['proximo_cursor']
+        if cursor is None:
+            break
+    assert pages == expected
+
+
+@pytest.mark.parametrize('sort, direction', [('presencas', 'asc'), ('nome', 'desc'), ('matricula', 'asc')])
+def test_cursor_of_another_ordering_is_rejected(client, sort, direction):
+    """Um cursor de 'nome asc' não pode continuar outra ordenação: 400, não uma página errada."""
+    client, headers = client
+    cursor = get(client, headers).get_json()['proximo_cursor']
+    response = get(client, headers, ordem=sort, direcao=direction, cursor=cursor)
+    assert response.status_code == 400
+    assert 'ordenação' in response.get_json()['error']
+
+
+def test_renamed_student_keeps_its_place(client):
+    """Os gatilhos acompanham a troca de nome do aluno."""
+    client, headers = client
+    db_session.query(User).filter(User.matricula == '000').update({'nome': 'zz'})
+    db_session.commit()
+    db_session.remove()
+    alunos = get(client, headers, limite=100, direcao='desc').get_json()['alunos']
+    assert alunos[0]['nome'] == 'zz' and alunos[0]['matricula'] == '000'
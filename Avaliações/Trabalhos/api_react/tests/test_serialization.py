@@ -0,0 +1,36 @@
+"""Mesmos bytes nas duas implementações de serialization.py (stdlib e orjson)."""
+import datetime
+import json
+
+import pytest
+
+import serialization
+
+PAYLOADS = {
+    'lista de chamada': {'alunos': {'João': {'id': 2, 'matricula': '2024001', 'presencas': 3},
+                                    'Ângela': {'id': 3, 'matricula': '2024002', 'presencas': 0}}, 'versao': 7},
+    'chaves inteiras': {1: 2},
+    'várias chaves inteiras': {10: 'a', 9: 'b', 100: 'c'},
+    'chaves mistas': {1: 'a', 'b': 2, None: 3, True: 4, 1.5: 5},
+    'chaves data': {datetime.date(2024, 3, 1): 1, datetime.datetime(2024, 3, 1, 8, 30): 2},
+    'inteiro de 70 bits': {'n': 2 ** 70},
+    'chave de 70 bits': {2 ** 70: 'n'},
+    'não finitos': [float('nan'), float('inf'), -float('inf'), 0.75],
+    'datas': {'dia': datetime.date(2024, 3, 1), 'quando': datetime.datetime(2024, 3, 1, 8, 30)},
+    'tupla aninhada': {'x': ({'b': 1, 'a': (1, 2)},)},
+}
+
+
+@pytest.mark.parametrize('payload', PAYLOADS.values(), ids=PAYLOADS.keys())
+def test_same_bytes(payload):
+    outputs = {name: dumps(payload) for name, dumps in serialization.encoders().items()}
+    assert len(set(outputs.values())) == 1, outputs
+    json.loads(next(iter(outputs.values())))
+
+
+def test_int_keys_through_jsonify():
+    """Um payload com chaves inteiras não vira erro 500 nas respostas do Flask."""
+    import main
+    app = main.create_app()
+    with app.test_request_context():
+        assert app.json.response({3: 'c', 1: 'a'}).get_data() == b'{"1":"a","3":"c"}\n'
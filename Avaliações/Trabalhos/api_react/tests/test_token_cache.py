@@ -0,0 +1,32 @@
+"""Cache de tokens verificados (token_cache.py) em get_decoded_token."""
+import datetime
+
+import jwt
+
+import main
+
+
+def make_token(secret_key):
+    return jwt.encode({'user_id': 1, 'username': 'prof', 'matricula': 'P0', 'isTeacher': True,
+                       'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                      secret_key, algorithm="HS256").decode('UTF-8')
+
+
+def get(app, token):
+    return app.test_client().get('/api/chamada', headers={'Authorization': f'Bearer {token}'}).status_code
+
+
+def test_token_verified_by_other_key_is_rejected(reset_db):
+    """Um token em cache só vale para a chave que o verificou."""
+    main.token_cache.clear()
+    app, other = main.create_app({'SECRET_KEY': 'chave-a'}), main.create_app({'SECRET_KEY': 'chave-b'})
+    token = make_token('chave-a')
+    assert get(app, token) == 200
+    assert get(app, token) == 200
+    assert main.token_cache.stats()['hits'] >= 1
+    assert get(other, token) == 401
+
+    # Troca da chave do próprio app
+    app.config['SECRET_KEY'] = 'chave-nova'
+    assert get(app, token) == 401
+    assert get(app, make_token('chave-nova')) == 200
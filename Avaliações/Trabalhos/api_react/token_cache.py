@@ -0,0 +1,72 @@
+"""Cache em memória de tokens JWT já verificados.
+
+Evita repetir ``jwt.decode`` (HMAC + validação das claims) a cada requisição
+feita com o mesmo token. Cada entrada vale até o ``exp`` do próprio token e,
+quando o cache enche, a entrada usada há mais tempo é descartada (LRU).
+
+As entradas são indexadas pela chave que verificou o token e pelo token:
+depois de uma troca de SECRET_KEY, ou entre dois apps com chaves
+diferentes no mesmo processo, um token só é aceito do cache se a chave que
+o verificou for a mesma da requisição.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+class TokenCache:
+    """Mapa (chave, token) -> claims limitado a ``maxsize`` entradas."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, secret: str, token: str):
+        """Retorna as claims do token verificado com ``secret``, ou None se ausente ou expirado."""
+        key = (secret, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if time.time() >= expires_at:
+                # Expirado: o jwt.decode seguinte rejeita o token normalmente
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, secret: str, token: str, claims: dict):
+        """Guarda as claims de um token verificado com ``secret`` até o seu ``exp``."""
+        expires_at = claims.get('exp')
+        if self.maxsize <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        with self._lock:
+            key = (secret, token)
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
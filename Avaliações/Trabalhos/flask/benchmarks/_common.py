@@ -0,0 +1,50 @@
+"""Utilitários compartilhados pelos benchmarks.
+
+Cada benchmark roda contra um banco SQLite temporário, por isso o DB_PATH
+precisa ser definido antes de importar ``database``.
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+_tmpdir = tempfile.mkdtemp(prefix='chamada-bench-')
+os.environ['DB_PATH'] = os.path.join(_tmpdir, 'bench.db')
+
+from sqlalchemy import event  # noqa: E402
+
+from database import db_session, engine, init_db  # noqa: E402
+
+
+class QueryCounter:
+    """Conta os comandos SQL executados pelo engine enquanto estiver ativo."""
+
+    def __init__(self):
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, 'before_cursor_execute', self._on_execute)
+
+
+@contextmanager
+def timed(results: list):
+    """Acrescenta em ``results`` o tempo gasto no bloco, em milissegundos."""
+    start = time.perf_counter()
+    yield
+    results.append((time.perf_counter() - start) * 1000)
+
+
+def fresh_db():
+    """Apaga e recria o esquema do banco temporário."""
+    import models
+    db_session.remove()
+    models.Base.metadata.drop_all(bind=engine)
+    init_db()
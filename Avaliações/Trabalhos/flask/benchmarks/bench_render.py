@@ -0,0 +1,72 @@
+"""Benchmark da renderização de /chamada.
+
+Mede o tempo e o número de comandos SQL por requisição de GET /chamada
+(professor) com o cache de fragmentos desligado e ligado, e o ciclo
+registrar presença + redirecionamento, que invalida o fragmento.
+
+Uso (a partir de flask/): python -m benchmarks.bench_render
+"""
+from benchmarks._common import QueryCounter, fresh_db, timed
+
+from database import db_session
+from models import User, ProfessorAluno
+from cache import fragment_cache
+import main as web
+
+SIZES = (10, 100, 400, 1000)
+REPEAT = 50
+
+
+def seed(n_students: int):
+    fresh_db()
+    professor = User(nome='prof', senha='x', email='prof@example.com', matricula='P0', isTeacher=True)
+    db_session.add(professor)
+    db_session.flush()
+    alunos = [User(nome=f'aluno{i}', senha='x', email=f'aluno{i}@example.com', matricula=str(i), isTeacher=False)
+              for i in range(n_students)]
+    db_session.add_all(alunos)
+    db_session.flush()
+    db_session.add_all(ProfessorAluno(professor_id=professor.id, aluno_id=aluno.id, presencas_count=i % 30)
+                       for i, aluno in enumerate(alunos))
+    db_session.commit()
+    # As requisições removem a sessão no teardown; guarda só os valores
+    return {'username': professor.nome, 'matricula': professor.matricula,
+            'user_id': professor.id, 'isTeacher': True}
+
+
+def client_for(app, professor: dict):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(professor)
+    return client
+
+
+def measure(request):
+    times = []
+    with QueryCounter() as counter:
+        for _ in range(REPEAT):
+            with timed(times):
+                response = request()
+                assert response.status_code in (200, 302)
+    return sum(times) / REPEAT, counter.count / REPEAT
+
+
+def main():
+    app = web.create_app()
+    print(f"{'alunos':>6} {'sem cache':>20} {'com cache':>20} {'presença + GET':>20}")
+    for size in SIZES:
+        professor = seed(size)
+        client = client_for(app, professor)
+        fragment_cache.ttl = 0
+        sem_cache = measure(lambda: client.get('/chamada'))
+        fragment_cache.ttl = 300
+        fragment_cache.clear()
+        client.get('/chamada')
+        com_cache = measure(lambda: client.get('/chamada'))
+        escrita = measure(lambda: client.post(f'/presenca/aluno{size // 2}', follow_redirects=True))
+        print(f"{size:>6} " + ' '.join(f"{ms:9.2f} ms {queries:4.1f} q" for ms, queries in (sem_cache, com_cache, escrita)))
+        db_session.remove()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Cache em memória dos fragmentos HTML das listas de chamada.
+
+As linhas das tabelas de chamada.html e chamadaAluno.html são renderizadas
+uma vez por versão da lista (ver ``operations.roster_version``) e guardadas
+aqui junto com essa versão; uma entrada só é usada se a versão ainda for a
+atual. As funções de escrita de ``operations`` também invalidam as chaves
+afetadas, liberando a memória das entradas que não valem mais.
+
+Cada entrada tem validade (TTL) e o cache tem tamanho máximo, descartando a
+entrada usada há mais tempo (LRU).
+
+Configuração pelo ambiente:
+    FRAGMENT_CACHE_TTL   validade das entradas em segundos (padrão 300, 0 desliga)
+    FRAGMENT_CACHE_SIZE  número máximo de entradas (padrão 1024)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Mapa limitado a ``maxsize`` entradas que expiram ``ttl`` segundos após gravadas."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Retorna o valor da chave, ou None se ausente ou expirado."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[1]:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
+
+fragment_cache = TTLCache(maxsize=int(os.getenv("FRAGMENT_CACHE_SIZE", "1024")),
+                          ttl=float(os.getenv("FRAGMENT_CACHE_TTL", "300")))
+
+def professor_key(professor_id: int):
+    return ('professor', professor_id)
+
+def aluno_key(aluno_id: int):
+    return ('aluno', aluno_id)
+
+def invalidate_relationship(professor_id: int, aluno_id: int):
+    """Invalida as listas do professor e do aluno de uma relação."""
+    fragment_cache.invalidate(professor_key(professor_id), aluno_key(aluno_id))
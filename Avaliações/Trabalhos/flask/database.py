@@ -1,6 +1,7 @@
 import os
+import logging
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base
 
 # Load environment variables from .env file
@@ -13,16 +14,51 @@ if not db_path:
     raise ValueError("DB_PATH environment variable is not set")
 
 engine = create_engine('sqlite:///' + db_path)
+
+@event.listens_for(engine, 'connect')
+def _set_pragmas(dbapi_connection, connection_record):
+    # Desligado por padrão no SQLite; necessário para o ON DELETE CASCADE de presenca
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys = ON")
+    cursor.close()
+
 db_session = scoped_session(sessionmaker(autocommit=False,
                                          autoflush=False,
                                          bind=engine))
+logger = logging.getLogger(__name__)
+
 Base = declarative_base()
 Base.query = db_session.query_property()
 
 def init_db():
     import models
+    import migrations
     Base.metadata.create_all(bind=engine)
-    print("Database initialized.")
+    migrations.migrate(engine)
+    logger.info("Banco de dados inicializado")
+
+def ensure_schema():
+    """Roda init_db apenas se o banco estiver atrás da última migração.
+
+    Verificar ``PRAGMA user_version`` é bem mais barato que o create_all
+    completo, então a inicialização de um banco já migrado fica rápida.
+    """
+    import migrations
+    logger.info("Usando o banco de dados em %s", db_path)
+    with engine.connect() as conn:
+        if migrations.current_version(conn) >= migrations.LATEST_VERSION:
+            return False
+    init_db()
+    return True
+
+def dispose_engines():
+    """Descarta as conexões herdadas do processo pai após um fork.
+
+    Com ``preload_app`` o gunicorn cria o app (e abre conexões) antes de
+    criar os workers; cada worker precisa abrir as suas.
+    """
+    db_session.remove()
+    engine.dispose(close=False)
 
 if __name__ == '__main__':
     init_db()
\ No newline at end of file
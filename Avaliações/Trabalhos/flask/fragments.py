@@ -0,0 +1,36 @@
+"""Fragmentos HTML das tabelas de chamada, cacheados por versão da lista.
+
+Cada página verifica a versão da lista (uma consulta ao índice de
+alteracao_chamada) e só consulta e renderiza as linhas da tabela quando o
+fragmento em cache é de uma versão anterior. A versão é lida antes da
+consulta: se uma escrita acontecer no meio, o fragmento fica gravado com a
+versão antiga e é refeito na próxima requisição.
+"""
+from flask import render_template
+from markupsafe import Markup
+import operations
+from cache import fragment_cache, professor_key, aluno_key
+
+def _fragment(key, version: int, load, template: str, name: str):
+    """Retorna (html, número de linhas) do cache ou renderizando ``template``."""
+    cached = fragment_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return Markup(cached[1]), cached[2]
+    rows = load()
+    html = render_template(template, **{name: rows})
+    fragment_cache.set(key, (version, html, len(rows)))
+    return Markup(html), len(rows)
+
+def roster_rows(professor_id: int):
+    """Linhas da tabela de chamada.html e o número de alunos do professor."""
+    version = operations.roster_version(professor_id)
+    return _fragment(professor_key(professor_id), version,
+                     lambda: operations.retrieve_students_for_professor(professor_id),
+                     '_chamada_linhas.html', 'alunos')
+
+def teacher_rows(aluno_id: int):
+    """Linhas da tabela de chamadaAluno.html e o número de professores do aluno."""
+    version = operations.student_version(aluno_id)
+    return _fragment(aluno_key(aluno_id), version,
+                     lambda: operations.retrieve_professors_for_students(aluno_id),
+                     '_chamada_aluno_linhas.html', 'teachers')
@@ -1,40 +1,73 @@
-from flask import Flask, flash, json, render_template, redirect, session, request, url_for
-from database import init_db
+import os
+from flask import Blueprint, Flask, flash, json, render_template, redirect, session, request, url_for
+from database import ensure_schema, db_session
+import fragments
+from cache import fragment_cache
+import logging
 import operations
-
-init_db()
-app = Flask(__name__)
-
-app.secret_key = 'adim'
+import metrics
+
+# Chave usada apenas em desenvolvimento; em produção defina SECRET_KEY, que
+# precisa ser a mesma em todos os workers para as sessões continuarem válidas
+DEV_SECRET_KEY = 'adim'
+
+site = Blueprint('site', __name__)
+logger = logging.getLogger(__name__)
+
+def create_app(config: dict = None):
+    """Cria o app Flask.
+
+    A configuração vem do ambiente e pode ser sobrescrita por ``config``.
+    O esquema do banco só é criado ou migrado aqui, e apenas se estiver
+    desatualizado; importar este módulo não toca no banco.
+    """
+    metrics.configure_logging()
+    ensure_schema()
+    app = Flask(__name__)
+    secret_key = os.getenv("SECRET_KEY")
+    if not secret_key:
+        logger.warning("SECRET_KEY não definida; usando a chave de desenvolvimento")
+    app.secret_key = secret_key or DEV_SECRET_KEY
+    if config:
+        app.config.update(config)
+    app.register_blueprint(site)
+    app.teardown_appcontext(shutdown_session)
+    metrics.init_app(app)
+    metrics.register_collector('fragment_cache', fragment_cache.stats)
+    return app
+
+def shutdown_session(exception=None):
+    db_session.remove()
 
 # abrir o json e lê os dados
 # with open('alunos.json', 'r') as f:
 #     alunos = json.load(f)
 
-@app.route('/')
+@site.route('/')
 def home():
     session.clear()
     return render_template('home.html')
 
-@app.route('/user/<username>')
+@site.route('/user/<username>')
 def user(username):
     return f'Hello, {username}!'
 
-@app.route('/about')
+@site.route('/about')
 def about():
     text = 'This is the about page.'
     return render_template('about.html', text=text)
 
 # ROUTE TO ADD
-@app.route('/chamada', methods=['GET', 'POST', 'DELETE'])
+@site.route('/chamada', methods=['GET', 'POST', 'DELETE'])
 def chamada():
     if not session.get('username'):
-        return redirect(url_for('login'))
+        return redirect(url_for('.login'))
     if not session.get('isTeacher'):
-        teachers = operations.retrieve_professors_for_students(session.get('user_id'))
-        return render_template('chamadaAluno.html', teachers=teachers)
+        linhas, total = fragments.teacher_rows(session.get('user_id'))
+        return render_template('chamadaAluno.html', linhas=linhas, total=total)
     professor_id = session.get('user_id')
 
+    error = success = None
     if request.method == 'POST' and request.form.get('type') == 'Adicionar':
         novo_nome = request.form['nome']
         nova_matricula = request.form['matricula']
@@ -44,38 +77,31 @@ def chamada():
         
         if existing_user:
             if existing_user.isTeacher:
-                alunos = operations.retrieve_students_for_professor(professor_id)
-                return render_template('chamada.html', alunos=alunos, error='Matrícula já existente para um professor')
-            
+                error = 'Matrícula já existente para um professor'
             # Adicionar relação se o usuário for aluno
-            if operations.add_professor_student_relationship_if_exists(professor_id, nova_matricula, novo_nome):
-                alunos = operations.retrieve_students_for_professor(professor_id)
-                return render_template('chamada.html', alunos=alunos, success='Relação com aluno existente adicionada com sucesso')
+            elif operations.add_professor_student_relationship_if_exists(professor_id, nova_matricula, novo_nome):
+                success = 'Relação com aluno existente adicionada com sucesso'
             else:
-                alunos = operations.retrieve_students_for_professor(professor_id)
-                return render_template('chamada.html', alunos=alunos, error='Erro ao adicionar relação com aluno existente')
-        
-        # Criar novo aluno e adicionar relação
-        aluno = operations.create_user(nome=novo_nome, senha='default_password', email=f'{novo_nome}@example.com', matricula=nova_matricula, isTeacher=False)
-        if aluno:
+                error = 'Erro ao adicionar relação com aluno existente'
+        else:
+            # Criar novo aluno e adicionar relação
+            aluno = operations.create_user(nome=novo_nome, senha='default_password', email=f'{novo_nome}@example.com', matricula=nova_matricula, isTeacher=False)
+            if not aluno:
+                error = 'Erro ao criar novo aluno'
             # Adicionar relação com o novo aluno
-            if operations.add_professor_student_relationship_if_exists(professor_id, aluno.matricula, aluno.nome):
-                alunos = operations.retrieve_students_for_professor(professor_id)
-                return render_template('chamada.html', alunos=alunos, success='Novo aluno criado e relação adicionada com sucesso')
+            elif operations.add_professor_student_relationship_if_exists(professor_id, aluno.matricula, aluno.nome):
+                success = 'Novo aluno criado e relação adicionada com sucesso'
             else:
-                alunos = operations.retrieve_students_for_professor(professor_id)
-                return render_template('chamada.html', alunos=alunos, error='Erro ao adicionar relação com novo aluno')
-        else:
-            alunos = operations.retrieve_students_for_professor(professor_id)
-            return render_template('chamada.html', alunos=alunos, error='Erro ao criar novo aluno')
+                error = 'Erro ao adicionar relação com novo aluno'
 
-    # Para métodos GET e DELETE, ou se o método POST não for 'Adicionar', apenas renderiza a lista de alunos
-    alunos = operations.retrieve_students_for_professor(professor_id)
-    return render_template('chamada.html', alunos=alunos, session=session)
+    # Uma única renderização (e no máximo uma consulta da lista) por requisição;
+    # as linhas da tabela vêm do cache enquanto a versão da lista não mudar
+    linhas, _ = fragments.roster_rows(professor_id)
+    return render_template('chamada.html', linhas=linhas, error=error, success=success)
 
 
 # ROUTE TO DELETE
-@app.route('/chamada/<nome>', methods=['POST'])
+@site.route('/chamada/<nome>', methods=['POST'])
 def removeUser(nome):
     '''Remove a relação entre um professor e um aluno.'''
     professor_id = session.get('user_id')
@@ -87,10 +113,10 @@ def removeUser(nome):
         # else:
         #     alunos = operations.retrieve_students_for_professor(professor_id)
         #     return render_template('chamada.html', alunos=alunos)
-    return redirect(url_for('chamada'))
+    return redirect(url_for('.chamada'))
 
 # ROUTE TO RECORD PRESENCE
-@app.route('/presenca/<nome>', methods=['POST'])
+@site.route('/presenca/<nome>', methods=['POST'])
 def recordPresence(nome):
     '''Registra a presença de um aluno.'''
     professor_id = session.get('user_id')
@@ -98,16 +124,18 @@ def recordPresence(nome):
     if aluno:
         professor_aluno_id = operations.get_professor_aluno_id(professor_id, aluno.id)
         if professor_aluno_id:
-            success = operations.record_presence(professor_aluno_id)
-            if success:
+            created = operations.record_presence(professor_aluno_id)
+            if created:
                 flash(f'Presença de {nome} registrada com sucesso!')
+            elif created is False:
+                flash(f'Presença de {nome} já registrada hoje.')
             else:
                 flash(f'Falha ao registrar presença de {nome}.')
-    return redirect(url_for('chamada'))
+    return redirect(url_for('.chamada'))
 
 
 # ROUTE TO LOGIN
-@app.route('/login', methods=['GET', 'POST'])
+@site.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'GET':
         return render_template('login.html')
@@ -123,13 +151,12 @@ def login():
             session['matricula'] = user.matricula  # Armazenar a matrícula do aluno na sessão
             session['user_id'] = user.id
             session['isTeacher'] = user.isTeacher
-            app.secret_key = email
             return redirect('chamada') 
         else:
             return render_template('login.html', error='Email ou senha inválidos')
 
 # ROUTE TO SIGNIN
-@app.route('/signin', methods=['GET', 'POST'])
+@site.route('/signin', methods=['GET', 'POST'])
 def signin():
     if request.method == 'GET':
         return render_template('signin.html')
@@ -147,7 +174,6 @@ def signin():
             session['matricula'] = user.matricula  # Armazenar a matrícula do aluno na sessão
             session['user_id'] = user.id
             session['isTeacher'] = user.isTeacher
-            app.secret_key = email  # Usar o email como chave secreta para a sessão
             return redirect('chamada') 
         else:
             return render_template('signin.html', error='Não foi possível criar o usuário.')
@@ -155,4 +181,4 @@ def signin():
 
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    create_app().run(debug=True) 
\ No newline at end of file
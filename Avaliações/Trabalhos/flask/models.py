@@ -1,5 +1,5 @@
-from sqlalchemy import Boolean, Column, Date, ForeignKey, Integer, String, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Date, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import backref, relationship
 from database import Base
 from datetime import datetime
 
@@ -15,6 +15,7 @@ class User(Base):
 
     __table_args__ = (
         UniqueConstraint('nome', 'matricula', name='_nome_matricula_uc'),
+        Index('ix_users_nome', 'nome'),
     )
     def __repr__(self):
         return f'<User {self.nome}>'
@@ -25,11 +26,17 @@ class ProfessorAluno(Base):
     id = Column(Integer, primary_key=True)
     professor_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     aluno_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    # Contadores mantidos por operations.record_presence (ver counters.py)
+    presencas_count = Column(Integer, nullable=False, default=0, server_default='0')
+    ultima_presenca = Column(Date, nullable=True)
 
     professor = relationship('User', foreign_keys=[professor_id], backref='alunos')
     aluno = relationship('User', foreign_keys=[aluno_id], backref='professores')
 
-    __table_args__ = (UniqueConstraint('professor_id', 'aluno_id', name='_professor_aluno_uc'),)
+    __table_args__ = (
+        UniqueConstraint('professor_id', 'aluno_id', name='_professor_aluno_uc'),
+        Index('ix_professor_aluno_aluno_id', 'aluno_id'),
+    )
 
 
     def __repr__(self):
@@ -40,9 +47,35 @@ class Presenca(Base):
 
     id = Column(Integer, primary_key=True)
     dia = Column(Date, default=datetime.utcnow, nullable=False)
-    professor_aluno_id = Column(Integer, ForeignKey('professor_aluno.id'), nullable=False)
+    # Removida junto com a relação pelo próprio SQLite (PRAGMA foreign_keys em database.py)
+    professor_aluno_id = Column(Integer, ForeignKey('professor_aluno.id', ondelete='CASCADE'), nullable=False)
 
-    professor_aluno = relationship('ProfessorAluno', backref='presencas')
+    professor_aluno = relationship('ProfessorAluno', backref=backref('presencas', passive_deletes=True))
+
+    # Uma presença por relação por dia (ver operations._add_presence)
+    __table_args__ = (Index('ix_presenca_professor_aluno_dia', 'professor_aluno_id', 'dia', unique=True),)
 
     def __repr__(self):
         return f'<Presenca {self.dia} - {self.professor_aluno_id}>'
+
+class AlteracaoChamada(Base):
+    """Registro de cada alteração numa relação professor-aluno.
+
+    O id crescente funciona como versão: a versão da lista de um professor
+    (ou de um aluno) é o maior id das suas alterações.
+    """
+    __tablename__ = 'alteracao_chamada'
+
+    id = Column(Integer, primary_key=True)
+    professor_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    aluno_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    # 'adicionado', 'atualizado' ou 'removido'
+    tipo = Column(String(20), nullable=False)
+
+    __table_args__ = (
+        Index('ix_alteracao_chamada_professor', 'professor_id', 'id'),
+        Index('ix_alteracao_chamada_aluno', 'aluno_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<AlteracaoChamada {self.id} {self.tipo} {self.professor_id}-{self.aluno_id}>'
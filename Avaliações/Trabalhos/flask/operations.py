@@ -1,7 +1,13 @@
+import logging
 from database import db_session
-from models import User, ProfessorAluno, Presenca
+from models import User, ProfessorAluno, Presenca, AlteracaoChamada
+from cache import invalidate_relationship
+from sqlalchemy import case, func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 def create_user(nome: str, senha: str, email: str, matricula: str, isTeacher: bool):
     """Cria um novo usuário no banco de dados."""
     try:
@@ -11,7 +17,7 @@ def create_user(nome: str, senha: str, email: str, matricula: str, isTeacher: bo
         return user
     except Exception as e:
         db_session.rollback()
-        print(f"Erro ao criar usuário: {e}")  # Log do erro para depuração
+        logger.error("Erro ao criar usuário: %s", e)
         return None
 
 def login(email: str, senha: str):
@@ -20,7 +26,7 @@ def login(email: str, senha: str):
         user = db_session.query(User).filter_by(email=email, senha=senha).first()
         return user
     except Exception as e:
-        print(f"Erro ao realizar login: {e}")  # Log do erro para depuração
+        logger.error("Erro ao realizar login: %s", e)
         return None
 
 def add_professor_aluno_relationship(professor_id: int, aluno_id: int):
@@ -28,24 +34,60 @@ def add_professor_aluno_relationship(professor_id: int, aluno_id: int):
     try:
         relationship = ProfessorAluno(professor_id=professor_id, aluno_id=aluno_id)
         db_session.add(relationship)
+        _log_change(db_session, professor_id, aluno_id, 'adicionado')
         db_session.commit()
+        invalidate_relationship(professor_id, aluno_id)
         return relationship
     except Exception as e:
         db_session.rollback()
-        print(f"Erro ao adicionar relação professor-aluno: {e}")  # Log do erro para depuração
+        logger.error("Erro ao adicionar relação professor-aluno: %s", e)
         return None
 
+def _log_change(session, professor_id: int, aluno_id: int, tipo: str):
+    """Registra uma alteração da relação, avançando a versão das listas envolvidas."""
+    session.add(AlteracaoChamada(professor_id=professor_id, aluno_id=aluno_id, tipo=tipo))
+
 def record_presence(professor_aluno_id: int, dia: datetime = None):
-    """Registra a presença de um aluno em um dia específico."""
+    """Registra a presença de um aluno em um dia específico.
+
+    Idempotente por dia: retorna True se a presença é nova, False se o aluno
+    já tinha presença nesse dia e None em caso de erro.
+    """
     try:
         dia = dia or datetime.utcnow().date()
-        presence = Presenca(professor_aluno_id=professor_aluno_id, dia=dia)
-        db_session.add(presence)
+        # INSERT ... ON CONFLICT DO NOTHING: o índice único (relação, dia)
+        # descarta cliques duplos e reenvios sem contar a presença de novo
+        inserted = db_session.execute(
+            sqlite_insert(Presenca).values(professor_aluno_id=professor_aluno_id, dia=dia)
+            .on_conflict_do_nothing(index_elements=['professor_aluno_id', 'dia'])
+            .returning(Presenca.id)
+        ).first()
+        if inserted is None:
+            db_session.rollback()
+            return False
+
+        # Atualiza os contadores da relação na mesma transação, obtendo o
+        # professor e o aluno para o log de alterações
+        relationship = db_session.execute(
+            update(ProfessorAluno).where(ProfessorAluno.id == professor_aluno_id)
+            .values({
+                ProfessorAluno.presencas_count: ProfessorAluno.presencas_count + 1,
+                ProfessorAluno.ultima_presenca: case(
+                    (ProfessorAluno.ultima_presenca == None, dia),
+                    (ProfessorAluno.ultima_presenca < dia, dia),
+                    else_=ProfessorAluno.ultima_presenca,
+                ),
+            })
+            .returning(ProfessorAluno.professor_id, ProfessorAluno.aluno_id)
+            .execution_options(synchronize_session=False)
+        ).one()
+        _log_change(db_session, relationship.professor_id, relationship.aluno_id, 'atualizado')
         db_session.commit()
-        return presence
+        invalidate_relationship(relationship.professor_id, relationship.aluno_id)
+        return True
     except Exception as e:
         db_session.rollback()
-        print(f"Erro ao registrar presença: {e}")  # Log do erro para depuração
+        logger.error("Erro ao registrar presença: %s", e)
         return None
     
 def remove_professor_aluno_relationship(professor_id: int, nome_aluno: str):
@@ -53,89 +95,76 @@ def remove_professor_aluno_relationship(professor_id: int, nome_aluno: str):
     try:
         aluno_id = db_session.query(User).filter_by(nome=nome_aluno).first().id
         
-        # Inicia uma transação
-        with db_session.begin_nested():
-            relationship = db_session.query(ProfessorAluno).filter_by(professor_id=professor_id, aluno_id=aluno_id).first()
-
-            if relationship:
-                # Primeiro, removemos as presenças associadas a esta relação
-                db_session.query(Presenca).filter_by(professor_aluno_id=relationship.id).delete()
-
-                # Depois, removemos a relação entre o professor e o aluno
-                db_session.delete(relationship)
-            
-            db_session.commit()
-            return True
-        return False
+        # Sem SAVEPOINT: ele abriria a transação já na leitura abaixo, e o SQLite
+        # recusa na hora (sem esperar o busy_timeout) a promoção de um leitor a
+        # escritor enquanto outro processo escreve. O commit único já é atômico.
+        relationship = db_session.query(ProfessorAluno).filter_by(professor_id=professor_id, aluno_id=aluno_id).first()
+
+        if relationship:
+            # As presenças da relação saem junto, pelo ON DELETE CASCADE do SQLite
+            db_session.delete(relationship)
+            _log_change(db_session, professor_id, aluno_id, 'removido')
+
+        db_session.commit()
+        invalidate_relationship(professor_id, aluno_id)
+        return True
     
     except Exception as e:
         db_session.rollback()
-        print(f"Erro ao remover relação professor-aluno: {e}")  # Log do erro para depuração
+        logger.error("Erro ao remover relação professor-aluno: %s", e)
         return False
 
+def roster_version(professor_id: int):
+    """Versão atual da lista de chamada de um professor (0 se nunca alterada)."""
+    return db_session.query(func.max(AlteracaoChamada.id)) \
+        .filter(AlteracaoChamada.professor_id == professor_id).scalar() or 0
+
+def student_version(aluno_id: int):
+    """Versão atual da lista de professores de um aluno (0 se nunca alterada)."""
+    return db_session.query(func.max(AlteracaoChamada.id)) \
+        .filter(AlteracaoChamada.aluno_id == aluno_id).scalar() or 0
+
 def retrieve_students_for_professor(professor_id: int):
     """Recupera todos os alunos que têm uma relação com um professor específico e exibe o número de presenças."""
     try:
-        # Recupera todas as relações entre o professor e seus alunos
-        relationships = db_session.query(ProfessorAluno).filter_by(professor_id=professor_id).all()
-        
-        # IDs dos alunos associados ao professor
-        aluno_ids = [relationship.aluno_id for relationship in relationships]
-        
-        # Recupera todos os alunos que não são professores e têm uma relação com o professor
-        students = db_session.query(User).filter(User.id.in_(aluno_ids), User.isTeacher == False).all()
-
-        # Cria um dicionário para mapear aluno_id para o número de presenças
-        student_presencas = {}
-        for relationship in relationships:
-            # Conta o número de presenças do aluno
-            presencas_count = db_session.query(Presenca).filter_by(professor_aluno_id=relationship.id).count()
-            student_presencas[relationship.aluno_id] = presencas_count
-        
+        # Uma única consulta usando o contador mantido em ProfessorAluno
+        rows = db_session.query(User.nome, User.matricula, ProfessorAluno.presencas_count) \
+            .join(ProfessorAluno, ProfessorAluno.aluno_id == User.id) \
+            .filter(ProfessorAluno.professor_id == professor_id, User.isTeacher == False) \
+            .order_by(User.id) \
+            .all()
+
         # Formata os dados dos alunos com o número de presenças
         formatted_students = {}
-        for student in students:
-            # Recupera o número de presenças para o aluno
-            presencas_count = student_presencas.get(student.id, 0)
-            formatted_students[student.nome] = {
-                'matricula': student.matricula,
+        for nome, matricula, presencas_count in rows:
+            formatted_students[nome] = {
+                'matricula': matricula,
                 'presencas': presencas_count
             }
 
         return formatted_students
     except Exception as e:
-        print(f"Erro ao recuperar alunos para o professor: {e}")  # Log do erro para depuração
+        logger.error("Erro ao recuperar alunos para o professor: %s", e)
         return {}
     
 def retrieve_professors_for_students(student_id: int):
     """Recupera todos os professores associados a um aluno específico e exibe o número de presenças com cada professor."""
     try:
-        # Recupera todas as relações entre o aluno e seus professores
-        relationships = db_session.query(ProfessorAluno).filter_by(aluno_id=student_id).all()
-        
-        # IDs dos professores associados ao aluno
-        professor_ids = [relationship.professor_id for relationship in relationships]
-        
-        # Recupera todos os professores que têm uma relação com o aluno
-        professors = db_session.query(User).filter(User.id.in_(professor_ids), User.isTeacher == True).all()
-
-        # Cria um dicionário para mapear professor_id para o número de presenças
-        professor_presencas = {}
-        for relationship in relationships:
-            # Conta o número de presenças do aluno com o professor
-            presencas_count = db_session.query(Presenca).filter_by(professor_aluno_id=relationship.id).count()
-            professor_presencas[relationship.professor_id] = presencas_count
-        
+        # Uma única consulta usando o contador mantido em ProfessorAluno
+        rows = db_session.query(User.nome, ProfessorAluno.presencas_count) \
+            .join(ProfessorAluno, ProfessorAluno.professor_id == User.id) \
+            .filter(ProfessorAluno.aluno_id == student_id, User.isTeacher == True) \
+            .order_by(User.id) \
+            .all()
+
         # Formata os dados dos professores com o número de presenças
         formatted_professors = {}
-        for professor in professors:
-            # Recupera o número de presenças para o aluno com o professor
-            presencas_count = professor_presencas.get(professor.id, 0)
-            formatted_professors[professor.nome] = presencas_count
+        for nome, presencas_count in rows:
+            formatted_professors[nome] = presencas_count
 
         return formatted_professors
     except Exception as e:
-        print(f"Erro ao recuperar professores para o aluno: {e}")  # Log do erro para depuração
+        logger.error("Erro ao recuperar professores para o aluno: %s", e)
         return {}
     
 def get_user_by_nome_matricula(matricula: str,  nome: str):
@@ -144,7 +173,7 @@ def get_user_by_nome_matricula(matricula: str,  nome: str):
         user = db_session.query(User).filter_by(matricula=matricula, nome=nome).first()
         return user
     except Exception as e:
-        print(f"Erro ao recuperar usuário por matrícula: {e}")  # Log do erro para depuração
+        logger.error("Erro ao recuperar usuário por matrícula: %s", e)
         return None
 
 def add_professor_student_relationship_if_exists(professor_id: int, matricula: str, nome: str):
@@ -159,7 +188,7 @@ def add_professor_student_relationship_if_exists(professor_id: int, matricula: s
             return relationship is not None
         return False
     except Exception as e:
-        print(f"Erro ao adicionar relação professor-aluno: {e}")  # Log do erro para depuração
+        logger.error("Erro ao adicionar relação professor-aluno: %s", e)
         return False
     
 def get_user_by_nome(nome: str):
@@ -167,7 +196,7 @@ def get_user_by_nome(nome: str):
     try:
         return db_session.query(User).filter_by(nome=nome).first()
     except Exception as e:
-        print(f"Erro ao recuperar usuário por nome: {e}")
+        logger.error("Erro ao recuperar usuário por nome: %s", e)
         return None
 
 def get_professor_aluno_id(professor_id: int, aluno_id: int):
@@ -176,5 +205,5 @@ def get_professor_aluno_id(professor_id: int, aluno_id: int):
         relationship = db_session.query(ProfessorAluno).filter_by(professor_id=professor_id, aluno_id=aluno_id).first()
         return relationship.id if relationship else None
     except Exception as e:
-        print(f"Erro ao recuperar relação professor-aluno: {e}")
+        logger.error("Erro ao recuperar relação professor-aluno: %s", e)
         return None
\ No newline at end of file
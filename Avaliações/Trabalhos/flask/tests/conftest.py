@@ -0,0 +1,24 @@
+"""Configuração comum dos testes.
+
+Os testes rodam contra um banco SQLite temporário, criado e migrado uma vez
+por sessão. O DB_PATH precisa ser definido antes de importar ``database``.
+
+Uso (a partir de flask/): python -m pytest
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='chamada-test-'), 'test.db')
+
+
+@pytest.fixture(scope='session')
+def migrated_db():
+    """Banco temporário com o esquema completo (create_all + migrações)."""
+    from database import db_session, engine, init_db
+    init_db()
+    yield engine
+    db_session.remove()